@@ -4,77 +4,130 @@ Engine Service (UCI) — UI-orchestrated, no Game Service calls.
 
 Exposes:
   - GET  /health                     -> {"ok": true}
-  - GET  /engines/think              -> SSE: {type:"info"| "bestmove"| "done"}
-        ?fen=&side=white|black&depth=&rollouts=
+  - GET  /engines/think              -> SSE: {type:"search"| "info"| "bestmove"| "done"}
+        ?fen=&side=white|black&depth=&nodes=&movetime=&rollouts=&ponder=&session=&stats=&priority=
   - GET  /engines/selfplay           -> SSE bestmove sequence (no game writes)
-        ?fen=&whiteDepth=&whiteRollouts=&blackDepth=&blackRollouts=
-  - POST /engines/stop               -> stop current search/stream (best-effort)
+        ?fen=&whiteDepth=&whiteNodes=&whiteMovetime=&whiteRollouts=
+             &blackDepth=&blackNodes=&blackMovetime=&blackRollouts=
+  - POST /engines/review             -> SSE: {type:"search"| "ply"| "summary"| "done"}
+        {pgn | moves (+fen), depth, nodes, movetime}   whole-game review (review.py)
+  - POST /engines/stop?id=           -> stop one search/selfplay/review stream (id from its "search" event)
+        ?session=                      (every open stream of that session)
+  - GET  /engines/workers            -> engine workers, their load and session counts,
+                                        and per-class scheduler metrics ("classes")
 
 Notes:
   * This service NEVER mutates game state and NEVER calls the Game Service.
-  * SSE events are tiny JSON objects, one per `data:` line.
+  * SSE events are tiny JSON objects, one per `data:` line. The first one of every
+    stream is {type:"search", id}; stopping uses that id and only affects that stream.
+  * With ponder=1 (HUMAN_VS_AI), the engine keeps searching the expected reply
+    position after the bestmove; a matching next /engines/think reuses it.
+  * With session=<game id>, searches are sent as `position ... moves ...` so the
+    engine keeps its TT and repetition history between moves of that game.
+    Selfplay always runs as such a session (one per stream, both sides).
+  * Searches run on engine workers (dispatcher.py, ENGINE_WORKERS): local engine
+    processes and/or other engine-svc instances. A session sticks to one worker.
+  * stats=1 adds per-iteration search counters (TT hits, cutoffs, LMR/null-move,
+    aspiration fails, ...) to the info events as {type:"info", stats:{...}}.
+  * depth, nodes and movetime (ms) are combined into one `go`; the first limit
+    hit ends the search. Every search is also capped by its tier's latency
+    ceiling (THINK_MAX_MS / SELFPLAY_MAX_MS, 0 = no ceiling).
+  * Priority classes (scheduler.py): think is `interactive` unless
+    ?priority=batch (or selfplay) is given, selfplay plies are `selfplay`. A busy
+    engine stops a lower-class search for a higher one and re-runs it later;
+    a stream whose class queue is full is refused with 503.
 """
 from __future__ import annotations
 
-import asyncio
-import json
 import os
+import uuid
 from typing import AsyncGenerator, Optional
 
 import chess
 from fastapi import FastAPI, HTTPException, Query
 from fastapi.responses import StreamingResponse, JSONResponse
 
-from uci_bridge import UciBridge
+import launcher
+from dispatcher import Dispatcher
+from events import SSE_DONE, Bestmove, Error, Info, sse, sse_bestmove, sse_error, sse_info, sse_search
+from review import ReviewRequest, parse_game, review
 
 print("[DBG] app.py loaded", flush=True)
 app = FastAPI(title="engine-svc", version="1.0")
 print("[DBG] FastAPI app created", flush=True)
 
-# Single engine process shared per instance
+# Engine command for local workers; ENGINE_WORKERS says how many and which remotes
 ENGINE_CMD = os.getenv("UCI_ENGINE_CMD") or f"python {os.path.abspath(os.path.join(os.path.dirname(__file__), 'uci_reference_engine.py'))}"
 print(f"[DBG] ENGINE_CMD={ENGINE_CMD}", flush=True)
-bridge = UciBridge(ENGINE_CMD)
-print("[DBG] UciBridge instantiated", flush=True)
+dispatcher = Dispatcher.from_env(ENGINE_CMD)
+print(f"[DBG] Dispatcher with {len(dispatcher.workers)} worker(s)", flush=True)
 
-# Global stop flag (best-effort for current client streams)
-_stop_all = asyncio.Event()
+# Per-tier latency ceilings (ms): the movetime sent to the engine never exceeds these
+MAX_LATENCY_MS = {
+    "think": int(os.getenv("THINK_MAX_MS", "15000")),
+    "selfplay": int(os.getenv("SELFPLAY_MAX_MS", "5000")),
+}
+print(f"[DBG] MAX_LATENCY_MS={MAX_LATENCY_MS}", flush=True)
+
+
+def _capped_movetime(tier: str, movetime: Optional[int]) -> Optional[int]:
+    ceiling = MAX_LATENCY_MS[tier]
+    if ceiling <= 0:
+        return movetime
+    return min(movetime, ceiling) if movetime else ceiling
 
 @app.get("/health")
 async def health():
     return {"ok": True}
 
+@app.get("/engines/workers")
+async def engines_workers():
+    return {"workers": dispatcher.status(), "classes": dispatcher.scheduler.status()}
+
 @app.post("/engines/stop")
-async def engines_stop():
-    """Stop current search or selfplay stream (best-effort)."""
-    _stop_all.set()
+async def engines_stop(
+    id: Optional[str] = Query(None, max_length=64, description="Search id from the stream's first event"),
+    session: Optional[str] = Query(None, max_length=64),
+):
+    """Stop one search/selfplay stream (by id) or all streams of one session; nothing else."""
+    if id is None and session is None:
+        raise HTTPException(400, "id or session required")
+    stopped = 0
     try:
-        await bridge.abort_current_search()
-    except Exception:
-        pass
-    # small delay so in-flight generators notice
-    await asyncio.sleep(0.05)
-    _stop_all.clear()
-    return {"ok": True}
-
-def _sse_json(obj: dict) -> str:
-    return f"data: {json.dumps(obj, separators=(',', ':'))}\n\n"
+        if id is not None:
+            stopped += int(await dispatcher.cancel(id))
+        if session is not None:
+            stopped += await dispatcher.cancel_session(session)
+    except Exception as e:
+        print(f"[ENGINE] stop failed: {e}", flush=True)
+    return {"ok": True, "stopped": stopped}
 
 @app.get("/engines/think")
 async def engines_think(
     fen: str = Query(..., description="Position as FEN"),
     side: Optional[str] = Query(None, regex="^(white|black)$"),
     depth: int = Query(6, ge=1),
+    nodes: Optional[int] = Query(None, ge=1, description="Node budget"),
+    movetime: Optional[int] = Query(None, ge=1, description="Time budget in ms"),
     rollouts: int = Query(150, ge=0),
+    ponder: bool = Query(False, description="Search the expected reply while the opponent thinks"),
+    session: Optional[str] = Query(None, max_length=64, description="Game/session id for search-state reuse"),
+    stats: bool = Query(False, description="Forward per-iteration search statistics"),
+    priority: str = Query("interactive", regex="^(interactive|selfplay|batch)$",
+                          description="Search class; lower classes yield the engine to higher ones"),
 ) -> StreamingResponse:
     # Debug: log request params
-    print(f"[ENGINE] think req fen='{fen}' side={side} depth={depth} rollouts={rollouts}", flush=True)
+    movetime = _capped_movetime("think", movetime)
+    print(f"[ENGINE] think req fen='{fen}' side={side} depth={depth} nodes={nodes} movetime={movetime} "
+          f"rollouts={rollouts} ponder={ponder} session={session} stats={stats} priority={priority}", flush=True)
     # (validation unchanged)
     try:
         board = chess.Board(fen)
     except Exception:
         print("[ENGINE] think invalid FEN", flush=True)
         raise HTTPException(400, "Invalid FEN")
+    if not dispatcher.admissible(priority):
+        raise HTTPException(503, f"too many queued {priority} searches")
 
     if side is not None:
         stm = "white" if board.turn == chess.WHITE else "black"
@@ -83,32 +136,36 @@ async def engines_think(
         mismatch = False
 
     async def gen() -> AsyncGenerator[str, None]:
+        handle = dispatcher.open_search(session)
+        yield sse_search(handle.id)
         if mismatch:
             print("[ENGINE] think: side mismatch warning", flush=True)
-            yield _sse_json({"type": "info", "warning": "side parameter does not match FEN turn"})
+            yield sse({"type": "info", "warning": "side parameter does not match FEN turn"})
 
-        async for chunk in bridge.think_stream(fen, depth=depth, rollouts=rollouts, movetime_ms=None):
-            try:
-                msg = json.loads(chunk)
-            except Exception:
-                print(f"[ENGINE] think: bad chunk {chunk!r}", flush=True)
-                continue
-            stage = msg.get("stage")
-            if stage == "searching":
-                yield _sse_json({"type": "info", **{k:v for k,v in msg.items() if k!='stage'}})
-            elif stage == "done":
-                bm = msg.get("bestmove")
-                print(f"[ENGINE] think: bestmove={bm}", flush=True)
-                if bm:
-                    yield _sse_json({"type": "bestmove", "move": bm})
-                yield _sse_json({"type": "done"})
-                print("[ENGINE] think: done", flush=True)
-                break
-            elif stage == "error":
-                print(f"[ENGINE] think: error {msg}", flush=True)
-                yield _sse_json({"type": "info", "error": msg.get("message", "engine error")})
-                yield _sse_json({"type": "done"})
-                break
+        # Ponder hits/misses are resolved on the worker that owns the session.
+        source = dispatcher.think(fen, depth, nodes, movetime, rollouts, session, ponder, handle, stats, priority)
+        try:
+            async for ev in source:
+                if isinstance(ev, Info):
+                    yield sse_info(ev)
+                elif isinstance(ev, Bestmove):
+                    bm = ev.move
+                    print(f"[ENGINE] think: bestmove={bm}", flush=True)
+                    if bm:
+                        yield sse_bestmove(bm)
+                    yield SSE_DONE
+                    print("[ENGINE] think: done", flush=True)
+                    break
+                elif isinstance(ev, Error):
+                    print(f"[ENGINE] think: error {ev.message}", flush=True)
+                    yield sse_error(ev.message or "engine error")
+                    yield SSE_DONE
+                    break
+            else:
+                yield SSE_DONE   # cancelled before it reached an engine
+        finally:
+            await source.aclose()
+            dispatcher.close_search(handle)
 
     return StreamingResponse(gen(), media_type="text/event-stream")
 
@@ -116,81 +173,128 @@ async def engines_think(
 async def engines_selfplay(
     fen: str = Query(..., description="Start position as FEN"),
     whiteDepth: int = Query(6, ge=1),
+    whiteNodes: Optional[int] = Query(None, ge=1),
+    whiteMovetime: Optional[int] = Query(None, ge=1),
     whiteRollouts: int = Query(150, ge=0),
     blackDepth: int = Query(6, ge=1),
+    blackNodes: Optional[int] = Query(None, ge=1),
+    blackMovetime: Optional[int] = Query(None, ge=1),
     blackRollouts: int = Query(150, ge=0),
 ) -> StreamingResponse:
-    print(f"[ENGINE] selfplay req fen='{fen}' wd={whiteDepth}/{whiteRollouts} bd={blackDepth}/{blackRollouts}", flush=True)
+    whiteMovetime = _capped_movetime("selfplay", whiteMovetime)
+    blackMovetime = _capped_movetime("selfplay", blackMovetime)
+    print(f"[ENGINE] selfplay req fen='{fen}' wd={whiteDepth}/{whiteNodes}/{whiteMovetime}/{whiteRollouts} "
+          f"bd={blackDepth}/{blackNodes}/{blackMovetime}/{blackRollouts}", flush=True)
     try:
         board = chess.Board(fen)
     except Exception:
         print("[ENGINE] selfplay invalid FEN", flush=True)
         raise HTTPException(400, "Invalid FEN")
+    if not dispatcher.admissible("selfplay"):
+        raise HTTPException(503, "too many queued selfplay searches")
+
+    # One engine session for the whole game: each ply goes out as `position ... moves ...`
+    # (one appended move), so the engine keeps TT and repetition history across plies.
+    sid = f"selfplay-{uuid.uuid4().hex[:12]}"
 
     async def gen() -> AsyncGenerator[str, None]:
-        _stop_all.clear()
+        handle = dispatcher.open_search(sid)
+        yield sse_search(handle.id)
+        try:
+            async for chunk in _selfplay_plies(handle):
+                yield chunk
+        finally:
+            dispatcher.close_search(handle)
+            dispatcher.forget(sid)
+
+    async def _selfplay_plies(handle) -> AsyncGenerator[str, None]:
         while True:
-            if _stop_all.is_set():
+            if handle.cancelled.is_set():
                 print("[ENGINE] selfplay: stop signal", flush=True)
-                yield _sse_json({"type": "done"})
+                yield SSE_DONE
                 break
             if board.is_game_over(claim_draw=True):
                 print("[ENGINE] selfplay: game over", flush=True)
-                yield _sse_json({"type": "done"})
+                yield SSE_DONE
                 break
 
             side_flag = "w" if board.turn == chess.WHITE else "b"
-            d, r = (whiteDepth, whiteRollouts) if side_flag == "w" else (blackDepth, blackRollouts)
-            print(f"[ENGINE] selfplay: think side={side_flag} depth={d} rollouts={r}", flush=True)
-
-            async for chunk in bridge.think_stream(board.fen(), depth=d, rollouts=r, movetime_ms=None):
-                if _stop_all.is_set():
-                    print("[ENGINE] selfplay: abort current search", flush=True)
-                    try:
-                        await bridge.abort_current_search()
-                    except Exception:
-                        pass
-                    yield _sse_json({"type": "done"})
-                    return
-                try:
-                    msg = json.loads(chunk)
-                except Exception:
-                    print(f"[ENGINE] selfplay: bad chunk {chunk!r}", flush=True)
-                    continue
-                stage = msg.get("stage")
-                if stage == "searching":
-                    continue
-                if stage == "done":
-                    bm = msg.get("bestmove")
-                    print(f"[ENGINE] selfplay: bestmove={bm}", flush=True)
-                    if not bm or bm == "0000":
-                        print("[ENGINE] selfplay: no legal move, done", flush=True)
-                        yield _sse_json({"type": "done"})
+            if side_flag == "w":
+                d, n, mt, r = whiteDepth, whiteNodes, whiteMovetime, whiteRollouts
+            else:
+                d, n, mt, r = blackDepth, blackNodes, blackMovetime, blackRollouts
+            print(f"[ENGINE] selfplay: think side={side_flag} depth={d} nodes={n} movetime={mt} rollouts={r}", flush=True)
+
+            source = dispatcher.think(board.fen(), d, n, mt, r, sid, handle=handle, priority="selfplay")
+            try:
+                async for ev in source:
+                    if handle.cancelled.is_set():
+                        # closing the stream stops the engine search
+                        print("[ENGINE] selfplay: abort current search", flush=True)
+                        yield SSE_DONE
                         return
-                    yield _sse_json({"type": "bestmove", "side": side_flag, "move": bm})
-                    try:
-                        mv = chess.Move.from_uci(bm)
-                        if mv in board.legal_moves:
-                            board.push(mv)
-                        else:
-                            print("[ENGINE] selfplay: illegal move from engine, done", flush=True)
-                            yield _sse_json({"type": "done"})
+                    if isinstance(ev, Info):
+                        continue
+                    if isinstance(ev, Bestmove):
+                        bm = ev.move
+                        print(f"[ENGINE] selfplay: bestmove={bm}", flush=True)
+                        if not bm or bm == "0000":
+                            print("[ENGINE] selfplay: no legal move, done", flush=True)
+                            yield SSE_DONE
                             return
-                    except Exception as e:
-                        print(f"[ENGINE] selfplay: push failed {e}", flush=True)
-                        yield _sse_json({"type": "done"})
+                        yield sse_bestmove(bm, side_flag)
+                        try:
+                            mv = chess.Move.from_uci(bm)
+                            if mv in board.legal_moves:
+                                board.push(mv)
+                            else:
+                                print("[ENGINE] selfplay: illegal move from engine, done", flush=True)
+                                yield SSE_DONE
+                                return
+                        except Exception as e:
+                            print(f"[ENGINE] selfplay: push failed {e}", flush=True)
+                            yield SSE_DONE
+                            return
+                        break
+                    if isinstance(ev, Error):
+                        print(f"[ENGINE] selfplay: error {ev.message}", flush=True)
+                        yield sse_error(ev.message or "engine error")
+                        yield SSE_DONE
                         return
-                    break
-                if stage == "error":
-                    print(f"[ENGINE] selfplay: error {msg}", flush=True)
-                    yield _sse_json({"type": "info", "error": msg.get("message", "engine error")})
-                    yield _sse_json({"type": "done"})
-                    return
+            finally:
+                await source.aclose()
+
+    return StreamingResponse(gen(), media_type="text/event-stream")
+
+@app.post("/engines/review")
+async def engines_review(req: ReviewRequest) -> StreamingResponse:
+    """Every position of a game, searched in parallel chunks (batch class); one "ply" event per move."""
+    movetime = _capped_movetime("think", req.movetime_ms())
+    try:
+        game = parse_game(req)
+    except ValueError as e:
+        print(f"[ENGINE] review rejected: {e}", flush=True)
+        raise HTTPException(400, str(e))
+    if not dispatcher.admissible("batch"):
+        raise HTTPException(503, "too many queued batch searches")
+    print(f"[ENGINE] review req plies={game.plies} depth={req.depth} nodes={req.nodes} movetime={movetime}", flush=True)
+
+    async def gen() -> AsyncGenerator[str, None]:
+        handle = dispatcher.open_search()
+        yield sse_search(handle.id)
+        try:
+            async for ev in review(dispatcher, handle, game, req.depth, req.nodes, movetime):
+                yield sse(ev)
+            yield SSE_DONE
+            print("[ENGINE] review: done", flush=True)
+        finally:
+            dispatcher.close_search(handle)
 
     return StreamingResponse(gen(), media_type="text/event-stream")
 
 @app.on_event("shutdown")
 async def _shutdown():
-    print("[DBG] app shutdown: stopping bridge", flush=True)
-    await bridge.stop()
+    print("[DBG] app shutdown: stopping workers", flush=True)
+    await dispatcher.close()
+    await launcher.shutdown()
     print("[DBG] app shutdown: done", flush=True)
\ No newline at end of file
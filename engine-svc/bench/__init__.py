@@ -0,0 +1,2 @@
+# Path: engine-svc/bench/__init__.py
+"""Offline benchmarks and correctness checks; run from engine-svc/ as `python -m bench.<name>`."""
@@ -0,0 +1,98 @@
+# Path: engine-svc/bench/batch_eval_bench.py
+"""
+Batch evaluation check + throughput benchmark.
+
+Usage (from engine-svc/):
+  python -m bench.batch_eval_bench                 # 20k random positions
+  python -m bench.batch_eval_bench --positions 200000
+
+Positions come from seeded random playouts. For the check, PSTs are filled with
+random values (the shipped tables may be flat), and every batch path must
+match ab_engine.material_pst() exactly. Exits non-zero on any mismatch.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+
+import chess
+
+from engines import ab_engine
+from engines import batch_eval
+
+def random_positions(n: int, seed: int = 1) -> list:
+    rng = random.Random(seed)
+    boards = []
+    while len(boards) < n:
+        b = chess.Board()
+        for _ in range(rng.randint(4, 120)):
+            moves = list(b.legal_moves)
+            if not moves:
+                break
+            b.push(rng.choice(moves))
+            if rng.random() < 0.2:
+                boards.append(b.copy(stack=False))
+    return boards[:n]
+
+def check(boards, seed: int = 2) -> int:
+    rng = random.Random(seed)
+    saved = {pt: list(v) for pt, v in ab_engine.PSTS.items()}
+    try:
+        for pt in ab_engine.PSTS:
+            ab_engine.PSTS[pt] = [rng.randint(-50, 50) for _ in range(64)]
+        ref = [ab_engine.material_pst(b) for b in boards]
+        ref_stm = [r if b.turn == chess.WHITE else -r for r, b in zip(ref, boards)]
+        fens = [b.fen() for b in boards]
+
+        by_fen = batch_eval.evaluate_fens(fens)
+        bbs, stm = batch_eval.bitboards_from_boards(boards)
+        by_bb = batch_eval.evaluate_bitboards(bbs, stm, chunk=4096)
+        by_white = batch_eval.evaluate_fens(fens, side_to_move=False)
+        bbs_f, _ = batch_eval.bitboards_from_fens(fens)
+    finally:
+        ab_engine.PSTS.update(saved)
+
+    failures = 0
+    for name, got, want in (("fens", by_fen, ref_stm), ("bitboards", by_bb, ref_stm), ("white-view", by_white, ref)):
+        bad = sum(1 for g, r in zip(got.tolist(), want) if g != r)
+        print(f"check {name:10}: {len(want) - bad}/{len(want)} match")
+        failures += bad
+    if (bbs_f != bbs).any():
+        print("check packing : bitboards_from_fens != bitboards_from_boards")
+        failures += 1
+    return failures
+
+def bench(boards) -> None:
+    n = len(boards)
+    fens = [b.fen() for b in boards]
+    bbs, stm = batch_eval.bitboards_from_boards(boards)
+
+    def rate(label, fn, count=n):
+        t0 = time.perf_counter()
+        fn()
+        dt = time.perf_counter() - t0
+        print(f"{label:32} {count / dt:12,.0f} pos/s  ({dt:.3f}s)")
+
+    rate("scalar material_pst()", lambda: [ab_engine.material_pst(b) for b in boards])
+    sample = boards[: max(1, n // 10)]
+    rate("scalar evaluate() (full)", lambda: [ab_engine.evaluate(b) for b in sample], len(sample))
+    rate("batch evaluate_fens()", lambda: batch_eval.evaluate_fens(fens))
+    rate("batch evaluate_bitboards()", lambda: batch_eval.evaluate_bitboards(bbs, stm))
+    planes = batch_eval.unpack_bitboards(bbs)
+    rate("batch evaluate_planes()", lambda: batch_eval.evaluate_planes(planes, stm))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch evaluation check and throughput benchmark")
+    parser.add_argument("--positions", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    boards = random_positions(args.positions, args.seed)
+    failures = check(boards)
+    bench(boards)
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# Path: engine-svc/bench/iid_check.py
+"""
+Internal iterative deepening (IID) check for the Python engine.
+
+Usage (from engine-svc/):
+  python -m bench.iid_check              # depth 5, every position
+  python -m bench.iid_check --depth 6
+  python -m bench.iid_check --warm       # normal search, for comparison
+
+In a normal search IID hardly ever runs: nodes on the previous iteration's PV
+take their first move from it, and every other PV node is a re-search after a
+zero-window search that already left a TT move. Here the TT and the previous
+PV are dropped after every iteration, so each iteration searches its PV
+cold. Its PV nodes from IID_MIN_DEPTH on get their first move from IID.
+
+Per position and iteration it reads SearchStats.iid (IID searches) and
+iid_moves (those that left a best move in the TT). Exits non-zero if a
+search does not reach the requested depth, returns an illegal move, an IID
+search leaves no move, or IID never runs at all.
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import sys
+import time
+
+import chess
+
+from engines import ab_engine
+from engines.ab_engine import IID_MIN_DEPTH, Search, SearchStats
+
+POSITIONS = [
+    ("italian", "r1bqkbnr/pppp1ppp/2n5/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R b KQkq - 3 3"),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"),
+    ("pos6", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10"),
+    ("endgame", "2r3k1/pp3ppp/2n1b3/3p4/3P4/2N1B3/PP3PPP/2R3K1 w - - 0 20"),
+    ("najdorf", "rnbqkb1r/pp2pppp/3p1n2/8/3NP3/8/PPP2PPP/RNBQKB1R w KQkq - 1 5"),
+    ("pawns", "8/5pk1/6p1/3P4/5P2/6PK/8/8 w - - 0 40"),
+]
+
+
+def check(fen: str, depth: int, cold: bool):
+    """(depth reached, best move, iid, iid_moves, nodes, seconds) of one search."""
+    board = chess.Board(fen)
+    s = Search()
+    s.stats = SearchStats()
+    reached, best, iid, iid_moves = 0, None, 0, 0
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):      # info lines
+        for best in s.search(board.copy(), depth):
+            reached += 1
+            iid += s.stats.iid
+            iid_moves += s.stats.iid_moves
+            if cold:
+                s.tt.table.clear()
+                s._prev_pv = []
+    return reached, best, iid, iid_moves, s.nodes, time.perf_counter() - t0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check that IID runs and leaves a TT move")
+    parser.add_argument("--depth", type=int, default=5, help=f"search depth (IID needs >= {IID_MIN_DEPTH})")
+    parser.add_argument("--warm", action="store_true", help="keep TT and PV between iterations (normal search)")
+    args = parser.parse_args(argv)
+    ab_engine.DEBUG = False
+
+    failures = total_iid = 0
+    print(f"{'position':10} {'d':>2} {'best':6} {'iid':>5} {'w/ move':>7} {'nodes':>8} {'time s':>7}  check")
+    for name, fen in POSITIONS:
+        reached, best, iid, iid_moves, nodes, secs = check(fen, args.depth, not args.warm)
+        problems = []
+        if reached < args.depth:
+            problems.append(f"stopped at depth {reached}")
+        if best is None or best not in chess.Board(fen).legal_moves:
+            problems.append(f"bad best move {best}")
+        if iid_moves < iid:
+            problems.append(f"{iid - iid_moves} IID search(es) left no move")
+        failures += bool(problems)
+        total_iid += iid
+        uci = best.uci() if best else "-"
+        print(f"{name:10} {reached:>2} {uci:6} {iid:>5} {iid_moves:>7} {nodes:>8} {secs:>7.2f}  "
+              f"{'; '.join(problems) or 'ok'}")
+    if not total_iid and not args.warm:
+        print(f"FAIL: IID never ran (depth {args.depth}, IID_MIN_DEPTH {IID_MIN_DEPTH})")
+        failures += 1
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,417 @@
+# Path: engine-svc/bench/loadtest.py
+"""
+Load test for the two services: concurrent clients against game-svc
+(create game + move loop) and engine-svc SSE streams (/engines/think,
+/engines/selfplay), at one or more concurrency levels. Reports a JSON summary.
+
+Usage (from engine-svc/):
+  python -m bench.loadtest                                     # instant stub engine, 10 and 100 clients
+  python -m bench.loadtest --clients 10,100,1000 --duration 20
+  python -m bench.loadtest --engine ab --depth 3 --workers 2 --mix think
+  python -m bench.loadtest --engine-url http://127.0.0.1:8001 --game-url http://127.0.0.1:8000
+
+Without --engine-url / --game-url both services are started here with uvicorn
+on free ports (engine-svc with UCI_ENGINE_CMD="python uci_main.py --engine
+<--engine>" and ENGINE_WORKERS=local*<--workers>); their logs go to --log-dir.
+`--engine instant` (engines/instant_engine.py) answers every `go` at once, so
+the numbers are the bridge / dispatcher / SSE path alone; INSTANT_ENGINE_DELAY_MS
+models a fixed think time.
+
+Clients (client i runs scenario mix[i % len(mix)] in a loop until the level ends):
+  games     POST /api/games, then random legal moves (with `version`) until the
+            game is over or --moves plies, then a new game; one op = one request
+  think     GET /engines/think on a random position; ttfe = first SSE event
+            (the search id), bestmove = time to the bestmove event
+  selfplay  GET /engines/selfplay; reads --plies bestmoves, then hangs up (which
+            stops the search server-side); ply = time between bestmoves
+
+Per level and scenario: ops, throughput, errors, timeouts (--timeout per op),
+p50/p95/p99 latencies in ms; per level: engine restarts (from /engines/workers,
+local workers only). Exits non-zero if a level's error + timeout rate is above
+--max-error-rate or the services do not come up.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import shlex
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+
+ENGINE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GAME_DIR = os.path.join(os.path.dirname(ENGINE_DIR), "game-svc")
+STARTUP_TIMEOUT_S = 30.0
+RAMP_S = 1.0                  # client start times are spread over this window
+
+FENS = [
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+    "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3",
+    "r1bqk2r/pppp1ppp/2n2n2/2b1p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 5",
+    "r2q1rk1/ppp2ppp/2np1n2/2b1p1B1/2B1P1b1/2NP1N2/PPP2PPP/R2Q1RK1 w - - 2 8",
+    "8/5pk1/6p1/8/3R4/6P1/5PKP/3r4 b - - 0 40",
+]
+
+
+class Stats:
+    """Counters and latency samples (seconds) for one scenario at one level."""
+
+    def __init__(self):
+        self.ops = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.samples: Dict[str, List[float]] = {}
+        self.last_error: Optional[str] = None
+
+    def add(self, name: str, seconds: float) -> None:
+        self.samples.setdefault(name, []).append(seconds)
+
+    def error(self, msg: str) -> None:
+        self.errors += 1
+        self.last_error = msg
+
+    def report(self, elapsed: float) -> Dict:
+        d = {"ops": self.ops, "throughput_per_s": round(self.ops / elapsed, 1) if elapsed else 0.0,
+             "errors": self.errors, "timeouts": self.timeouts}
+        for name, xs in self.samples.items():
+            d[f"{name}_ms"] = percentiles(xs)
+        if self.last_error:
+            d["last_error"] = self.last_error
+        return d
+
+
+def percentiles(xs: List[float]) -> Dict:
+    if not xs:
+        return {"n": 0}
+    ms = sorted(x * 1000 for x in xs)
+    pick = lambda q: round(ms[min(len(ms) - 1, int(len(ms) * q))], 2)
+    return {"n": len(ms), "p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99), "max": round(ms[-1], 2)}
+
+
+# ————— HTTP —————
+# HTTP/1.0 like dispatcher.RemoteWorker: bodies (SSE included) arrive unchunked
+# and end when the server closes the connection.
+
+class HttpError(Exception):
+    pass
+
+
+async def _open(base: str, method: str, path: str, body: Optional[Dict] = None):
+    u = urlsplit(base)
+    host, port = u.hostname or "127.0.0.1", u.port or 80
+    reader, writer = await asyncio.open_connection(host, port)
+    data = json.dumps(body).encode() if body is not None else b""
+    head = f"{method} {u.path.rstrip('/')}{path} HTTP/1.0\r\nHost: {host}\r\nContent-Length: {len(data)}\r\n"
+    if body is not None:
+        head += "Content-Type: application/json\r\n"
+    writer.write(head.encode("ascii") + b"\r\n" + data)
+    await writer.drain()
+    status = await reader.readline()
+    parts = status.split()
+    code = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 0
+    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+        pass   # headers
+    return code, reader, writer
+
+
+async def request_json(base: str, method: str, path: str, body: Optional[Dict] = None) -> Tuple[int, Dict]:
+    code, reader, writer = await _open(base, method, path, body)
+    try:
+        raw = await reader.read()
+    finally:
+        writer.close()
+    try:
+        return code, json.loads(raw) if raw else {}
+    except ValueError:
+        return code, {"raw": raw[:200].decode("utf-8", "replace")}
+
+
+async def sse_events(reader: asyncio.StreamReader):
+    while True:
+        line = await reader.readline()
+        if not line:
+            return
+        if line.startswith(b"data: "):
+            yield json.loads(line[6:])
+
+
+# ————— scenarios —————
+
+class Level:
+    def __init__(self, args, clients: int):
+        self.args = args
+        self.clients = clients
+        self.deadline = 0.0
+        self.stats = {name: Stats() for name in ("games", "think", "selfplay")}
+
+    def running(self) -> bool:
+        return time.perf_counter() < self.deadline
+
+
+async def _timed(st: Stats, coro, timeout: float):
+    try:
+        return await asyncio.wait_for(coro, timeout)
+    except asyncio.TimeoutError:
+        st.timeouts += 1
+    except (OSError, HttpError, ValueError) as e:
+        st.error(f"{type(e).__name__}: {e}")
+    return None
+
+
+async def client_games(lv: Level, rng: random.Random) -> None:
+    st, a = lv.stats["games"], lv.args
+
+    async def call(method, path, body=None):
+        t0 = time.perf_counter()
+        code, state = await request_json(a.game_url, method, path, body)
+        if code != 200:          # 409 included: one client per game never races itself
+            raise HttpError(f"HTTP {code} {state}")
+        st.add("request", time.perf_counter() - t0)
+        st.ops += 1
+        return state
+
+    while lv.running():
+        state = await _timed(st, call("POST", "/api/games", {"mode": "HUMAN_VS_HUMAN"}), a.timeout)
+        plies = 0
+        while state and not state["over"] and plies < a.moves and lv.running():
+            m = rng.choice(state["legalMoves"])
+            body = {"from": m[:2], "to": m[2:4], "version": state["version"]}
+            if len(m) > 4:
+                body["promotion"] = m[4]
+            state = await _timed(st, call("POST", f"/api/games/{state['gameId']}/move", body), a.timeout)
+            plies += 1
+
+
+async def _think_once(lv: Level, st: Stats, fen: str) -> None:
+    a = lv.args
+    t0 = time.perf_counter()
+    code, reader, writer = await _open(a.engine_url, "GET", "/engines/think?" + urlencode({"fen": fen, "depth": a.depth}))
+    try:
+        if code != 200:
+            raise HttpError(f"HTTP {code}")
+        first = True
+        async for msg in sse_events(reader):
+            if first:
+                st.add("ttfe", time.perf_counter() - t0)
+                first = False
+            kind = msg.get("type")
+            if kind == "bestmove":
+                st.add("bestmove", time.perf_counter() - t0)
+                st.ops += 1
+                return
+            if kind == "error" or "error" in msg:
+                raise HttpError(f"engine error: {msg.get('error')}")
+            if kind == "done":
+                raise HttpError("stream done without bestmove")
+        raise HttpError("stream ended without bestmove")
+    finally:
+        writer.close()
+
+
+async def client_think(lv: Level, rng: random.Random) -> None:
+    st = lv.stats["think"]
+    while lv.running():
+        await _timed(st, _think_once(lv, st, rng.choice(FENS)), lv.args.timeout)
+
+
+async def _selfplay_once(lv: Level, st: Stats, fen: str) -> None:
+    a = lv.args
+    q = {"fen": fen, "whiteDepth": a.depth, "blackDepth": a.depth}
+    t0 = time.perf_counter()
+    code, reader, writer = await _open(a.engine_url, "GET", "/engines/selfplay?" + urlencode(q))
+    try:
+        if code != 200:
+            raise HttpError(f"HTTP {code}")
+        first, plies, last = True, 0, t0
+        async for msg in sse_events(reader):
+            now = time.perf_counter()
+            if first:
+                st.add("ttfe", now - t0)
+                first = False
+            kind = msg.get("type")
+            if kind == "bestmove":
+                st.add("ply", now - last)
+                last = now
+                plies += 1
+                if plies >= a.plies:
+                    break
+            elif kind == "error" or "error" in msg:
+                raise HttpError(f"engine error: {msg.get('error')}")
+            elif kind == "done":
+                break         # game over before --plies
+        if plies == 0:
+            raise HttpError("selfplay ended without a move")
+        st.ops += 1
+    finally:
+        writer.close()        # hanging up stops the selfplay server-side
+
+
+async def client_selfplay(lv: Level, rng: random.Random) -> None:
+    st = lv.stats["selfplay"]
+    while lv.running():
+        await _timed(st, _selfplay_once(lv, st, rng.choice(FENS)), lv.args.timeout)
+
+
+SCENARIOS = {"games": client_games, "think": client_think, "selfplay": client_selfplay}
+
+
+async def engine_restarts(engine_url: str) -> int:
+    try:
+        code, body = await asyncio.wait_for(request_json(engine_url, "GET", "/engines/workers"), 5.0)
+    except (OSError, asyncio.TimeoutError, ValueError):
+        return 0
+    return sum(w.get("restarts", 0) for w in body.get("workers", [])) if code == 200 else 0
+
+
+async def run_level(args, clients: int, mix: List[str]) -> Dict:
+    lv = Level(args, clients)
+    restarts0 = await engine_restarts(args.engine_url)
+
+    async def one(i: int):
+        rng = random.Random(args.seed * 100_003 + i)
+        await asyncio.sleep(rng.random() * min(RAMP_S, args.duration / 4))
+        await SCENARIOS[mix[i % len(mix)]](lv, rng)
+
+    t0 = time.perf_counter()
+    lv.deadline = t0 + args.duration
+    await asyncio.gather(*(one(i) for i in range(clients)))
+    elapsed = time.perf_counter() - t0
+    used = set(mix)
+    out = {"clients": clients, "elapsed_s": round(elapsed, 2),
+           "scenarios": {k: st.report(elapsed) for k, st in lv.stats.items() if k in used},
+           "engine_restarts": await engine_restarts(args.engine_url) - restarts0}
+    ops = sum(s["ops"] for s in out["scenarios"].values())
+    bad = sum(s["errors"] + s["timeouts"] for s in out["scenarios"].values())
+    out["error_rate"] = round(bad / max(1, ops + bad), 4)
+    return out
+
+
+# ————— local services —————
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_service(name: str, cwd: str, env: Dict[str, str], log_dir: str) -> Tuple[subprocess.Popen, str]:
+    port = _free_port()
+    os.makedirs(log_dir, exist_ok=True)
+    log = open(os.path.join(log_dir, f"{name}.log"), "wb")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--port", str(port), "--log-level", "warning",
+         "--no-access-log", "--backlog", "4096"],
+        cwd=cwd, env={**os.environ, **env}, stdout=log, stderr=subprocess.STDOUT)
+    return proc, f"http://127.0.0.1:{port}"
+
+
+async def wait_healthy(url: str, proc: subprocess.Popen) -> None:
+    deadline = time.perf_counter() + STARTUP_TIMEOUT_S
+    while time.perf_counter() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{url}: server exited with {proc.returncode}")
+        try:
+            code, _ = await request_json(url, "GET", "/health")
+            if code in (200, 404):   # game-svc has no /health; any answer means it is up
+                return
+        except OSError:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError(f"{url}: not up after {STARTUP_TIMEOUT_S:.0f}s")
+
+
+async def run(args) -> int:
+    procs: List[subprocess.Popen] = []
+    try:
+        if not args.engine_url:
+            env = {"UCI_ENGINE_CMD": f"{shlex.quote(sys.executable)} uci_main.py --engine {args.engine}",
+                   "ENGINE_WORKERS": ",".join(["local"] * args.workers),
+                   "ENGINE_ZYGOTE_PRELOAD": args.engine}
+            proc, args.engine_url = start_service("engine-svc", ENGINE_DIR, env, args.log_dir)
+            procs.append(proc)
+            await wait_healthy(args.engine_url, proc)
+        if not args.game_url:
+            proc, args.game_url = start_service("game-svc", GAME_DIR, {}, args.log_dir)
+            procs.append(proc)
+            await wait_healthy(args.game_url, proc)
+        # engines start lazily: one think per worker so spawn time is not in the first level
+        for _ in range(args.workers):
+            await _think_once(Level(args, 0), Stats(), FENS[0])
+        print(f"engine-svc {args.engine_url}  game-svc {args.game_url}  logs {args.log_dir}", file=sys.stderr)
+
+        mix = [m.strip() for m in args.mix.split(",") if m.strip()]
+        report = {"config": {"engine": args.engine, "workers": args.workers, "depth": args.depth,
+                             "mix": mix, "duration_s": args.duration, "timeout_s": args.timeout,
+                             "moves": args.moves, "plies": args.plies,
+                             "instant_delay_ms": int(os.getenv("INSTANT_ENGINE_DELAY_MS", "0"))},
+                  "levels": []}
+        failed = 0
+        for clients in args.clients:
+            lv = await run_level(args, clients, mix)
+            report["levels"].append(lv)
+            summary = "  ".join(f"{k} {s['throughput_per_s']}/s" for k, s in lv["scenarios"].items())
+            print(f"clients={clients:<5} {summary}  error_rate={lv['error_rate']}  "
+                  f"restarts={lv['engine_restarts']}", file=sys.stderr)
+            failed += lv["error_rate"] > args.max_error_rate
+    except (OSError, RuntimeError, HttpError, asyncio.TimeoutError) as e:
+        print(f"FAIL {type(e).__name__}: {e}", file=sys.stderr)
+        return 1
+    finally:
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            try:
+                proc.wait(10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent-client load test for engine-svc and game-svc")
+    parser.add_argument("--clients", default="10,100", help="comma list of concurrency levels")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per level")
+    parser.add_argument("--mix", default="games,think,selfplay", help="comma list: games, think, selfplay")
+    parser.add_argument("--engine", default="instant", help="engine for a locally started engine-svc (instant, ab, ...)")
+    parser.add_argument("--workers", type=int, default=1, help="local engine workers (ENGINE_WORKERS=local*N)")
+    parser.add_argument("--depth", type=int, default=2, help="search depth for think/selfplay")
+    parser.add_argument("--moves", type=int, default=40, help="plies per game-svc game")
+    parser.add_argument("--plies", type=int, default=6, help="bestmoves read per selfplay stream")
+    parser.add_argument("--timeout", type=float, default=30.0, help="seconds per op (a whole selfplay stream is one op)")
+    parser.add_argument("--engine-url", help="use this engine-svc instead of starting one")
+    parser.add_argument("--game-url", help="use this game-svc instead of starting one")
+    parser.add_argument("--log-dir", default=None, help="server logs (default: a temp dir)")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="also write the JSON report here")
+    args = parser.parse_args(argv)
+    args.clients = [int(c) for c in args.clients.split(",") if c.strip()]
+    unknown = set(m.strip() for m in args.mix.split(",") if m.strip()) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(sorted(unknown))}")
+    args.log_dir = args.log_dir or tempfile.mkdtemp(prefix="loadtest-")
+    # one socket per in-flight request, plus the servers' side when they run here
+    _soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    try:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    except (ValueError, OSError):
+        pass
+    sys.exit(1 if asyncio.run(run(args)) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+# Path: engine-svc/bench/perft_bench.py
+"""
+Perft correctness suite + move-generation benchmark.
+
+Usage (from engine-svc/):
+  python -m bench.perft_bench                          # python-chess, depth 3, all positions
+  python -m bench.perft_bench --depth 4 --impl python-chess,uci-python,rust
+  python -m bench.perft_bench --full                   # play every leaf (no bulk counting)
+  python -m bench.perft_bench --fen "<fen>" --depth 3 --divide
+
+Implementations (--impl, comma separated, run side by side):
+  python-chess   engines/perft.py in this process
+  uci-python     the Python engine's `perft` command over UCI (uci_main.py --engine ab)
+  rust           the Rust engine's `perft` command (--rust-bin / $RUST_ENGINE_BIN)
+Another position type (e.g. a native Python board replacing python-chess in
+Search) plugs in by adding a `(fen, depth, bulk) -> (nodes, seconds)` entry to
+IMPLS; its counts are checked against the same table.
+
+Expected counts are the standard perft results (chessprogramming.org).
+Exits non-zero if any implementation disagrees.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import shlex
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import chess
+
+from engines.perft import divide, perft
+
+ENGINE_SVC = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_RUST_BIN = os.path.join(ENGINE_SVC, "engines", "ab_engine_rust", "target", "release", "pyrefengine")
+
+# (name, fen, leaf counts for depth 1, 2, ...)
+PERFT_POSITIONS = [
+    ("startpos", chess.STARTING_FEN,
+     [20, 400, 8902, 197281, 4865609, 119060324]),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+     [48, 2039, 97862, 4085603, 193690690]),
+    ("pos3", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+     [14, 191, 2812, 43238, 674624, 11030083]),
+    ("pos4", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+     [6, 264, 9467, 422333, 15833292]),
+    ("pos5", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+     [44, 1486, 62379, 2103487, 89941194]),
+    ("pos6", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+     [46, 2079, 89890, 3894594, 164075551]),
+]
+
+PerftFn = Callable[[str, int, bool], Tuple[int, float]]
+
+
+def _python_chess(fen: str, depth: int, bulk: bool) -> Tuple[int, float]:
+    board = chess.Board(fen)
+    t0 = time.perf_counter()
+    nodes = perft(board, depth, bulk)
+    return nodes, time.perf_counter() - t0
+
+
+class UciPerft:
+    """An engine process answering `perft <depth>`; time is the engine's own `info string perft ... time`."""
+
+    def __init__(self, cmd: str):
+        self.cmd = cmd
+        self.proc: Optional[subprocess.Popen] = None
+
+    def _start(self) -> subprocess.Popen:
+        if self.proc is None:
+            self.proc = subprocess.Popen(shlex.split(self.cmd), cwd=ENGINE_SVC, stdin=subprocess.PIPE,
+                                         stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, bufsize=1)
+        return self.proc
+
+    def __call__(self, fen: str, depth: int, bulk: bool) -> Tuple[int, float]:
+        p = self._start()
+        p.stdin.write(f"position fen {fen}\nperft {depth}{'' if bulk else ' full'}\n")
+        p.stdin.flush()
+        for line in p.stdout:
+            toks = line.split()
+            if toks[:3] == ["info", "string", "perft"] and "nodes" in toks:
+                kv = dict(zip(toks[3::2], toks[4::2]))
+                return int(kv["nodes"]), int(kv["time"]) / 1000.0
+        raise RuntimeError(f"'{self.cmd}' exited without a perft result")
+
+    def close(self) -> None:
+        if self.proc is not None:
+            try:
+                self.proc.stdin.write("quit\n")
+                self.proc.stdin.flush()
+                self.proc.wait(timeout=2)
+            except Exception:
+                self.proc.kill()
+            self.proc = None
+
+
+def make_impls(names: List[str], rust_bin: str) -> Dict[str, PerftFn]:
+    impls: Dict[str, PerftFn] = {}
+    for name in names:
+        if name == "python-chess":
+            impls[name] = _python_chess
+        elif name == "uci-python":
+            impls[name] = UciPerft(f"{shlex.quote(sys.executable)} uci_main.py --engine ab")
+        elif name == "rust":
+            if not os.path.exists(rust_bin):
+                sys.exit(f"rust engine not found at {rust_bin} (cargo build --release, or --rust-bin)")
+            impls[name] = UciPerft(shlex.quote(rust_bin))
+        else:
+            sys.exit(f"unknown implementation '{name}'")
+    return impls
+
+
+def run_suite(impls: Dict[str, PerftFn], positions, depth: int, bulk: bool) -> int:
+    failures = 0
+    totals = {name: [0, 0.0] for name in impls}
+    print(f"{'position':10} {'d':>2} {'impl':13} {'nodes':>12} {'time s':>8} {'Mnps':>7}  check")
+    for name, fen, counts in positions:
+        d = min(depth, len(counts)) if counts else depth
+        expected = counts[d - 1] if counts and d >= 1 else None
+        for impl, fn in impls.items():
+            nodes, secs = fn(fen, d, bulk)
+            totals[impl][0] += nodes
+            totals[impl][1] += secs
+            ok = expected is None or nodes == expected
+            failures += not ok
+            verdict = "-" if expected is None else ("ok" if ok else f"FAIL expected {expected}")
+            print(f"{name:10} {d:>2} {impl:13} {nodes:>12} {secs:>8.3f} {nodes / max(secs, 1e-9) / 1e6:>7.2f}  {verdict}")
+    for impl, (nodes, secs) in totals.items():
+        print(f"total {impl:13} {nodes} leaf nodes in {secs:.3f}s  ({nodes / max(secs, 1e-9):,.0f} nodes/s)")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Perft correctness suite and move-generation benchmark")
+    parser.add_argument("--depth", type=int, default=3, help="perft depth (capped at the known counts per position)")
+    parser.add_argument("--impl", default="python-chess", help="comma list: python-chess, uci-python, rust")
+    parser.add_argument("--full", action="store_true", help="play every leaf move instead of bulk counting")
+    parser.add_argument("--fen", help="run only this position (no expected count)")
+    parser.add_argument("--divide", action="store_true", help="with --fen: per-root-move counts (python-chess)")
+    parser.add_argument("--rust-bin", default=os.getenv("RUST_ENGINE_BIN", DEFAULT_RUST_BIN))
+    args = parser.parse_args(argv)
+    bulk = not args.full
+
+    if args.fen and args.divide:
+        rows = divide(chess.Board(args.fen), args.depth, bulk)
+        for uci, n in sorted(rows):
+            print(f"{uci}: {n}")
+        print(f"\nNodes searched: {sum(n for _, n in rows)}")
+        return
+
+    impls = make_impls([s.strip() for s in args.impl.split(",") if s.strip()], args.rust_bin)
+    positions = [("fen", args.fen, [])] if args.fen else PERFT_POSITIONS
+    try:
+        failures = run_suite(impls, positions, args.depth, bulk)
+    finally:
+        for fn in impls.values():
+            if isinstance(fn, UciPerft):
+                fn.close()
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# Path: engine-svc/bench/see_bench.py
+"""
+SEE correctness suite + timing benchmark.
+
+Usage (from engine-svc/):
+  python -m bench.see_bench              # check known positions, then time
+  python -m bench.see_bench --iters 20   # more timing iterations
+
+Expected values use the engine's material scale (P=100 N=320 B=330 R=500 Q=900).
+Exits non-zero if any position disagrees.
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+
+import chess
+
+from engines.see import SEECache, see
+
+# (fen, move, expected see) — classic SEE test positions
+SEE_CASES = [
+    ("1k1r4/1pp4p/p7/4p3/8/P5P1/1PP4P/2K1R3 w - - 0 1", "e1e5", 100),                       # R takes free P
+    ("1k1r3q/1ppn3p/p4b2/4p3/8/P2N2P1/1PP1R1BP/2K1Q3 w - - 0 1", "d3e5", -220),             # P - N (x-ray Q behind B)
+    ("1k1r4/1ppn3p/p4b2/4n3/8/P2N2P1/1PP1R1BP/2K1Q3 w - - 0 1", "d3e5", 150),               # N - N + B - R + N
+    ("4R3/2r3p1/5bk1/1p1r3p/p2PR1P1/P1BK1P2/1P6/8 b - - 0 1", "h5g4", 0),
+    ("4R3/2r3p1/5bk1/1p1r1p1p/p2PR1P1/P1BK1P2/1P6/8 b - - 0 1", "h5g4", 0),
+    ("4r1k1/5pp1/nbp4p/1p2p2q/1P2P1b1/1BP2N1P/1B2QPPK/3R4 b - - 0 1", "g4f3", -10),         # N - B
+    ("2r1r1k1/pp1bppbp/3p1np1/q3P3/2P2P2/1P2B3/P1N1B1PP/2RQ1RK1 b - - 0 1", "d6e5", 100),
+    ("7r/5qpk/p1Qp1b1p/3r3n/BB3p2/5p2/P1P2P2/4RK1R w - - 0 1", "e1e8", 0),                   # quiet move
+    ("6rr/6pk/p1Qp1b1p/2n5/1B3p2/5p2/P1P2P2/4RK1R w - - 0 1", "e1e8", -500),                 # quiet, hangs R
+    ("7r/5qpk/2Qp1b1p/1N1r3n/BB3p2/5p2/P1P2P2/4RK1R w - - 0 1", "e1e8", -500),
+    ("6RR/4bP2/8/8/5r2/3K4/5p2/4k3 w - - 0 1", "f7f8q", 230),                                # promotion, B - P
+    ("6RR/4bP2/8/8/5r2/3K4/5p2/4k3 w - - 0 1", "f7f8n", 220),
+    ("7R/5P2/8/8/6r1/3K4/5p2/4k3 w - - 0 1", "f7f8q", 800),
+    ("7R/5P2/8/8/6r1/3K4/5p2/4k3 w - - 0 1", "f7f8b", 230),
+    ("7R/4bP2/8/8/1q6/3K4/5p2/4k3 w - - 0 1", "f7f8r", -100),
+    ("8/4kp2/2npp3/1Nn5/1p2PQP1/7q/1PP1B3/4KR1r b - - 0 1", "h1f1", 0),
+    ("8/4kp2/2npp3/1Nn5/1p2P1P1/7q/1PP1B3/4KR1r b - - 0 1", "h1f1", 0),
+    ("2r2r1k/6bp/p7/2q2p1Q/3PpP2/1B6/P5PP/2RR3K b - - 0 1", "c5c1", 100),                    # Q - R... battery
+    ("r2qk1nr/pp2ppbp/2b3p1/2p1p3/8/2N2N2/PPPP1PPP/R1BQR1K1 w kq - 0 1", "f3e5", 100),
+    ("6r1/4kq2/b2p1p2/p1pPb3/p1P2B1Q/2P4P/2B1R1P1/6K1 w - - 0 1", "f4e5", 0),               # pins ignored
+    ("3q2nk/pb1r1p2/np6/3P2Pp/2p1P3/2R4B/PQ3P1P/3R2K1 w - h6 0 1", "g5h6", 0),              # en passant
+    ("3q2nk/pb1r1p2/np6/3P2Pp/2p1P3/2R1B2B/PQ3P1P/3R2K1 w - h6 0 1", "g5h6", 100),
+    ("2r4r/1P4pk/p2p1b1p/7n/BB3p2/2R2p2/P1P2P2/4RK2 w - - 0 1", "c3c8", 500),
+    ("2r5/1P4pk/p2p1b1p/5b1n/BB3p2/2R2p2/P1P2P2/4RK2 w - - 0 1", "c3c8", 500),               # recapture would promote
+    ("2r4k/2r4p/p7/2b2p1b/4pP2/1BR5/P1R3PP/2Q4K w - - 0 1", "c3c5", 330),
+    ("8/pp6/2pkp3/4bp2/2R3b1/2P5/PP4B1/1K6 w - - 0 1", "g2c6", -230),                        # P - B
+    ("4q3/1p1pr1k1/1B2rp2/6p1/p3PP2/P3R1P1/1P2R1K1/4Q3 b - - 0 1", "e6e4", -400),            # P - R
+    ("4q3/1p1pr1kb/1B2rp2/6p1/p3PP2/P3R1P1/1P2R1K1/4Q3 b - - 0 1", "h7e4", 100),
+    ("3r3k/3r4/2n1n3/8/3p4/2PR4/1B1Q4/3R3K w - - 0 1", "d3d4", -90),                         # long sequence
+    ("5rk1/1pp2q1p/p1pb4/8/3P1NP1/2P5/1P1BQ1P1/5RK1 b - - 0 1", "d6f4", -10),
+    ("5rk1/1pp2q1p/p1pb4/8/3P1NP1/2P5/1P1BQ1P1/5RK1 b - - 0 1", "f7f4", -250),
+    ("rnbqk2r/pp3ppp/2p1pn2/3p4/3P4/N1P1BN2/PPB1PPPb/R2Q1RK1 w kq - 0 1", "g1h2", 330),      # king takes undefended
+    ("3N4/2K5/2n5/1k6/8/8/8/8 b - - 0 1", "c6d8", 0),                                        # king recapture
+    ("3n3r/2P5/8/1k6/8/8/3Q4/4K3 w - - 0 1", "c7d8q", 720),
+    ("r2n3r/2P1P3/4N3/1k6/8/8/8/4K3 w - - 0 1", "e6d8", 320),
+    ("8/8/8/1k6/6b1/4N3/2p3K1/3n4 w - - 0 1", "e3d1", -800),                                 # recapture promotes
+    ("8/8/1k6/8/8/2N1N3/4p1K1/3n4 w - - 0 1", "c3d1", 100),
+    ("r1bqk1nr/pppp1ppp/2n5/1B2p3/1b2P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 0 1", "e1g1", 0),     # castling
+]
+
+# Positions for the timing loop (every capture is evaluated)
+BENCH_FENS = [
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+    "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+    "3r3k/3r4/2n1n3/8/3p4/2PR4/1B1Q4/3R3K w - - 0 1",
+    "r1b1kb1r/ppp2ppp/2n5/3qp3/8/2N2N2/PPPP1PPP/R1BQKB1R w KQkq - 0 6",
+]
+
+def check() -> int:
+    failures = 0
+    for fen, uci, expected in SEE_CASES:
+        board = chess.Board(fen)
+        move = chess.Move.from_uci(uci)
+        if move not in board.legal_moves:
+            print(f"ILLEGAL {uci} in {fen}")
+            failures += 1
+            continue
+        got = see(board, move)
+        if got != expected:
+            print(f"FAIL {uci:6} expected {expected:5} got {got:5}  {fen}")
+            failures += 1
+    print(f"see check: {len(SEE_CASES) - failures}/{len(SEE_CASES)} ok")
+    return failures
+
+def bench(iters: int) -> None:
+    work = []
+    for fen in BENCH_FENS:
+        board = chess.Board(fen)
+        work.append((board, list(board.generate_legal_captures())))
+    n_calls = sum(len(caps) for _, caps in work) * iters
+
+    t0 = time.perf_counter()
+    for _ in range(iters):
+        for board, caps in work:
+            for m in caps:
+                see(board, m)
+    dt = time.perf_counter() - t0
+    print(f"see():        {n_calls} calls in {dt:.3f}s  ({dt / n_calls * 1e6:.2f} us/call)")
+
+    cache = SEECache()
+    keys = [hash(board.fen()) for board, _ in work]
+    t0 = time.perf_counter()
+    for _ in range(iters):
+        for (board, caps), key in zip(work, keys):
+            for m in caps:
+                cache.see(board, m, key)
+    dt = time.perf_counter() - t0
+    print(f"SEECache.see: {n_calls} calls in {dt:.3f}s  ({dt / n_calls * 1e6:.2f} us/call, "
+          f"hits={cache.hits} misses={cache.misses})")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SEE correctness suite and benchmark")
+    parser.add_argument("--iters", type=int, default=2000, help="timing iterations over the bench positions")
+    parser.add_argument("--no-bench", action="store_true", help="only run the correctness suite")
+    args = parser.parse_args(argv)
+
+    failures = check()
+    if not args.no_bench:
+        bench(args.iters)
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
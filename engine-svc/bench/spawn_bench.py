@@ -0,0 +1,104 @@
+# Path: engine-svc/bench/spawn_bench.py
+"""
+Engine spawn latency: time from launcher.spawn() to `uciok`, per route.
+
+Usage (from engine-svc/):
+  python -m bench.spawn_bench                       # shell, exec, zygote; 20 spawns each
+  python -m bench.spawn_bench --routes zygote -n 100
+  python -m bench.spawn_bench --cmd /app/pyrefengine --routes shell,exec
+
+Routes (launcher.py):
+  shell   /bin/sh -c "<cmd>" (what UciBridge did before)
+  exec    argv exec'd directly
+  zygote  forked from the pre-imported zygote (python ... uci_main.py commands only);
+          the zygote's own start-up is timed separately and not included
+
+Exits non-zero if a spawn fails to reach `uciok`.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import shlex
+import statistics
+import sys
+import time
+from typing import List
+
+import launcher
+
+DEFAULT_CMD = f"{shlex.quote(sys.executable)} uci_main.py --engine ab"
+HANDSHAKE_TIMEOUT_S = 30.0
+
+
+async def spawn_to_uciok(cmd: str) -> float:
+    t0 = time.perf_counter()
+    proc = await launcher.spawn(cmd)
+    proc.stdin.write(b"uci\n")
+    await proc.stdin.drain()
+    try:
+        while True:
+            line = await asyncio.wait_for(proc.stdout.readline(), HANDSHAKE_TIMEOUT_S)
+            if not line:
+                raise RuntimeError(f"engine exited before uciok (cmd: {cmd})")
+            if line.strip() == b"uciok":
+                return time.perf_counter() - t0
+    finally:
+        proc.stdin.write(b"quit\n")
+        try:
+            await proc.stdin.drain()
+            await asyncio.wait_for(proc.wait(), 5.0)
+        except (OSError, asyncio.TimeoutError):
+            proc.kill()
+
+
+async def bench_route(route: str, cmd: str, n: int) -> List[float]:
+    launcher.ENGINE_SPAWN = "auto" if route == "zygote" else route
+    planned, _ = launcher.plan(cmd)
+    if planned != route:
+        print(f"{route:7} skipped: '{cmd}' runs via {planned}")
+        return []
+    if route == "zygote":
+        t0 = time.perf_counter()
+        await spawn_to_uciok(cmd)      # starts the zygote
+        print(f"{route:7} zygote start + first spawn {(time.perf_counter() - t0) * 1000:.0f} ms")
+    return [await spawn_to_uciok(cmd) for _ in range(n)]
+
+
+def report(route: str, times: List[float]) -> None:
+    ms = sorted(t * 1000 for t in times)
+    p95 = ms[min(len(ms) - 1, int(len(ms) * 0.95))]
+    print(f"{route:7} n={len(ms):<4} min {ms[0]:7.1f}  median {statistics.median(ms):7.1f}  "
+          f"p95 {p95:7.1f}  max {ms[-1]:7.1f}  ms")
+
+
+async def run(routes: List[str], cmd: str, n: int) -> int:
+    failures = 0
+    try:
+        for route in routes:
+            try:
+                times = await bench_route(route, cmd, n)
+            except (OSError, RuntimeError, asyncio.TimeoutError) as e:
+                print(f"{route:7} FAIL {type(e).__name__}: {e}")
+                failures += 1
+                continue
+            if times:
+                report(route, times)
+    finally:
+        await launcher.shutdown()
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Engine spawn latency (spawn -> uciok)")
+    parser.add_argument("--cmd", default=DEFAULT_CMD, help="engine command (as in UCI_ENGINE_CMD)")
+    parser.add_argument("--routes", default="shell,exec,zygote", help="comma list: shell, exec, zygote")
+    parser.add_argument("-n", type=int, default=20, help="spawns per route")
+    args = parser.parse_args(argv)
+    launcher.PRINT_DBG = False
+    routes = [r.strip() for r in args.routes.split(",") if r.strip()]
+    sys.exit(1 if asyncio.run(run(routes, args.cmd, args.n)) else 0)
+
+
+if __name__ == "__main__":
+    main()
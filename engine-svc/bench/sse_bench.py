@@ -0,0 +1,78 @@
+# Path: engine-svc/bench/sse_bench.py
+"""
+Events/sec per stream: bridge event -> SSE text.
+
+Usage (from engine-svc/):
+  python -m bench.sse_bench [--events 200000]
+
+Compares the previous pipeline (bridge json.dumps of a dict with "stage",
+handler json.loads, dict rebuild, json.dumps again) with typed events
+(events.Info / Bestmove, encoded once by events.sse_*). Both start from the
+same parsed info dicts, so engine I/O and UCI parsing are excluded.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import time
+
+from events import SSE_DONE, Bestmove, Info, sse_bestmove, sse_info
+
+def _sample_infos(n: int) -> list:
+    pv = ["e2e4", "e7e5", "g1f3", "b8c6", "f1b5", "a7a6", "b5a4", "g8f6"]
+    return [{"depth": 1 + i % 12, "nodes": 1000 * i, "nps": 25_000, "score": {"cp": (i % 80) - 40},
+             "pv": pv[: 1 + i % len(pv)]} for i in range(n)]
+
+def legacy_stream(infos) -> int:
+    """Old path: bridge -> JSON string -> handler json.loads -> _sse_json."""
+    def _sse_json(obj):
+        return f"data: {json.dumps(obj, separators=(',', ':'))}\n\n"
+    out = 0
+    chunks = []
+    for info in infos:
+        d = dict(info)
+        d["stage"] = "searching"
+        chunks.append(json.dumps(d, separators=(",", ":")))
+    chunks.append(json.dumps({"stage": "done", "bestmove": "e2e4"}, separators=(",", ":")))
+    for chunk in chunks:
+        msg = json.loads(chunk)
+        stage = msg.get("stage")
+        if stage == "searching":
+            out += len(_sse_json({"type": "info", **{k: v for k, v in msg.items() if k != "stage"}}))
+        elif stage == "done":
+            out += len(_sse_json({"type": "bestmove", "move": msg["bestmove"]}))
+            out += len(_sse_json({"type": "done"}))
+    return out
+
+def typed_stream(infos) -> int:
+    """New path: bridge -> Info/Bestmove objects -> one encode per event."""
+    out = 0
+    events = [Info.from_dict(info) for info in infos]
+    events.append(Bestmove("e2e4"))
+    for ev in events:
+        if isinstance(ev, Info):
+            out += len(sse_info(ev))
+        elif isinstance(ev, Bestmove):
+            out += len(sse_bestmove(ev.move))
+            out += len(SSE_DONE)
+    return out
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SSE event encoding throughput")
+    parser.add_argument("--events", type=int, default=200_000)
+    args = parser.parse_args(argv)
+
+    infos = _sample_infos(args.events)
+    results = {}
+    for name, fn in (("legacy json round-trip", legacy_stream), ("typed events", typed_stream)):
+        fn(infos[:1000])   # warm-up
+        t0 = time.perf_counter()
+        nbytes = fn(infos)
+        dt = time.perf_counter() - t0
+        results[name] = (len(infos) + 1) / dt
+        print(f"{name:24} {results[name]:12,.0f} events/s  ({dt:.3f}s, {nbytes} bytes)")
+    a, b = results["legacy json round-trip"], results["typed events"]
+    print(f"speedup: {b / a:.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,499 @@
+# Path: engine-svc/dispatcher.py
+"""
+Purpose: Route searches across several engine workers (scale-out past one engine / one host).
+
+Workers come from ENGINE_WORKERS (comma separated; default "local"):
+  local            one engine process on this host (UCI_ENGINE_CMD), with its own
+                   UciBridge + Ponderer
+  local*N          N such processes
+  http://host:port another engine-svc instance; searches are proxied over its
+                   /engines/think SSE endpoint and stops over /engines/stop
+
+Routing:
+  - session/game id -> the worker that served it last (TT, history and ponder
+    state live there); affinity is an LRU of MAX_AFFINITY entries
+  - new sessions and session-less searches -> the least loaded healthy worker
+    (fewest searches in flight, then fewest sessions)
+Every think/selfplay stream is a SearchHandle with its own id (sent to the
+client first); cancel(id) stops exactly that search on the worker running it,
+or keeps it from starting if it is still queued behind another search.
+A remote worker that cannot be reached is skipped for WORKER_RETRY_S seconds and
+the search is retried on another worker; its sessions move there as well.
+
+Scheduling (scheduler.py): every search has a class (interactive, selfplay,
+batch) that passes a per-class admission gate first; a local engine then runs
+the highest class waiting and preempts a running lower-class search for it.
+Session-less searches go to the worker with the fewest searches of their own
+or a higher class, so interactive work avoids engines busy with interactive
+work and lands on ones it can preempt.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import AsyncGenerator, Dict, List, Optional
+from urllib.parse import urlencode, urlsplit
+
+from events import Bestmove, Error, Event, Info
+from ponder import Ponderer, ponder_fen
+from scheduler import CLASSES, PREEMPT_GRACE_S, RANK, EngineSlot, Scheduler, Ticket
+from uci_bridge import UciBridge
+
+MAX_AFFINITY = 4096
+WORKER_RETRY_S = 5.0
+REMOTE_CONNECT_TIMEOUT_S = 3.0
+REMOTE_IDLE_TIMEOUT_S = 60.0     # no SSE line for this long -> remote considered dead
+
+PRINT_DBG = True
+def _dbg(msg: str):
+    if PRINT_DBG:
+        print(f"[DBG] dispatcher: {msg}", flush=True)
+
+
+class WorkerUnavailable(Exception):
+    """The worker could not take the search (nothing was streamed yet)."""
+
+
+class SearchHandle:
+    """One think/selfplay stream; `id` is what POST /engines/stop?id= cancels."""
+
+    def __init__(self, session: Optional[str] = None):
+        self.id = uuid.uuid4().hex[:12]
+        self.session = session
+        self.cancelled = asyncio.Event()
+        self.worker: Optional["Worker"] = None     # worker running its current search
+        self.remote_id: Optional[str] = None       # the search's id on a remote worker
+
+
+class Worker:
+    """One place searches can run. `load` = searches in flight through this dispatcher."""
+
+    kind = "?"
+
+    def __init__(self, wid: str):
+        self.id = wid
+        self.load = 0
+        self.by_class: Dict[str, int] = {c: 0 for c in CLASSES}   # `load` split by search class
+        self.down_until = 0.0
+
+    def ahead_of(self, cls: str) -> int:
+        """Searches here that a new `cls` search would wait behind (same or higher class)."""
+        return sum(n for c, n in self.by_class.items() if RANK[c] <= RANK[cls])
+
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.down_until
+
+    def mark_down(self) -> None:
+        self.down_until = time.monotonic() + WORKER_RETRY_S
+        _dbg(f"worker {self.id} marked down for {WORKER_RETRY_S}s")
+
+    def think(self, fen: str, depth: int, nodes: Optional[int], movetime_ms: Optional[int],
+              rollouts: Optional[int], session: Optional[str], ponder: bool,
+              ticket: Ticket, stats: bool = False) -> AsyncGenerator[Event, None]:
+        raise NotImplementedError
+
+    async def cancel(self, handle: SearchHandle) -> None:
+        """Stop `handle`'s search if it runs here; other searches are left alone."""
+        raise NotImplementedError
+
+    def drop_session(self, session: str) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    def info(self) -> Dict:
+        return {"id": self.id, "kind": self.kind, "load": self.load, "by_class": dict(self.by_class),
+                "healthy": self.healthy()}
+
+
+def _reached_limits(depth: Optional[int], nodes: Optional[int], movetime_ms: Optional[int],
+                    reached: int, searched: int, elapsed_s: float) -> bool:
+    """True if a search that was sent `stop` had run into one of its own limits anyway."""
+    return ((depth is not None and reached >= depth)
+            or (nodes is not None and searched >= nodes)
+            or (movetime_ms is not None and elapsed_s * 1000.0 >= movetime_ms))
+
+
+class LocalWorker(Worker):
+    """An engine process on this host. One search at a time, highest class first (EngineSlot)."""
+
+    kind = "local"
+
+    def __init__(self, wid: str, cmd: str):
+        super().__init__(wid)
+        self.bridge = UciBridge(cmd)
+        self.ponderer = Ponderer(self.bridge)
+        self.slot = EngineSlot()
+        self._running: Optional[SearchHandle] = None
+        self._preempt_sent = False
+        self._pondering_for: Optional[str] = None   # handle id whose bestmove is being pondered on
+
+    def info(self) -> Dict:
+        d = super().info()
+        d["restarts"] = max(0, self.bridge.spawns - 1)
+        d["running"] = self.slot.holder.cls if self.slot.holder else None
+        d["queued"] = self.slot.queued()
+        return d
+
+    async def _preempt_after_grace(self, ticket: Ticket) -> None:
+        await ticket.preempt.wait()
+        await asyncio.sleep(PREEMPT_GRACE_S)
+        await self._preempt_now(ticket)
+
+    async def _preempt_now(self, ticket: Ticket) -> None:
+        # Before its `go` is out a stop would reach an idle engine and be lost; the
+        # search's first completed iteration asks again.
+        if self._running is ticket.handle and not self._preempt_sent and self.bridge.searching:
+            # `stop` ends the search with a bestmove; think() keeps it from the client
+            self._preempt_sent = await self.bridge.abort_current_search(force=True)
+
+    async def think(self, fen, depth, nodes, movetime_ms, rollouts, session, ponder, ticket, stats=False):
+        handle = ticket.handle
+        deepest = 0      # deepest iteration streamed so far
+        floor = 0        # a re-run after preemption streams nothing up to this depth again
+        while True:
+            if not await self.slot.acquire(ticket):
+                return
+            self._running = handle
+            self._preempt_sent = False
+            started = time.monotonic()
+            searched = 0     # nodes reported by this run
+            watch = asyncio.ensure_future(self._preempt_after_grace(ticket))
+            hit = None
+            try:
+                # A matching ponder search replaces the fresh one; a stale one is discarded.
+                hit = await self.ponderer.claim(fen, depth, nodes, movetime_ms, session)
+                self._pondering_for = None
+                if handle.cancelled.is_set():
+                    return    # cancelled during claim: its `stop` found no search to end
+                if hit is not None:
+                    yield Info(ponderhit=True)
+                    source = hit.follow()
+                else:
+                    source = self.bridge.think_stream(fen, depth=depth, rollouts=rollouts, movetime_ms=movetime_ms,
+                                                      session=session, nodes=nodes, stats=stats)
+                last_pv: list = []
+                try:
+                    async for ev in source:
+                        if isinstance(ev, Bestmove):
+                            await source.aclose()
+                            if (self._preempt_sent and not handle.cancelled.is_set()
+                                    and not _reached_limits(depth, nodes, movetime_ms, deepest, searched,
+                                                            time.monotonic() - started)):
+                                break     # stopped for a higher class: run again below
+                            if ponder and ev.move and not handle.cancelled.is_set():
+                                reply = ev.ponder or (last_pv[1] if len(last_pv) > 1 and last_pv[0] == ev.move else None)
+                                pfen = ponder_fen(fen, ev.move, reply)
+                                if pfen:
+                                    self.ponderer.start(pfen, depth, rollouts, session, nodes, movetime_ms)
+                                    self._pondering_for = handle.id
+                            yield ev
+                            return
+                        if isinstance(ev, Info) and ev.nodes:
+                            searched = max(searched, ev.nodes)
+                        if isinstance(ev, Info) and ev.pv:
+                            last_pv = ev.pv
+                            if ticket.preempt.is_set():
+                                await self._preempt_now(ticket)   # iteration done: yield the engine now
+                        if isinstance(ev, Info) and ev.depth is not None:
+                            if ev.depth <= floor and (ev.pv or ev.currmove):
+                                continue
+                            if ev.pv:
+                                deepest = max(deepest, ev.depth)
+                        yield ev
+                        if isinstance(ev, Error):
+                            return
+                    else:
+                        return
+                finally:
+                    await source.aclose()
+            finally:
+                watch.cancel()
+                self._running = None
+                # Client went away while following a ponder hit: release the engine.
+                if hit is not None and not hit.done:
+                    await hit.cancel()
+                self.slot.release()
+            floor = deepest
+            ticket.preemptions += 1
+            ticket.stats.preempted += 1
+            _dbg(f"{ticket.cls} search={handle.id} preempted on {self.id} at depth {deepest}; re-queued")
+
+    async def cancel(self, handle: SearchHandle) -> None:
+        if self._running is handle:
+            # `stop` ends the search with a bestmove, which the stream then delivers
+            await self.bridge.abort_current_search(force=True)
+        elif self._pondering_for == handle.id:
+            self._pondering_for = None
+            await self.ponderer.discard()
+
+    def drop_session(self, session: str) -> None:
+        self.bridge.sessions.drop(session)
+
+    async def close(self) -> None:
+        await self.ponderer.discard()
+        await self.bridge.stop()
+
+
+class RemoteWorker(Worker):
+    """
+    Another engine-svc instance. Uses plain HTTP/1.0 over asyncio streams, so the
+    SSE body arrives unchunked and ends when the server closes the connection.
+    """
+
+    kind = "remote"
+
+    def __init__(self, wid: str, base_url: str):
+        super().__init__(wid)
+        u = urlsplit(base_url)
+        self.host = u.hostname or "127.0.0.1"
+        self.port = u.port or 80
+        self.prefix = u.path.rstrip("/")
+
+    async def _request(self, method: str, path: str):
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port),
+                                                timeout=REMOTE_CONNECT_TIMEOUT_S)
+        writer.write(f"{method} {self.prefix}{path} HTTP/1.0\r\nHost: {self.host}\r\n"
+                     f"Content-Length: 0\r\nAccept: text/event-stream\r\n\r\n".encode("ascii"))
+        await writer.drain()
+        status = await asyncio.wait_for(reader.readline(), timeout=REMOTE_CONNECT_TIMEOUT_S)
+        parts = status.split()
+        code = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 0
+        while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+            pass   # headers
+        return code, reader, writer
+
+    async def think(self, fen, depth, nodes, movetime_ms, rollouts, session, ponder, ticket, stats=False):
+        handle = ticket.handle
+        q = {"fen": fen, "depth": depth}
+        for k, v in (("nodes", nodes), ("movetime", movetime_ms), ("rollouts", rollouts), ("session", session)):
+            if v is not None:
+                q[k] = v
+        if ponder:
+            q["ponder"] = "true"
+        if stats:
+            q["stats"] = "true"
+        if ticket.cls != "interactive":
+            q["priority"] = ticket.cls     # the remote schedules (and preempts) it there
+        try:
+            code, reader, writer = await self._request("GET", "/engines/think?" + urlencode(q))
+        except (OSError, asyncio.TimeoutError) as e:
+            self.mark_down()
+            raise WorkerUnavailable(f"worker {self.id} unreachable: {type(e).__name__}: {e}") from None
+        try:
+            if code != 200:
+                body = await reader.read(512)
+                yield Error(f"worker {self.id}: HTTP {code} {body.decode('utf-8', 'replace').strip()}")
+                return
+            # the remote queues it from here on; it is no longer waiting in ours
+            if ticket.dequeue():
+                ticket.stats.waits.append(time.monotonic() - ticket.created)
+            while True:
+                line = await asyncio.wait_for(reader.readline(), timeout=REMOTE_IDLE_TIMEOUT_S)
+                if not line:
+                    yield Error(f"worker {self.id}: stream ended without bestmove")
+                    return
+                if not line.startswith(b"data: "):
+                    continue
+                msg = json.loads(line[6:])
+                kind = msg.get("type")
+                if kind == "search":
+                    handle.remote_id = msg.get("id")
+                    if handle.cancelled.is_set():
+                        await self.cancel(handle)   # cancelled before the remote id was known
+                    continue
+                if kind == "bestmove":
+                    yield Bestmove(msg.get("move", ""))
+                    return
+                if kind == "done":
+                    return
+                if "error" in msg:
+                    yield Error(msg["error"])
+                    return
+                if kind == "info" and "warning" not in msg:
+                    yield Info.from_dict(msg) if "ponderhit" not in msg else Info(ponderhit=True)
+        except (OSError, asyncio.TimeoutError, ValueError) as e:
+            self.mark_down()
+            yield Error(f"worker {self.id} failed mid-search: {type(e).__name__}: {e}")
+        finally:
+            handle.remote_id = None
+            writer.close()
+
+    async def cancel(self, handle: SearchHandle) -> None:
+        if not handle.remote_id:
+            return
+        path = "/engines/stop?" + urlencode({"id": handle.remote_id})
+        try:
+            _code, _reader, writer = await self._request("POST", path)
+            writer.close()
+        except (OSError, asyncio.TimeoutError) as e:
+            _dbg(f"stop on {self.id} failed: {e}")
+            self.mark_down()
+
+    def info(self) -> Dict:
+        d = super().info()
+        d["url"] = f"http://{self.host}:{self.port}{self.prefix}"
+        return d
+
+
+def parse_workers(spec: str, engine_cmd: str) -> List[Worker]:
+    workers: List[Worker] = []
+    for entry in (e.strip() for e in spec.split(",")):
+        if not entry:
+            continue
+        if entry.startswith(("http://", "https://")):
+            workers.append(RemoteWorker(f"w{len(workers)}", entry))
+            continue
+        name, _, count = entry.partition("*")
+        if name != "local":
+            raise ValueError(f"unknown ENGINE_WORKERS entry '{entry}'")
+        for _ in range(int(count or 1)):
+            workers.append(LocalWorker(f"w{len(workers)}", engine_cmd))
+    if not workers:
+        raise ValueError("ENGINE_WORKERS lists no workers")
+    return workers
+
+
+class Dispatcher:
+    def __init__(self, workers: List[Worker]):
+        self.workers = workers
+        self._by_id = {w.id: w for w in workers}
+        self._affinity: "OrderedDict[str, str]" = OrderedDict()   # session -> worker id
+        self._searches: Dict[str, SearchHandle] = {}                # search id -> open stream
+        self.scheduler = Scheduler.from_env()
+        for w in workers:
+            _dbg(f"worker {w.id} kind={w.kind}")
+
+    @classmethod
+    def from_env(cls, engine_cmd: str) -> "Dispatcher":
+        return cls(parse_workers(os.getenv("ENGINE_WORKERS", "local"), engine_cmd))
+
+    def _sessions_on(self, w: Worker) -> int:
+        return sum(1 for wid in self._affinity.values() if wid == w.id)
+
+    def pick(self, session: Optional[str] = None, cls: str = "interactive") -> Worker:
+        if session is not None:
+            wid = self._affinity.get(session)
+            w = self._by_id.get(wid) if wid else None
+            if w is not None and w.healthy():
+                self._affinity.move_to_end(session)
+                return w
+        pool = [w for w in self.workers if w.healthy()] or self.workers
+        w = min(pool, key=lambda x: (x.ahead_of(cls), x.load, self._sessions_on(x)))
+        if session is not None:
+            self._affinity[session] = w.id
+            self._affinity.move_to_end(session)
+            if len(self._affinity) > MAX_AFFINITY:
+                self._affinity.popitem(last=False)
+        return w
+
+    def owner(self, session: str) -> Optional[Worker]:
+        wid = self._affinity.get(session)
+        return self._by_id.get(wid) if wid else None
+
+    def admissible(self, priority: str) -> bool:
+        """False if a new stream of this class should be refused (its queue is full)."""
+        return self.scheduler.admissible(priority)
+
+    def open_search(self, session: Optional[str] = None) -> SearchHandle:
+        h = SearchHandle(session)
+        self._searches[h.id] = h
+        return h
+
+    def close_search(self, handle: SearchHandle) -> None:
+        self._searches.pop(handle.id, None)
+
+    async def think(self, fen: str, depth: int, nodes: Optional[int] = None, movetime_ms: Optional[int] = None,
+                    rollouts: Optional[int] = None, session: Optional[str] = None,
+                    ponder: bool = False, handle: Optional[SearchHandle] = None,
+                    stats: bool = False, priority: str = "interactive") -> AsyncGenerator[Event, None]:
+        """One search for `handle` (a throwaway handle if none is given) in search class `priority`."""
+        if handle is None:
+            handle = SearchHandle(session)
+        ticket = self.scheduler.ticket(handle, priority)
+        if not await self.scheduler.admit(ticket):
+            return
+        try:
+            async for ev in self._think_on_workers(fen, depth, nodes, movetime_ms, rollouts, session,
+                                                   ponder, ticket, stats):
+                yield ev
+        finally:
+            self.scheduler.finish(ticket)
+
+    async def _think_on_workers(self, fen, depth, nodes, movetime_ms, rollouts, session, ponder,
+                                ticket: Ticket, stats: bool) -> AsyncGenerator[Event, None]:
+        handle = ticket.handle
+        for _attempt in range(len(self.workers)):
+            if handle.cancelled.is_set():
+                return
+            w = self.pick(session, ticket.cls)
+            _dbg(f"think search={handle.id} class={ticket.cls} session={session} -> {w.id} (load={w.load})")
+            w.load += 1
+            w.by_class[ticket.cls] += 1
+            handle.worker = w
+            stream = w.think(fen, depth, nodes, movetime_ms, rollouts, session, ponder, ticket, stats)
+            try:
+                async for ev in stream:
+                    yield ev
+                return
+            except WorkerUnavailable as e:
+                _dbg(str(e))
+                if session is not None:
+                    self._affinity.pop(session, None)
+                if not any(x.healthy() for x in self.workers):
+                    yield Error(str(e))
+                    return
+            finally:
+                w.load -= 1
+                w.by_class[ticket.cls] -= 1
+                handle.worker = None
+                await stream.aclose()
+        yield Error("no engine worker available")
+
+    async def cancel(self, search_id: str) -> bool:
+        """Cancel one search stream; False if the id is unknown (finished or never existed)."""
+        h = self._searches.get(search_id)
+        if h is None:
+            return False
+        await self.cancel_handle(h)
+        return True
+
+    async def cancel_handle(self, h: SearchHandle) -> None:
+        """Cancel one search stream by handle (also for handles not opened through open_search)."""
+        _dbg(f"cancel search={h.id} on {h.worker.id if h.worker else '-'}")
+        h.cancelled.set()
+        if h.worker is not None:
+            await h.worker.cancel(h)
+        else:
+            # between searches (e.g. pondering after a bestmove): let every worker drop what it holds for it
+            await asyncio.gather(*(w.cancel(h) for w in self.workers), return_exceptions=True)
+
+    async def cancel_session(self, session: str) -> int:
+        """Cancel every open search of one session; returns how many there were."""
+        ids = [h.id for h in self._searches.values() if h.session == session]
+        for sid in ids:
+            await self.cancel(sid)
+        return len(ids)
+
+    def forget(self, session: str) -> None:
+        """Session finished (e.g. a selfplay game): drop affinity and engine-side history."""
+        owner = self.owner(session)
+        if owner is not None:
+            owner.drop_session(session)
+        self._affinity.pop(session, None)
+
+    def status(self) -> List[Dict]:
+        out = []
+        for w in self.workers:
+            d = w.info()
+            d["sessions"] = self._sessions_on(w)
+            out.append(d)
+        return out
+
+    async def close(self) -> None:
+        await asyncio.gather(*(w.close() for w in self.workers), return_exceptions=True)
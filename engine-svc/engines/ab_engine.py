@@ -1,12 +1,19 @@
 # Path: engine-svc/engines/ab_engine.py
 from __future__ import annotations
+import os
+import sys
+import threading
 import time
-from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple
+from dataclasses import dataclass, fields
+from typing import Dict, List, Optional
 
 import chess
 
 from .base import Engine as BaseEngine
+from .see import SEECache
+from .ordering import N_PT, Heuristics, line_before, move_code
+from .eval_params import read_params
+from .profiling import PROFILE_MODES, default_profile_dir, profile_search
 
 # ---------------------------
 # Tunables (unchanged)
@@ -16,10 +23,19 @@ DEFAULT_ROLLOUTS = 0              # accepted but ignored
 MAX_AB_DEPTH = 64
 INF = 60_000
 MATE = 30_000
+MAX_PLY = 2 * MAX_AB_DEPTH        # extensions + quiescence can go past the nominal depth
+MATE_IN_MAX = MATE - MAX_PLY      # |score| >= this: mate in (MATE - |score|) plies
 
 # Quiescence
-Q_INCLUDE_CHECKS = True
+Q_INCLUDE_CHECKS = True           # quiet checks, first quiescence ply only
 Q_FUTILITY_MARGIN = 150  # cp
+Q_DELTA_MARGIN = 200              # cp; skip captures that can't lift stand-pat to alpha
+
+# Move ordering: TT move > killers > captures (MVV-LVA) / quiets by history + continuation
+# history + counter move (engines/ordering.py); captures with SEE < 0 go last
+KILLER_BONUS = 500_000
+COUNTER_MOVE_BONUS = 2_000        # a tier of its own above history cost nodes; a nudge doesn't
+BAD_CAPTURE_PENALTY = 30_000
 
 # LMR
 LMR_MIN_DEPTH = 3
@@ -36,10 +52,20 @@ FUTILITY_MARGIN_BASE = 200        # cp
 MCP_MIN_DEPTH = 3
 MCP_START_AT = 6                  # after N moves, start skipping some quiets
 
+# Internal iterative deepening: PV nodes without a TT move search shallower first to get one
+IID_MIN_DEPTH = 4
+IID_REDUCTION = 2
+
+# Root
+CURRMOVE_AFTER_S = 1.0            # `info currmove` lines once a search has run this long
+
 # Aspiration windows
 ASP_WINDOW = 24                   # centipawns
 ASP_MAX_WIDEN = 2048
 
+# Search state kept between moves of one game (reset on ucinewgame)
+TT_MAX_ENTRIES = 1_000_000        # above this, entries older than the last search are dropped
+
 DEBUG = True                      # prints `info string ...` breadcrumbs
 
 # ---------------------------
@@ -62,6 +88,21 @@ PSTS = {
     chess.KING:   [0]*64,
 }
 
+# Tuned tables (tuning/texel.py output) replace the defaults above at import time.
+EVAL_PARAMS_ENV = "EVAL_PARAMS"
+
+def load_eval_params(path: str) -> None:
+    values, psts = read_params(path)
+    PIECE_VALUES.update(values)
+    PSTS.update(psts)
+
+if os.environ.get(EVAL_PARAMS_ENV):
+    try:
+        load_eval_params(os.environ[EVAL_PARAMS_ENV])
+    except (OSError, ValueError) as e:
+        # stderr: stdout belongs to the UCI protocol
+        print(f"eval params not loaded ({os.environ[EVAL_PARAMS_ENV]}): {e}", file=sys.stderr, flush=True)
+
 def _pst(piece_type: int, square: int, color: bool) -> int:
     arr = PSTS[piece_type]
     idx = square if color == chess.WHITE else chess.square_mirror(square)
@@ -74,37 +115,66 @@ def _mvv_lva(board: chess.Board, m: chess.Move) -> int:
     attacker = board.piece_type_at(m.from_square) or chess.PAWN
     return 10_000 + PIECE_VALUES[victim]*10 - PIECE_VALUES[attacker]
 
+def _q_noisy_moves(board: chess.Board, qply: int):
+    """
+    Quiescence moves for a side NOT in check, generated with bitboard masks
+    instead of filtering every legal move:
+      captures (incl. capture-promotions, ep) in MVV-LVA order,
+      quiet queen promotions,
+      quiet checks (only when Q_INCLUDE_CHECKS, first quiescence ply only).
+    """
+    caps = list(board.generate_legal_captures())
+    caps.sort(key=lambda m: _mvv_lva(board, m), reverse=True)
+    yield from caps
+
+    us = board.turn
+    empty = ~board.occupied & chess.BB_ALL
+    promo_from = board.pawns & board.occupied_co[us] & (chess.BB_RANK_7 if us == chess.WHITE else chess.BB_RANK_2)
+    if promo_from:
+        for m in board.generate_legal_moves(promo_from, empty):
+            if m.promotion == chess.QUEEN:
+                yield m
+
+    if Q_INCLUDE_CHECKS and qply == 0:
+        for m in board.generate_legal_moves(chess.BB_ALL, empty):
+            if m.promotion or board.is_en_passant(m):
+                continue
+            if board.gives_check(m):
+                yield m
+
 # ---------------------------
 # Utility: mate score normalize/de-normalize for TT
 # ---------------------------
 def _to_tt(score: int, ply: int) -> int:
-    if score >= MATE - MAX_AB_DEPTH:
+    if score >= MATE_IN_MAX:
         return score + ply
-    if score <= -MATE + MAX_AB_DEPTH:
+    if score <= -MATE_IN_MAX:
         return score - ply
     return score
 
 def _from_tt(score: int, ply: int) -> int:
-    if score >= MATE - MAX_AB_DEPTH:
+    if score >= MATE_IN_MAX:
         return score - ply
-    if score <= -MATE + MAX_AB_DEPTH:
+    if score <= -MATE_IN_MAX:
         return score + ply
     return score
 
+def mate_in_moves(score: int) -> Optional[int]:
+    """UCI `score mate N` value for a mate-range score (negative: we get mated), else None."""
+    if score >= MATE_IN_MAX:
+        return (MATE - score + 1) // 2
+    if score <= -MATE_IN_MAX:
+        return -((MATE + score) // 2)
+    return None
+
 def _clamp(v: int, lo: int, hi: int) -> int:
     return lo if v < lo else hi if v > hi else v
 
 # ---------------------------
 # Evaluation (unchanged)
 # ---------------------------
-def evaluate(board: chess.Board) -> int:
-    if board.is_checkmate():
-        return -MATE
-    if board.is_stalemate() or board.is_insufficient_material():
-        return 0
-    if board.is_repetition(3) or board.can_claim_draw():
-        return 0
-
+def material_pst(board: chess.Board) -> int:
+    """Material + PST terms from White's point of view (batch_eval mirrors this)."""
     score = 0
     for color in (chess.WHITE, chess.BLACK):
         sign = 1 if color == chess.WHITE else -1
@@ -118,6 +188,21 @@ def evaluate(board: chess.Board) -> int:
         if kings:
             ksq = next(iter(kings))
             score += sign * _pst(chess.KING, ksq, color)
+    return score
+
+def evaluate(board: chess.Board, check_draws: bool = True) -> int:
+    """
+    Static eval, side to move. `check_draws=False` skips the repetition / 50-move
+    claims, which replay the whole move stack; Search detects those itself.
+    """
+    if board.is_checkmate():
+        return -MATE
+    if board.is_stalemate() or board.is_insufficient_material():
+        return 0
+    if check_draws and (board.is_repetition(3) or board.can_claim_draw()):
+        return 0
+
+    score = material_pst(board)
 
     mobility = len(list(board.legal_moves))
     score += mobility // 4
@@ -143,6 +228,9 @@ class TT:
         self.age = 0
 
     def key(self, board: chess.Board) -> int:
+        if hasattr(board, "_transposition_key"):
+            # bitboards + turn + castling + ep as a tuple; far cheaper than board_fen()
+            return hash(board._transposition_key())
         if hasattr(board, "transposition_key"):
             try:
                 return int(board.transposition_key())
@@ -157,18 +245,122 @@ class TT:
 
     def store(self, key: int, depth: int, score: int, flag: int, best: Optional[chess.Move]):
         prev = self.table.get(key)
-        if (prev is None) or (depth > prev.depth) or (self.age > prev.age):
+        if (prev is None) or (depth >= prev.depth) or (self.age > prev.age):
             self.table[key] = TTEntry(depth, score, flag, best, self.age)
 
+    def new_search(self):
+        self.age += 1
+        if len(self.table) > TT_MAX_ENTRIES:
+            self.table = {k: e for k, e in self.table.items() if e.age >= self.age - 1}
+
 # ---------------------------
 # Search (unchanged)
 # ---------------------------
+class SearchAborted(Exception):
+    """Raised inside the tree when the stop token is set or the node/time budget
+    is spent; caught by Search.search()."""
+
+@dataclass(slots=True)
+class SearchStats:
+    """
+    Counters for one iteration (`setoption name Stats value true`), printed after
+    it as `info string stats depth <d> <name> <count> ...`; uci_parser turns the
+    line into a dict. Rates are ratios of these, e.g. TT hit rate =
+    tt_hits / tt_probes, first-move cutoffs = first_move_cutoffs / cutoffs.
+    """
+    nodes: int = 0                # main-search nodes (qnodes not included)
+    qnodes: int = 0
+    tt_probes: int = 0
+    tt_hits: int = 0              # an entry was found
+    tt_cuts: int = 0              # ... and its bound ended the node
+    cutoffs: int = 0              # beta cutoffs in the move loop
+    first_move_cutoffs: int = 0   # ... by the first move tried
+    null_tries: int = 0
+    null_cuts: int = 0
+    lmr: int = 0                  # reduced searches
+    lmr_researches: int = 0       # ... that beat alpha and were searched again
+    pvs_researches: int = 0       # zero-window searches re-searched with the full window
+    asp_fail_low: int = 0
+    asp_fail_high: int = 0
+    iid: int = 0                  # internal iterative deepening searches
+    iid_moves: int = 0            # ... that left a best move in the TT
+
+    def line(self, depth: int) -> str:
+        return f"stats depth {depth} " + " ".join(f"{f.name} {getattr(self, f.name)}" for f in fields(self))
+
+
+@dataclass(slots=True)
+class RootMove:
+    """One legal root move, kept across the iterations of one search."""
+    move: chess.Move
+    pt: int                       # piece-to index (ordering.py)
+
+
 class Search:
     def __init__(self):
         self.tt = TT()
         self.nodes = 0
-        self.killers: Dict[int, Tuple[Optional[chess.Move], Optional[chess.Move]]] = {}
-        self.history: Dict[Tuple[bool, int], int] = {}
+        self.stop_event: Optional[threading.Event] = None
+        self.node_limit: Optional[int] = None     # per `go`; None = unlimited
+        self.deadline: Optional[float] = None     # time.monotonic() value; None = unlimited
+        self._budget_armed = False                # limits apply once depth 1 has completed
+        self.emit_info = None       # Engine.emit_info when driven by the UCI loop
+        self.heur = Heuristics(MAX_PLY)   # history, continuation history, counter moves, killers
+        self._last_root_ply: Optional[int] = None
+        self._path: List[int] = []      # keys of game history since the last irreversible move + current line
+        self._line: List[int] = []      # piece-to index (ordering.py) of each move on the current line
+        self._root: List[RootMove] = []     # root moves, best first, re-sorted every iteration
+        self._pv: List[List[chess.Move]] = [[] for _ in range(MAX_PLY + 2)]   # triangular PV: line from ply p
+        self._prev_pv: List[chess.Move] = []   # PV of the last completed iteration, tried first
+        self._start = 0.0                   # time.monotonic() at the start of the search
+        self.see_cache = SEECache()
+        self.stats: Optional[SearchStats] = None   # set per `go` when the Stats option is on
+
+    def _check_stop(self) -> None:
+        if self.stop_event is not None and self.stop_event.is_set():
+            raise SearchAborted
+        if self._budget_armed:
+            if self.node_limit is not None and self.nodes >= self.node_limit:
+                raise SearchAborted
+            if self.deadline is not None and time.monotonic() >= self.deadline:
+                raise SearchAborted
+
+    def _history_keys(self, board: chess.Board) -> List[int]:
+        """Keys of the positions before `board` back to the last capture/pawn move, oldest first."""
+        b = board.copy(stack=min(board.halfmove_clock, len(board.move_stack)))
+        keys = []
+        while b.move_stack:
+            b.pop()
+            keys.append(self.tt.key(b))
+        keys.reverse()
+        return keys
+
+    def _is_draw_by_rule(self, board: chess.Board, key: int) -> bool:
+        """50-move rule, or a repetition of an earlier position (in the game or on this line)."""
+        hmc = board.halfmove_clock
+        if hmc >= 100:
+            return True
+        path = self._path
+        # same side to move: every second entry back, no further than the last irreversible move
+        for i in range(2, min(hmc, len(path)) + 1, 2):
+            if path[-i] == key:
+                return True
+        return False
+
+    def _bad_capture(self, board: chess.Board, m: chess.Move, pos_key: int) -> bool:
+        """SEE < 0; trading down in value (or promoting) never needs the full exchange."""
+        victim = board.piece_type_at(m.to_square) or chess.PAWN
+        attacker = board.piece_type_at(m.from_square) or chess.PAWN
+        if m.promotion or PIECE_VALUES[attacker] <= PIECE_VALUES[victim]:
+            return False
+        return self.see_cache.see(board, m, pos_key) < 0
+
+    def _age_heuristics(self, board: chess.Board):
+        """Keep ordering state from the previous move of this game, but decay it."""
+        root_ply = board.ply()
+        played = root_ply - self._last_root_ply if self._last_root_ply is not None else 0
+        self._last_root_ply = root_ply
+        self.heur.age(played)
 
     def _push_null(self, board: chess.Board):
         try:
@@ -176,32 +368,62 @@ class Search:
         except AttributeError:
             board.push(chess.Move.null())
 
-    def _ordered_moves(self, board: chess.Board, tt_move: Optional[chess.Move],
-                       killers: Tuple[Optional[chess.Move], Optional[chess.Move]]) -> List[chess.Move]:
+    def _ordered_moves(self, board: chess.Board, tt_move: Optional[chess.Move], ply: int,
+                       pos_key: int, prev1: int, prev2: int) -> List[chess.Move]:
         moves = list(board.legal_moves)
-        hist = self.history
+        moves.sort(key=self._move_key(board, tt_move, ply, pos_key, prev1, prev2), reverse=True)
+        return moves
+
+    def _move_key(self, board: chess.Board, tt_move: Optional[chess.Move], ply: int,
+                  pos_key: int, prev1: int, prev2: int):
+        """Ordering key for the moves of `board` (higher first)."""
+        h = self.heur
+        hist = h.history
+        cont1, cont2 = h.cont
+        off1 = prev1 * N_PT if prev1 >= 0 else -1
+        off2 = prev2 * N_PT if prev2 >= 0 else -1
+        counter = h.counter[prev1] if prev1 >= 0 else 0
+        k1, k2 = h.killer1[ply], h.killer2[ply]
+        base = 6 * board.turn - 1
+        hbase = 64 * board.turn
         iscap = board.is_capture
         gives = board.gives_check
+        piece_type_at = board.piece_type_at
         def key(m: chess.Move):
-            k = 0
-            if tt_move and m == tt_move: k += 1_000_000
-            k += _mvv_lva(board, m)
-            if m in killers: k += 500_000
-            if gives(m): k += 5_000
-            k += hist.get((board.turn, m.to_square), 0)
-            if iscap(m): k += 1
+            if m == tt_move:
+                return 2_000_000
+            k = 5_000 if gives(m) else 0
+            if iscap(m):
+                mvv = _mvv_lva(board, m) + 1
+                if self._bad_capture(board, m, pos_key):
+                    return k + mvv - BAD_CAPTURE_PENALTY
+                return k + mvv
+            code = move_code(m)
+            if code == k1 or code == k2:
+                k += KILLER_BONUS
+            elif code == counter:
+                k += COUNTER_MOVE_BONUS
+            pt = (base + piece_type_at(m.from_square)) * 64 + m.to_square
+            k += hist[hbase + m.to_square]
+            if off1 >= 0:
+                k += cont1[off1 + pt]
+            if off2 >= 0:
+                k += cont2[off2 + pt]
             return k
-        moves.sort(key=key, reverse=True)
-        return moves
+        return key
 
-    def _qsearch(self, board: chess.Board, alpha: int, beta: int) -> int:
+    def _qsearch(self, board: chess.Board, alpha: int, beta: int, qply: int = 0, ply: int = 0) -> int:
         self.nodes += 1
-        if board.is_checkmate():
-            return -MATE
-        if board.is_stalemate() or board.is_insufficient_material():
+        self._check_stop()
+        if self.stats is not None:
+            self.stats.qnodes += 1
+        if board.is_check():
+            return self._qsearch_evasions(board, alpha, beta, qply, ply)
+        if board.is_insufficient_material():
             return 0
 
-        stand = evaluate(board)
+        # evaluate() also scores stalemate; repetitions are caught in _negamax before qsearch
+        stand = evaluate(board, False)
         if stand >= beta:
             return beta
         if stand > alpha:
@@ -210,13 +432,19 @@ class Search:
         if stand + Q_FUTILITY_MARGIN < alpha:
             return alpha
 
-        legal_any = False
-        for m in board.legal_moves:
-            if not (board.is_capture(m) or (Q_INCLUDE_CHECKS and board.gives_check(m))):
-                continue
-            legal_any = True
+        pos_key = None
+        for m in _q_noisy_moves(board, qply):
+            if board.is_capture(m) and not m.promotion:
+                victim = board.piece_type_at(m.to_square) or chess.PAWN
+                # delta pruning: even winning the victim for free can't reach alpha
+                if stand + PIECE_VALUES[victim] + Q_DELTA_MARGIN <= alpha:
+                    continue
+                if pos_key is None:
+                    pos_key = self.tt.key(board)
+                if self._bad_capture(board, m, pos_key):
+                    continue
             board.push(m)
-            score = -self._qsearch(board, -beta, -alpha)
+            score = -self._qsearch(board, -beta, -alpha, qply + 1, ply + 1)
             board.pop()
             if score >= beta:
                 return beta
@@ -225,6 +453,22 @@ class Search:
 
         return alpha
 
+    def _qsearch_evasions(self, board: chess.Board, alpha: int, beta: int, qply: int, ply: int) -> int:
+        """In check: no stand-pat, every evasion is searched (legal move gen is evasion gen here)."""
+        any_legal = False
+        for m in board.generate_legal_moves():
+            any_legal = True
+            board.push(m)
+            score = -self._qsearch(board, -beta, -alpha, qply + 1, ply + 1)
+            board.pop()
+            if score >= beta:
+                return beta
+            if score > alpha:
+                alpha = score
+        if not any_legal:
+            return -MATE + ply
+        return alpha
+
     def _likely_zugzwang(self, board: chess.Board) -> bool:
         np_white = (
             320 * len(board.pieces(chess.KNIGHT, chess.WHITE)) +
@@ -247,59 +491,102 @@ class Search:
             alpha = beta - 1
 
         self.nodes += 1
+        self._check_stop()
+        st = self.stats
+        if st is not None:
+            st.nodes += 1
+        pvt = self._pv
+        pvt[ply] = []
+
+        # Mate-distance pruning: a mate found nearer the root already bounds this node
+        if ply > 0:
+            alpha = max(alpha, -MATE + ply)
+            beta = min(beta, MATE - ply - 1)
+            if alpha >= beta:
+                return alpha
 
         key = self.tt.key(board)
+        if ply > 0 and self._is_draw_by_rule(board, key):
+            return 0
+
         tte = self.tt.probe(key)
+        if st is not None:
+            st.tt_probes += 1
+            st.tt_hits += tte is not None
         if tte and tte.depth >= depth:
             tts = _from_tt(tte.score, ply)
-            if tte.flag == EXACT:
-                return tts
-            if tte.flag == ALPHA and tts <= alpha:
-                return tts
-            if tte.flag == BETA and tts >= beta:
+            if (tte.flag == EXACT or (tte.flag == ALPHA and tts <= alpha)
+                    or (tte.flag == BETA and tts >= beta)):
+                if st is not None:
+                    st.tt_cuts += 1
                 return tts
 
-        if board.is_repetition(3) or board.can_claim_draw():
-            return 0
-
         in_check = board.is_check()
         local_depth = depth + 1 if in_check else depth
         if local_depth <= 0:
-            return self._qsearch(board, alpha, beta)
+            return self._qsearch(board, alpha, beta, 0, ply)
 
         if (not in_check) and local_depth >= NMP_MIN_DEPTH and not self._likely_zugzwang(board):
+            self._path.append(key)
+            self._line.append(-1)
+            if st is not None:
+                st.null_tries += 1
             try:
                 self._push_null(board)
                 r = NMP_R
                 score = -self._negamax(board, local_depth - 1 - r, -beta, -beta + 1, ply + 1, False)
                 board.pop()
                 if score >= beta:
+                    if st is not None:
+                        st.null_cuts += 1
                     return beta
+            except SearchAborted:
+                raise
             except Exception as e:
                 if DEBUG:
                     print(f"info string dbg=nullmove error={type(e).__name__}:{e}", flush=True)
+            finally:
+                self._path.pop()
+                self._line.pop()
 
         orig_alpha = alpha
         best_move = None
         best_score = -INF
 
-        killers = self.killers.get(ply, (None, None))
         tt_move = tte.best if tte else None
-
-        moves = self._ordered_moves(board, tt_move, killers)
+        if is_pv and self._on_prev_pv(board, ply):
+            tt_move = self._prev_pv[ply]
+        elif tt_move is None and is_pv and local_depth >= IID_MIN_DEPTH:
+            # IID: a reduced search of this node leaves a best move in the TT to try first.
+            # It re-searches this node with the same move stack, so it is off the previous
+            # PV too (nodes on it already have their move from there).
+            if st is not None:
+                st.iid += 1
+            self._negamax(board, local_depth - IID_REDUCTION, alpha, beta, ply, True)
+            tte = self.tt.probe(key)
+            tt_move = tte.best if tte else None
+            if st is not None and tt_move is not None:
+                st.iid_moves += 1
+            pvt[ply] = []
+        line = self._line
+        prev1, prev2 = line[-1], line[-2]
+
+        moves = self._ordered_moves(board, tt_move, ply, key, prev1, prev2)
         move_index = 0
+        base = 6 * board.turn - 1
 
         static_eval = None
         if local_depth == 1:
-            static_eval = evaluate(board)
+            static_eval = evaluate(board, False)
 
+        self._path.append(key)
         for m in moves:
             is_cap = board.is_capture(m)
             gives_chk = board.gives_check(m)
 
             if local_depth == 1 and not is_cap and not gives_chk:
                 if static_eval is None:
-                    static_eval = evaluate(board)
+                    static_eval = evaluate(board, False)
                 if static_eval + FUTILITY_MARGIN_BASE <= alpha:
                     move_index += 1
                     continue
@@ -308,13 +595,18 @@ class Search:
                 move_index += 1
                 continue
 
+            pt = (base + board.piece_type_at(m.from_square)) * 64 + m.to_square
             board.push(m)
+            line.append(pt)
 
             child_in_check = board.is_check()
             if (local_depth >= LMR_MIN_DEPTH and not is_pv and not is_cap and not gives_chk and not child_in_check):
                 reduce = LMR_BASE_REDUCTION + (1 if move_index >= 4 else 0)
                 new_depth = max(1, local_depth - 1 - reduce)
                 score = -self._negamax(board, new_depth, -alpha - 1, -alpha, ply + 1, False)
+                if st is not None:
+                    st.lmr += 1
+                    st.lmr_researches += score > alpha
                 if score > alpha:
                     score = -self._negamax(board, local_depth - 1, -beta, -alpha, ply + 1, False)
             else:
@@ -323,9 +615,12 @@ class Search:
                 else:
                     score = -self._negamax(board, local_depth - 1, -alpha - 1, -alpha, ply + 1, False)
                     if score > alpha and score < beta:
+                        if st is not None:
+                            st.pvs_researches += 1
                         score = -self._negamax(board, local_depth - 1, -beta, -alpha, ply + 1, True)
 
             board.pop()
+            line.pop()
             move_index += 1
 
             if score > best_score:
@@ -333,15 +628,21 @@ class Search:
                 best_move = m
                 if score > alpha:
                     alpha = score
+                    if is_pv:
+                        pvt[ply] = [m, *pvt[ply + 1]]
                     if alpha >= beta:
+                        if st is not None:
+                            st.cutoffs += 1
+                            st.first_move_cutoffs += move_index == 1
                         if not is_cap:
-                            k0, _k1 = killers
-                            self.killers[ply] = (m, k0)
-                            self.history[(board.turn, m.to_square)] = self.history.get((board.turn, m.to_square), 0) + local_depth*local_depth
+                            self.heur.quiet_cutoff(ply, move_code(m), pt, local_depth, prev1, prev2)
                         break
+        self._path.pop()
 
-        if best_move is None and not list(board.legal_moves):
-            return -MATE if board.is_check() else 0
+        if best_move is None:
+            if not list(board.legal_moves):
+                return -MATE + ply if board.is_check() else 0
+            best_score = alpha      # every move pruned: nothing here beats alpha
 
         flag = EXACT
         if best_score <= orig_alpha:
@@ -352,39 +653,161 @@ class Search:
 
         return best_score
 
-    def _pv_line(self, board: chess.Board, depth: int) -> List[chess.Move]:
-        pv = []
-        b = board.copy(stack=False)
-        for _ in range(depth):
-            tte = self.tt.probe(self.tt.key(b))
-            if not tte or not tte.best:
-                break
-            bm = tte.best
-            if bm not in b.legal_moves:
-                break
-            pv.append(bm)
-            b.push(bm)
-        return pv
+    def _root_moves(self, board: chess.Board) -> List[RootMove]:
+        key = self.tt.key(board)
+        tte = self.tt.probe(key)
+        prev1, prev2 = self._line[-1], self._line[-2]
+        moves = self._ordered_moves(board, tte.best if tte else None, 0, key, prev1, prev2)
+        base = 6 * board.turn - 1
+        return [RootMove(m, (base + board.piece_type_at(m.from_square)) * 64 + m.to_square) for m in moves]
+
+    def _sort_root(self, board: chess.Board) -> None:
+        """
+        Between iterations: best move first, the rest by the ordering key with this
+        iteration's history in it (stable, so ties keep their order). Sorting by
+        subtree node counts cost nodes here: with move-count pruning at the root
+        it keeps the same few quiets in front.
+        """
+        if not self._root:
+            return
+        key = self._move_key(board, self._root[0].move, 0, self.tt.key(board), self._line[-1], self._line[-2])
+        self._root.sort(key=lambda rm: key(rm.move), reverse=True)
+
+    def _search_root(self, board: chess.Board, depth: int, alpha: int, beta: int) -> int:
+        """
+        One aspiration pass over self._root (PVS, same pruning as _negamax). A move
+        that raises alpha moves to the front, so a re-search with a wider window
+        starts with it.
+        """
+        self.nodes += 1
+        st = self.stats
+        if st is not None:
+            st.nodes += 1
+        key = self.tt.key(board)
+        local_depth = depth + 1 if board.is_check() else depth
+        line = self._line
+        prev1, prev2 = line[-1], line[-2]
+        orig_alpha = alpha
+        best = None
+        best_score = -INF
+        show_currmove = time.monotonic() - self._start >= CURRMOVE_AFTER_S
+        static_eval = evaluate(board, False) if local_depth == 1 else None
+        pvt = self._pv
+        pvt[0] = []
+
+        self._path.append(key)
+        for i, rm in enumerate(self._root):
+            m = rm.move
+            # same frontier futility / move-count pruning as _negamax, never the first move
+            if i > 0 and not board.is_capture(m) and not board.gives_check(m):
+                if local_depth == 1 and static_eval + FUTILITY_MARGIN_BASE <= alpha:
+                    continue
+                if local_depth >= MCP_MIN_DEPTH and i >= MCP_START_AT:
+                    continue
+            if show_currmove:
+                print(f"info depth {depth} currmove {m.uci()} currmovenumber {i + 1}", flush=True)
+            board.push(m)
+            line.append(rm.pt)
+            if i == 0:
+                score = -self._negamax(board, local_depth - 1, -beta, -alpha, 1, True)
+            else:
+                score = -self._negamax(board, local_depth - 1, -alpha - 1, -alpha, 1, False)
+                if score > alpha and score < beta:
+                    if st is not None:
+                        st.pvs_researches += 1
+                    score = -self._negamax(board, local_depth - 1, -beta, -alpha, 1, True)
+            board.pop()
+            line.pop()
 
-    def search(self, board: chess.Board, max_depth: int):
-        self.nodes = 0
-        self.tt.age += 1
+            if score > best_score:
+                best_score = score
+                best = rm
+                if score > alpha:
+                    alpha = score
+                    pvt[0] = [m, *pvt[1]]
+                    if alpha >= beta:
+                        if st is not None:
+                            st.cutoffs += 1
+                            st.first_move_cutoffs += i == 0
+                        if not board.is_capture(m):
+                            self.heur.quiet_cutoff(0, move_code(m), rm.pt, local_depth, prev1, prev2)
+                        break
+        self._path.pop()
+
+        if best is None:
+            return -MATE if board.is_check() else 0
+        if best is not self._root[0] and best_score > orig_alpha:
+            self._root.remove(best)
+            self._root.insert(0, best)
+
+        flag = EXACT
+        if best_score <= orig_alpha:
+            flag = ALPHA
+        elif best_score >= beta:
+            flag = BETA
+        self.tt.store(key, depth, _to_tt(best_score, 0), flag, best.move)
+        return best_score
 
-        last_score = evaluate(board)
+    def _on_prev_pv(self, board: chess.Board, ply: int) -> bool:
+        """True if the moves from the root to `board` are the start of the previous iteration's PV."""
+        prev = self._prev_pv
+        if ply >= len(prev):
+            return False
+        return ply == 0 or board.move_stack[-ply:] == prev[:ply]
+
+    def search(self, board: chess.Board, max_depth: int,
+               nodes: Optional[int] = None, movetime_ms: Optional[int] = None):
+        """
+        Iterative deepening; yields the best move after every completed depth.
+        `max_depth`, `nodes` and `movetime_ms` are combined: the first one reached
+        ends the search. Node and time budgets are checked inside the tree, but only
+        after depth 1 has completed, so there is always a searched move.
+        Stops early (without yielding the unfinished depth) when stop_event is set or
+        a budget runs out; `board` is left mid-tree in that case, so callers pass a copy.
+        """
+        self.node_limit = nodes
+        self.deadline = (time.monotonic() + movetime_ms / 1000.0) if movetime_ms else None
+        self._budget_armed = False
+        try:
+            yield from self._iterate(board, max_depth)
+        except SearchAborted:
+            if DEBUG:
+                print(f"info string dbg=search aborted nodes={self.nodes}", flush=True)
+        finally:
+            self.node_limit = self.deadline = None
+            self._budget_armed = False
+
+    def _iterate(self, board: chess.Board, max_depth: int):
+        self.nodes = 0
+        self.tt.new_search()
+        self._age_heuristics(board)
+        self._path = self._history_keys(board)
+        self._line = line_before(board)
+        self._start = time.monotonic()
+        self._root = self._root_moves(board)
+        self._prev_pv = []
+
+        last_score = evaluate(board, False)
         overall_start = time.time()
         max_d = min(MAX_AB_DEPTH, max_depth)
         best_at_last_depth: Optional[chess.Move] = None
+        prev_mate: Optional[int] = None
 
         for depth in range(1, max_d + 1):
             if DEBUG:
                 print(f"info string dbg=iter depth={depth}", flush=True)
+            if self.stats is not None:
+                self.stats = SearchStats()
 
             window = ASP_WINDOW
             alpha = last_score - window
             beta  = last_score + window
 
             while True:
-                score = self._negamax(board, depth, alpha, beta, 0, True)
+                score = self._search_root(board, depth, alpha, beta)
+                if self.stats is not None:
+                    self.stats.asp_fail_low += score <= alpha
+                    self.stats.asp_fail_high += score >= beta
                 if score <= alpha and window < ASP_MAX_WIDEN:
                     window = min(ASP_MAX_WIDEN, window * 2)
                     alpha = score - window
@@ -395,18 +818,50 @@ class Search:
                     beta = score + window
                     alpha = beta - 2*window
                     continue
+                if (score <= alpha or score >= beta) and (alpha > -INF + 1 or beta < INF - 1):
+                    # still outside after max widening (mate scores): one full-window search
+                    alpha, beta = -INF + 1, INF - 1
+                    continue
                 break
 
             last_score = _clamp(score, -INF + 1, INF - 1)
-            pv = self._pv_line(board, depth)
+            self._sort_root(board)
+            pv = self._pv[0] or [rm.move for rm in self._root[:1]]
+            self._prev_pv = pv
             if pv:
                 best_at_last_depth = pv[0]
 
             spent = max(1e-6, time.time() - overall_start)
             nps = int(self.nodes / spent)
-            pv_str = " ".join(m.uci() for m in pv)
-            print(f"info depth {depth} nodes {self.nodes} nps {nps} score cp {last_score} pv {pv_str}", flush=True)
+            mate = mate_in_moves(last_score)
+            if self.emit_info is not None:
+                self.emit_info(depth, self.nodes, nps, score_cp=last_score, score_mate=mate, pv=pv)
+            else:
+                pv_str = " ".join(m.uci() for m in pv)
+                score_str = f"mate {mate}" if mate is not None else f"cp {last_score}"
+                print(f"info depth {depth} nodes {self.nodes} nps {nps} score {score_str} pv {pv_str}", flush=True)
+            if self.stats is not None:
+                print(f"info string {self.stats.line(depth)}", flush=True)
             yield best_at_last_depth
+            self._budget_armed = True
+            if self.node_limit is not None and self.nodes >= self.node_limit:
+                break
+            if self.deadline is not None and time.monotonic() >= self.deadline:
+                break
+            if len(self._root) <= 1:
+                if DEBUG:
+                    print(f"info string dbg=single legal move, search ends at depth={depth}", flush=True)
+                break
+
+            # Forced mate within the full-width horizon, confirmed by the next depth: done.
+            if mate is not None and MATE - abs(last_score) <= depth:
+                if mate == prev_mate:
+                    if DEBUG:
+                        print(f"info string dbg=mate verified mate={mate} depth={depth}", flush=True)
+                    break
+                prev_mate = mate
+            else:
+                prev_mate = None
 
 # ---------------------------
 # AB Engine implementation
@@ -415,8 +870,16 @@ class ABEngine(BaseEngine):
     """Alpha-Beta engine: extracted from the legacy monolith with minimal edits."""
 
     def __init__(self):
+        super().__init__()
         self.board = chess.Board()
         self.searcher = Search()
+        self._best_uci: Optional[str] = None     # best move of the last completed depth
+        self._pos_head: Optional[List[str]] = None   # last `position` command, split:
+        self._pos_moves: List[str] = []              # start part and its move list
+        self._stats = False                      # setoption Stats: per-iteration search counters
+        self._profile_mode = "off"               # setoption Profile: off | cprofile | sample
+        self._profile_dir: Optional[str] = None  # setoption ProfileDir
+        self._profile_seq = 0
         if DEBUG:
             print("info string dbg=engine init", flush=True)
 
@@ -427,10 +890,34 @@ class ABEngine(BaseEngine):
     def engine_author(self) -> str:
         return "open-source"
 
+    def uci_options(self) -> List[str]:
+        return [
+            "option name Stats type check default false",
+            f"option name Profile type combo default off {' '.join('var ' + m for m in PROFILE_MODES)}",
+            f"option name ProfileDir type string default {default_profile_dir()}",
+        ]
+
+    def on_setoption(self, name: str, value: str) -> None:
+        key = name.lower()
+        if key == "stats":
+            self._stats = value.lower() in ("true", "1", "on")
+        elif key == "profile" and value.lower() in PROFILE_MODES:
+            self._profile_mode = value.lower()
+        elif key == "profiledir":
+            self._profile_dir = value or None
+        elif DEBUG:
+            print(f"info string dbg=unknown-option {name}", flush=True)
+
     def on_new_game(self) -> None:
+        # The only place search state is dropped; consecutive `position ... moves`
+        # of one game keep (and age) TT, history and killers.
         self.board = chess.Board()
+        self._pos_head = None
         self.searcher = Search()
 
+    def current_board(self) -> chess.Board:
+        return self.board
+
     def on_quit(self) -> None:
         # no resources to release beyond default; breadcrumb already printed by base
         pass
@@ -440,26 +927,35 @@ class ABEngine(BaseEngine):
         parts = cmd.split()
         try:
             if "startpos" in parts:
-                self.board = chess.Board()
                 idx = parts.index("startpos") + 1
             elif "fen" in parts:
-                idx = parts.index("fen") + 1
-                fen = " ".join(parts[idx:idx+6])
-                self.board = chess.Board(fen)
-                idx += 6
+                idx = parts.index("fen") + 7
             else:
                 return
-            if idx < len(parts) and parts[idx] == "moves":
-                for mv in parts[idx+1:]:
-                    try:
-                        self.board.push_uci(mv)
-                    except Exception:
-                        if DEBUG:
-                            print(f"info string dbg=bad-move {mv}", flush=True)
+            head = parts[:idx]
+            moves = parts[idx+1:] if idx < len(parts) and parts[idx] == "moves" else []
+
+            # Same game, more moves (sessions, selfplay): only play the new ones
+            n = len(self._pos_moves)
+            if head == self._pos_head and moves[:n] == self._pos_moves:
+                new_moves = moves[n:]
+            else:
+                self.board = chess.Board() if head[-1] == "startpos" else chess.Board(" ".join(head[-6:]))
+                new_moves = moves
+            self._pos_head, self._pos_moves = head, moves
+            for mv in new_moves:
+                try:
+                    self.board.push_uci(mv)
+                except Exception:
+                    # board no longer matches the move list: rebuild on the next command
+                    self._pos_head = None
+                    if DEBUG:
+                        print(f"info string dbg=bad-move {mv}", flush=True)
         except Exception as e:
             if DEBUG:
                 print(f"info string dbg=position-parse-error {type(e).__name__}:{e}", flush=True)
             self.board = chess.Board()
+            self._pos_head = None
 
     def _current_best_or_default(self) -> str:
         legal = list(self.board.legal_moves)
@@ -469,6 +965,9 @@ class ABEngine(BaseEngine):
         return legal[0].uci()
 
     def bestmove_now(self) -> str:
+        # During a search self.board is untouched (the search runs on a copy)
+        if self.is_searching() and self._best_uci:
+            return self._best_uci
         return self._current_best_or_default()
 
     def go(self, cmd: str) -> str:
@@ -476,6 +975,8 @@ class ABEngine(BaseEngine):
         parts = cmd.split()
         depth = None
         rollouts = None
+        nodes = None
+        movetime = None
         i = 0
         while i < len(parts):
             if parts[i] == "depth" and i+1 < len(parts):
@@ -485,6 +986,17 @@ class ABEngine(BaseEngine):
                     depth = DEFAULT_DEPTH
                 i += 2
                 continue
+            if parts[i] in ("nodes", "movetime") and i+1 < len(parts):
+                try:
+                    val = max(1, int(parts[i+1]))
+                except ValueError:
+                    val = None
+                if parts[i] == "nodes":
+                    nodes = val
+                else:
+                    movetime = val
+                i += 2
+                continue
             if parts[i] == "rollouts" and i+1 < len(parts):
                 try:
                     rollouts = int(parts[i+1])
@@ -493,15 +1005,29 @@ class ABEngine(BaseEngine):
                 i += 2
                 continue
             i += 1
-        depth = depth or DEFAULT_DEPTH
+        if not depth:
+            # nodes/movetime alone: deepen until the budget runs out
+            depth = MAX_AB_DEPTH if (nodes or movetime) else DEFAULT_DEPTH
         if rollouts is None:
             rollouts = DEFAULT_ROLLOUTS
 
         if DEBUG:
-            print(f"info string dbg=go depth={depth} rollouts={rollouts} (rollouts ignored; AB-only)", flush=True)
+            print(f"info string dbg=go depth={depth} nodes={nodes} movetime={movetime} rollouts={rollouts} "
+                  f"(rollouts ignored; AB-only)", flush=True)
 
         best = None
-        for bm in self.searcher.search(self.board, depth):
-            best = bm
+        self._best_uci = None
+        self.searcher.stop_event = self.stop_event
+        self.searcher.emit_info = self.emit_info
+        self.searcher.stats = SearchStats() if self._stats else None
+        self._profile_seq += 1
+        tag = f"search-{os.getpid()}-{self._profile_seq:04d}"
+        with profile_search(self._profile_mode, self._profile_dir, tag) as profile_path:
+            for bm in self.searcher.search(self.board.copy(), depth, nodes, movetime):
+                best = bm
+                if bm is not None:
+                    self._best_uci = bm.uci()
+        if profile_path:
+            print(f"info string profile {self._profile_mode} {profile_path}", flush=True)
 
         return self._current_best_or_default() if best is None else best.uci()
\ No newline at end of file
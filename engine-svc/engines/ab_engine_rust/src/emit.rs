@@ -0,0 +1,119 @@
+// ab_engine_rust/src/emit.rs
+//
+// Engine -> bridge output: plain UCI text, or length-prefixed binary frames once
+// the bridge sends `setoption name Protocol value frames` (layout documented in
+// engines/frames.py). All output goes through here so lines and frames from the
+// command loop and the search thread never interleave.
+
+use chess::{ChessMove, Piece, Square};
+use std::io::{self, Write};
+use std::str::FromStr;
+use std::sync::Mutex;
+use std::sync::atomic::{AtomicBool, Ordering};
+
+pub const PROTOCOL_OPTION: &str = "option name Protocol type combo default uci var uci var frames";
+pub const PROTOCOL_ACK: &str = "protocol frames";
+
+const F_TEXT: u8 = 0;
+const F_INFO: u8 = 1;
+const F_BESTMOVE: u8 = 2;
+const F_READY: u8 = 3;
+const NO_MOVE: u16 = 0xFFFF;
+
+use crate::types::pack_move;
+
+static FRAMED: AtomicBool = AtomicBool::new(false);
+static OUT: Mutex<()> = Mutex::new(());
+
+/// Print `protocol frames` as the last text line, then switch to frames.
+pub fn enable_frames() {
+    let _g = OUT.lock().unwrap();
+    let mut out = io::stdout().lock();
+    let _ = writeln!(out, "{}", PROTOCOL_ACK);
+    let _ = out.flush();
+    FRAMED.store(true, Ordering::SeqCst);
+}
+
+fn write_frame(ftype: u8, payload: &[u8]) {
+    let _g = OUT.lock().unwrap();
+    let mut out = io::stdout().lock();
+    let mut buf = Vec::with_capacity(5 + payload.len());
+    buf.push(ftype);
+    buf.extend_from_slice(&(payload.len() as u32).to_le_bytes());
+    buf.extend_from_slice(payload);
+    let _ = out.write_all(&buf);
+    let _ = out.flush();
+}
+
+/// One text line (TEXT frame in framed mode).
+pub fn line(s: &str) {
+    if FRAMED.load(Ordering::Relaxed) {
+        write_frame(F_TEXT, s.as_bytes());
+    } else {
+        let _g = OUT.lock().unwrap();
+        let mut out = io::stdout().lock();
+        let _ = writeln!(out, "{}", s);
+        let _ = out.flush();
+    }
+}
+
+#[macro_export]
+macro_rules! out {
+    ($($arg:tt)*) => { $crate::emit::line(&format!($($arg)*)) };
+}
+
+// Frame move codes use the same 16-bit layout as the TT (types::pack_move).
+fn encode_uci(s: &str) -> u16 {
+    if s.len() < 4 { return 0; }
+    let (from, to) = match (Square::from_str(&s[0..2]), Square::from_str(&s[2..4])) {
+        (Ok(f), Ok(t)) => (f, t),
+        _ => return 0,
+    };
+    let promo = match s.get(4..5) {
+        Some("n") => Some(Piece::Knight), Some("b") => Some(Piece::Bishop),
+        Some("r") => Some(Piece::Rook),   Some("q") => Some(Piece::Queen), _ => None,
+    };
+    pack_move(ChessMove::new(from, to, promo))
+}
+
+/// `info depth .. nodes .. nps .. score cp .. pv ..`
+pub fn info(depth: i32, nodes: u64, nps: u64, score_cp: i32, pv: &[ChessMove]) {
+    if !FRAMED.load(Ordering::Relaxed) {
+        let pv_str = pv.iter().map(|m| m.to_string()).collect::<Vec<_>>().join(" ");
+        line(&format!("info depth {} nodes {} nps {} score cp {} pv {}", depth, nodes, nps, score_cp, pv_str));
+        return;
+    }
+    let n = pv.len().min(255);
+    let mut p = Vec::with_capacity(20 + 2 * n);
+    p.extend_from_slice(&(depth.max(0) as u16).to_le_bytes());
+    p.extend_from_slice(&nodes.to_le_bytes());
+    p.extend_from_slice(&(nps.min(u32::MAX as u64) as u32).to_le_bytes());
+    p.push(0); // score kind: cp
+    p.extend_from_slice(&score_cp.to_le_bytes());
+    p.push(n as u8);
+    for m in &pv[..n] {
+        p.extend_from_slice(&pack_move(*m).to_le_bytes());
+    }
+    write_frame(F_INFO, &p);
+}
+
+/// `bestmove <uci>`; `best` is a UCI string ("0000" when there is no legal move).
+pub fn bestmove(best: &str) {
+    if !FRAMED.load(Ordering::Relaxed) {
+        line(&format!("bestmove {}", best));
+        return;
+    }
+    let code = encode_uci(best);
+    let mut p = Vec::with_capacity(4);
+    p.extend_from_slice(&code.to_le_bytes());
+    p.extend_from_slice(&NO_MOVE.to_le_bytes());
+    write_frame(F_BESTMOVE, &p);
+}
+
+pub fn ready() {
+    if FRAMED.load(Ordering::Relaxed) {
+        write_frame(F_READY, &[]);
+    } else {
+        line("readyok");
+    }
+}
@@ -1,5 +1,6 @@
-use chess::{Board, BoardStatus, Color, Piece, Square, BitBoard};
+use chess::{Board, BoardStatus, Color, Piece, Square, BitBoard, ALL_PIECES};
 use crate::types::*;
+use crate::params::params;
 
 pub struct ClassicalEval;
 
@@ -17,14 +18,18 @@ impl ClassicalEval {
         let mut mg = 0i32;
         let mut eg = 0i32;
 
-        // ----- Material base (kept) -----
+        // ----- Material + PST (EvalParams: built-in or $EVAL_PARAMS) -----
+        let prm = params();
         for &color in &[Color::White, Color::Black] {
             let sgn = if color == b.side_to_move() { 1 } else { -1 };
-            let mat = P * count_pieces(b, Piece::Pawn, color)
-                    + N * count_pieces(b, Piece::Knight, color)
-                    + B * count_pieces(b, Piece::Bishop, color)
-                    + R_ * count_pieces(b, Piece::Rook,   color)
-                    + Q_ * count_pieces(b, Piece::Queen,  color);
+            let mut mat = 0;
+            for &piece in &ALL_PIECES {
+                let bb = b.color_combined(color) & b.pieces(piece);
+                mat += prm.value(piece) * bb.popcnt() as i32;
+                for sq in bb {
+                    mat += prm.pst(piece, color, sq);
+                }
+            }
             mg += sgn * mat;
             eg += sgn * mat;
         }
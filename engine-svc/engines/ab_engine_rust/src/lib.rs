@@ -1,14 +1,18 @@
 // ab_engine_rust/src/lib.rs
 
 pub mod types;
+pub mod emit;
+pub mod params;
 pub mod eval;
 pub mod ordering;
 pub mod tt;
 pub mod search;
+pub mod perft;
 
 // (Optional) nice re-exports so main.rs can `use engine::search::Search;` etc.
 pub use types::*;
 pub use eval::ClassicalEval;
+pub use params::{EvalParams, params};
 pub use ordering::{Ordering as MoveOrdering, Killers, History};
 pub use tt::TT;
 pub use search::Search;
@@ -1,6 +1,7 @@
 use chess::{Board, ChessMove, MoveGen, Square};
-use engine::search::{Search, root_search, pv_line_from_tt, current_best_or_default};
+use engine::search::{Limits, Search, root_search, pv_line_from_tt, current_best_or_default};
 use engine::types::*;
+use engine::{emit, out, perft};
 use std::io::{self, BufRead, Write};
 use std::str::FromStr;
 use std::sync::{Arc};
@@ -27,11 +28,12 @@ fn parse_uci_move(s: &str) -> Option<ChessMove> {
 fn main() -> io::Result<()> {
     let stdin = io::stdin();
     let mut stdout = io::stdout();
+    let _ = engine::params::params();   // load $EVAL_PARAMS up front (errors go to stderr)
 
-    println!("id name PyRefEngine (AB-only)");
-    println!("id author open-source");
-    println!("uciok");
-    stdout.flush()?;
+    out!("id name PyRefEngine (AB-only)");
+    out!("id author open-source");
+    out!("{}", emit::PROTOCOL_OPTION);
+    out!("uciok");
 
     let (tx_cmd, rx_cmd) = std::sync::mpsc::channel::<String>();
     thread::spawn(move || {
@@ -44,24 +46,38 @@ fn main() -> io::Result<()> {
     });
 
     let mut board = Board::default();
-    let mut search_handle: Option<std::thread::JoinHandle<()>> = None;
+    // Hashes of every position of the current game (start + after each move), root last.
+    let mut game_keys: Vec<u64> = vec![board_key(&board)];
+    // Search state (TT, history, killers) lives across `go` commands until `ucinewgame`;
+    // the search thread owns it while running and hands it back when joined.
+    let mut searcher: Option<Search> = None;
+    let mut search_handle: Option<std::thread::JoinHandle<Search>> = None;
     let stop_flag = Arc::new(AtomicBool::new(false));
     let bestmove_sent = Arc::new(AtomicBool::new(false));
 
     while let Ok(cmd) = rx_cmd.recv() {
-        println!("info string dbg=recv '{}'", cmd);
+        out!("info string dbg=recv '{}'", cmd);
         stdout.flush()?;
 
         if cmd == "uci" {
-            println!("id name PyRefEngine (AB-only)");
-            println!("id author open-source");
-            println!("uciok");
-            stdout.flush()?;
+            out!("id name PyRefEngine (AB-only)");
+            out!("id author open-source");
+            out!("{}", emit::PROTOCOL_OPTION);
+            out!("uciok");
             continue;
         }
         if cmd == "isready" {
-            println!("readyok");
-            stdout.flush()?;
+            emit::ready();
+            continue;
+        }
+        if let Some(rest) = cmd.strip_prefix("setoption name ") {
+            let (name, value) = match rest.split_once(" value ") {
+                Some((n, v)) => (n.trim(), v.trim()),
+                None => (rest.trim(), ""),
+            };
+            if name.eq_ignore_ascii_case("protocol") && value.eq_ignore_ascii_case("frames") {
+                emit::enable_frames();
+            }
             continue;
         }
         if cmd.starts_with("ucinewgame") {
@@ -71,7 +87,9 @@ fn main() -> io::Result<()> {
                 stop_flag.store(false, Ordering::Relaxed);
                 bestmove_sent.store(false, Ordering::Relaxed);
             }
+            searcher = None;
             board = Board::default();
+            game_keys = vec![board_key(&board)];
             stdout.flush()?;
             continue;
         }
@@ -88,7 +106,7 @@ fn main() -> io::Result<()> {
                         match Board::from_str(&fen) {
                             Ok(b) => board = b,
                             Err(e) => {
-                                println!("info string dbg=position-parse-error {}:{}", "FEN", e);
+                                out!("info string dbg=position-parse-error {}:{}", "FEN", e);
                                 board = Board::default();
                                 stdout.flush()?;
                                 continue;
@@ -96,28 +114,30 @@ fn main() -> io::Result<()> {
                         }
                         idx = 7;
                     } else {
-                        println!("info string dbg=position-parse-error {}:{}", "FEN", "expected 6 tokens");
+                        out!("info string dbg=position-parse-error {}:{}", "FEN", "expected 6 tokens");
                         board = Board::default();
                         stdout.flush()?;
                         continue;
                     }
                 } else {
-                    println!("info string dbg=position-parse-error {}:{}", "SYNTAX", "expected startpos or fen");
+                    out!("info string dbg=position-parse-error {}:{}", "SYNTAX", "expected startpos or fen");
                     board = Board::default();
                     stdout.flush()?;
                     continue;
                 }
 
+                game_keys = vec![board_key(&board)];
                 if idx < parts.len() && parts[idx] == "moves" {
                     for mv_str in &parts[idx + 1..] {
                         if let Some(mv) = parse_uci_move(mv_str) {
                             if MoveGen::new_legal(&board).any(|m| m == mv) {
                                 board = board.make_move_new(mv);
+                                game_keys.push(board_key(&board));
                             } else {
-                                println!("info string dbg=bad-move {}", mv_str);
+                                out!("info string dbg=bad-move {}", mv_str);
                             }
                         } else {
-                            println!("info string dbg=bad-move {}", mv_str);
+                            out!("info string dbg=bad-move {}", mv_str);
                         }
                     }
                 }
@@ -126,49 +146,73 @@ fn main() -> io::Result<()> {
             continue;
         }
 
+        if cmd.starts_with("perft ") || cmd.starts_with("divide ") || cmd.starts_with("go perft ") {
+            // move-generation check; runs in the command loop (no stop)
+            if let Some(h) = search_handle.take() {
+                stop_flag.store(true, Ordering::Relaxed);
+                if let Ok(s) = h.join() { searcher = Some(s); }
+                stop_flag.store(false, Ordering::Relaxed);
+                bestmove_sent.store(false, Ordering::Relaxed);
+            }
+            perft::run_uci(&board, &cmd);
+            continue;
+        }
+
         if cmd.starts_with("go ") {
-            let mut depth: i32 = DEFAULT_DEPTH;
+            let mut depth: Option<i32> = None;
             let mut rollouts: i32 = DEFAULT_ROLLOUTS;
             let mut movetime_ms: Option<u64> = None;
+            let mut node_limit: Option<u64> = None;
 
             let parts: Vec<&str> = cmd.split_whitespace().collect();
             let mut i = 1;
             while i + 1 < parts.len() {
                 match parts[i] {
-                    "depth" => { if let Ok(d) = parts[i + 1].parse::<i32>() { depth = d; } i += 2; }
+                    "depth" => { if let Ok(d) = parts[i + 1].parse::<i32>() { depth = Some(d); } i += 2; }
+                    "nodes" => { if let Ok(n) = parts[i + 1].parse::<u64>() { node_limit = Some(n.max(1)); } i += 2; }
                     "rollouts" => { if let Ok(r) = parts[i + 1].parse::<i32>() { rollouts = r; } i += 2; }
                     "movetime" => { if let Ok(ms) = parts[i + 1].parse::<u64>() { movetime_ms = Some(ms); } i += 2; }
                     _ => i += 1,
                 }
             }
 
-            println!("info string dbg=go depth={} rollouts={} (rollouts ignored; AB-only)", depth, rollouts);
+            // nodes/movetime alone: deepen until the budget runs out
+            let depth = depth.unwrap_or(if node_limit.is_some() || movetime_ms.is_some() { MAX_AB_DEPTH } else { DEFAULT_DEPTH });
+            out!("info string dbg=go depth={} nodes={:?} movetime={:?} rollouts={} (rollouts ignored; AB-only)",
+                 depth, node_limit, movetime_ms, rollouts);
             stdout.flush()?;
 
             if let Some(h) = search_handle.take() {
                 stop_flag.store(true, Ordering::Relaxed);
-                let _ = h.join();
+                if let Ok(s) = h.join() { searcher = Some(s); }
                 stop_flag.store(false, Ordering::Relaxed);
                 bestmove_sent.store(false, Ordering::Relaxed);
             }
 
             let b0 = board;
+            let keys0 = game_keys.clone();
             let stop = Arc::clone(&stop_flag);
             let sent = Arc::clone(&bestmove_sent);
+            let mut search = searcher.take().unwrap_or_else(|| Search::new(Arc::clone(&stop_flag)));
 
             search_handle = Some(thread::spawn(move || {
                 let start = Instant::now();
                 let time_limit = movetime_ms.map(Duration::from_millis);
+                // First limit hit wins; budgets are enforced inside the tree from depth 2 on,
+                // so there is always a fully searched move.
+                let limits = Limits { nodes: node_limit, deadline: time_limit.map(|tl| start + tl) };
 
-                let mut search = Search::new(Arc::clone(&stop));
+                search.new_search(&b0);
+                search.limits = Limits::default();
 
                 let mut last_score = search.evaluate(&b0);
                 let mut root_best: Option<ChessMove> = None;
 
                 let max_depth = depth.max(1).min(MAX_AB_DEPTH);
                 for d in 1..=max_depth {
-                    if let Some(tl) = time_limit { if start.elapsed() >= tl { break; } }
+                    if d > 1 { if let Some(tl) = time_limit { if start.elapsed() >= tl { break; } } }
                     if stop.load(Ordering::Relaxed) { break; }
+                    if d == 2 { search.limits = limits; }
 
                     search.on_new_iter();
 
@@ -178,8 +222,9 @@ fn main() -> io::Result<()> {
 
                     let mut score;
                     loop {
-                        let (best_move, sc) = root_search(&mut search, &b0, d, alpha, beta);
+                        let (best_move, sc) = root_search(&mut search, &b0, d, alpha, beta, &keys0);
                         score = sc;
+                        if search.out_of_budget { break; }
                         if (score <= alpha || score >= beta) && window < ASP_MAX_WIDEN {
                             window = (window * 2).min(ASP_MAX_WIDEN);
                             alpha = score - window;
@@ -191,27 +236,31 @@ fn main() -> io::Result<()> {
                         }
                     }
 
+                    if search.out_of_budget {
+                        out!("info string dbg=budget exhausted depth={} nodes={}", d, search.total_nodes());
+                        break;
+                    }
                     last_score = clamp(score, -INF + 1, INF - 1);
 
                     let elapsed = start.elapsed().as_secs_f64().max(1e-6);
                     let nps = (search.nodes as f64 / elapsed) as u64;
                     let pv = pv_line_from_tt(b0, &search.tt, d as usize);
-                    let pv_str = pv.iter().map(|m| m.to_string()).collect::<Vec<_>>().join(" ");
-                    println!("info depth {} nodes {} nps {} score cp {} pv {}", d, search.nodes, nps, last_score, pv_str);
-                    println!("info string dbg=iter depth={}", d);
-                    io::stdout().flush().ok();
+                    emit::info(d, search.nodes, nps, last_score, &pv);
+                    out!("info string dbg=iter depth={}", d);
 
                     if stop.load(Ordering::Relaxed) { break; }
                     if let Some(tl) = time_limit { if start.elapsed() >= tl { break; } }
+                    if let Some(n) = node_limit { if search.total_nodes() >= n { break; } }
                 }
+                search.limits = Limits::default();
 
-                if stop.load(Ordering::Relaxed) { return; }
+                if stop.load(Ordering::Relaxed) { return search; }
 
                 if !sent.swap(true, Ordering::Relaxed) {
                     let best_uci = if let Some(m) = root_best { m.to_string() } else { current_best_or_default(&b0) };
-                    println!("bestmove {}", best_uci);
-                    io::stdout().flush().ok();
+                    emit::bestmove(&best_uci);
                 }
+                search
             }));
 
             continue;
@@ -220,14 +269,13 @@ fn main() -> io::Result<()> {
         if cmd == "stop" {
             stop_flag.store(true, Ordering::Relaxed);
             if !bestmove_sent.swap(true, Ordering::Relaxed) {
-                println!("bestmove {}", current_best_or_default(&board));
-                stdout.flush()?;
+                emit::bestmove(&current_best_or_default(&board));
             }
             continue;
         }
 
         if cmd == "quit" {
-            println!("info string dbg=quit");
+            out!("info string dbg=quit");
             stdout.flush()?;
             if let Some(h) = search_handle.take() {
                 stop_flag.store(true, Ordering::Relaxed);
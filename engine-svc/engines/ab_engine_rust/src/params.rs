@@ -0,0 +1,94 @@
+// ab_engine_rust/src/params.rs
+//
+// Evaluation parameters (piece values + PSTs), optionally loaded at startup from
+// the file named by $EVAL_PARAMS — same text format as engines/eval_params.py
+// (written by tuning/texel.py). Without the variable the built-in constants apply.
+
+use chess::{Color, Piece, Square};
+use std::sync::OnceLock;
+use crate::types::*;
+
+pub const EVAL_PARAMS_ENV: &str = "EVAL_PARAMS";
+
+const PIECE_NAMES: [&str; 6] = ["pawn", "knight", "bishop", "rook", "queen", "king"];
+
+pub struct EvalParams {
+    /// Indexed by `Piece::to_index()` (P, N, B, R, Q, K).
+    pub piece: [i32; 6],
+    /// White's point of view, a1 = 0; Black uses `pst_index_for`.
+    pub pst: [[i32; 64]; 6],
+}
+
+impl EvalParams {
+    pub fn defaults() -> Self {
+        EvalParams {
+            piece: [P, N, B, R_, Q_, 0],
+            pst: [PST_PAWN, PST_KNIGHT, PST_BISHOP, PST_ROOK, PST_QUEEN, PST_KING],
+        }
+    }
+
+    /// Parse `text`, starting from the defaults; sections may be omitted.
+    pub fn parse(text: &str) -> Result<Self, String> {
+        let mut out = Self::defaults();
+        let tokens: Vec<&str> = text
+            .lines()
+            .flat_map(|l| l.split('#').next().unwrap_or("").split_whitespace())
+            .collect();
+        let mut i = 0;
+        while i < tokens.len() {
+            let key = tokens[i];
+            let n = if key == "piece_values" {
+                6
+            } else if key.strip_prefix("pst_").map_or(false, |p| PIECE_NAMES.contains(&p)) {
+                64
+            } else {
+                return Err(format!("unknown section '{}'", key));
+            };
+            if i + 1 + n > tokens.len() {
+                return Err(format!("section '{}' needs {} integers", key, n));
+            }
+            let mut nums = Vec::with_capacity(n);
+            for t in &tokens[i + 1..i + 1 + n] {
+                nums.push(t.parse::<i32>().map_err(|_| format!("section '{}' has a non-integer entry", key))?);
+            }
+            if n == 6 {
+                out.piece.copy_from_slice(&nums);
+            } else {
+                let idx = PIECE_NAMES.iter().position(|p| key[4..] == **p).unwrap();
+                out.pst[idx].copy_from_slice(&nums);
+            }
+            i += 1 + n;
+        }
+        Ok(out)
+    }
+
+    fn from_env() -> Self {
+        let path = match std::env::var(EVAL_PARAMS_ENV) {
+            Ok(p) if !p.is_empty() => p,
+            _ => return Self::defaults(),
+        };
+        // stderr: stdout belongs to the UCI protocol
+        match std::fs::read_to_string(&path).map_err(|e| e.to_string()).and_then(|t| Self::parse(&t)) {
+            Ok(p) => p,
+            Err(e) => {
+                eprintln!("eval params not loaded ({}): {}", path, e);
+                Self::defaults()
+            }
+        }
+    }
+
+    #[inline]
+    pub fn value(&self, piece: Piece) -> i32 { self.piece[piece.to_index()] }
+
+    #[inline]
+    pub fn pst(&self, piece: Piece, color: Color, sq: Square) -> i32 {
+        self.pst[piece.to_index()][pst_index_for(color, sq)]
+    }
+}
+
+static PARAMS: OnceLock<EvalParams> = OnceLock::new();
+
+/// Process-wide parameters; the env var is read on first use.
+pub fn params() -> &'static EvalParams {
+    PARAMS.get_or_init(EvalParams::from_env)
+}
@@ -0,0 +1,54 @@
+// ab_engine_rust/src/perft.rs
+//
+// Perft / divide on the chess crate's legal move generator, for checking move
+// generation without search. Same commands and output as engines/perft.py:
+//   perft <depth> [full]    divide <depth> [full]    go perft <depth>
+// Bulk counting (default): depth-1 nodes count their moves instead of playing
+// them; `full` makes every leaf move.
+
+use chess::{Board, MoveGen};
+use std::time::Instant;
+
+pub fn perft(board: &Board, depth: u32, bulk: bool) -> u64 {
+    if depth == 0 { return 1; }
+    let moves = MoveGen::new_legal(board);
+    if bulk && depth == 1 { return moves.len() as u64; }
+    moves.map(|m| perft(&board.make_move_new(m), depth - 1, bulk)).sum()
+}
+
+pub fn divide(board: &Board, depth: u32, bulk: bool) -> Vec<(String, u64)> {
+    MoveGen::new_legal(board)
+        .map(|m| (m.to_string(), perft(&board.make_move_new(m), depth.saturating_sub(1), bulk)))
+        .collect()
+}
+
+/// Answer one perft/divide command for `board`.
+pub fn run_uci(board: &Board, cmd: &str) {
+    let mut toks: Vec<&str> = cmd.split_whitespace().collect();
+    let go = toks.first() == Some(&"go");
+    if go { toks.remove(0); }
+    let depth = match toks.get(1).and_then(|t| t.parse::<u32>().ok()) {
+        Some(d) => d,
+        None => {
+            crate::out!("info string perft: expected '{} <depth>'", toks.first().copied().unwrap_or("perft"));
+            return;
+        }
+    };
+    let bulk = !toks[2..].contains(&"full");
+
+    let start = Instant::now();
+    let rows = if go || toks[0] == "divide" { Some(divide(board, depth, bulk)) } else { None };
+    let nodes = match &rows {
+        Some(r) if depth > 0 => r.iter().map(|(_, n)| n).sum(),
+        Some(_) => 1,
+        None => perft(board, depth, bulk),
+    };
+    let ms = (start.elapsed().as_millis() as u64).max(1);
+
+    if let Some(r) = rows {
+        for (m, n) in &r { crate::out!("{}: {}", m, n); }
+        crate::out!("");
+    }
+    crate::out!("Nodes searched: {}", nodes);
+    crate::out!("info string perft depth {} nodes {} time {} nps {}", depth, nodes, ms, nodes * 1000 / ms);
+}
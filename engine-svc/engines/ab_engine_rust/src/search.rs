@@ -2,6 +2,7 @@ use std::collections::HashMap;
 use std::env;
 use std::sync::Arc;
 use std::sync::atomic::{AtomicBool, Ordering};
+use std::time::Instant;
 
 use chess::{Board, BoardStatus, ChessMove, MoveGen};
 
@@ -43,13 +44,25 @@ fn mvv_lva_quick(b: &Board, mv: ChessMove) -> i32 {
 }
 // ---------------------------------------------------------------------------
 
+/// Node / time budget of one `go`, checked inside the tree (see `Search::stopped`).
+#[derive(Clone, Copy, Default)]
+pub struct Limits {
+    pub nodes: Option<u64>,
+    pub deadline: Option<Instant>,
+}
+
 pub struct Search {
     pub nodes: u64,
     pub stop: Arc<AtomicBool>,
+    pub limits: Limits,
+    /// Set once a budget in `limits` ran out; the current iteration is then discarded.
+    pub out_of_budget: bool,
+    nodes_before_iter: u64,
     pub tt: TT,
     pub killers: Killers,
     pub history: History,
     eval: ClassicalEval,
+    last_root_ply: Option<i32>,
 }
 
 impl Search {
@@ -58,55 +71,126 @@ impl Search {
         Self {
             nodes: 0,
             stop,
+            limits: Limits::default(),
+            out_of_budget: false,
+            nodes_before_iter: 0,
             tt: TT::new_from_mb(tt_mb),
             killers: HashMap::new(),
             history: HashMap::new(),
             eval: ClassicalEval,
+            last_root_ply: None,
+        }
+    }
+
+    /// Called once per `go`. The same Search lives until `ucinewgame`, so TT,
+    /// history and killers carry over between moves of a game — aged, not cleared.
+    pub fn new_search(&mut self, root: &Board) {
+        self.nodes = 0;
+        self.nodes_before_iter = 0;
+        self.out_of_budget = false;
+        self.tt.age = self.tt.age.wrapping_add(1);
+
+        let root_ply = (fullmove_number_from_fen(root) as i32 - 1) * 2
+            + if root.side_to_move() == chess::Color::Black { 1 } else { 0 };
+        let played = self.last_root_ply.map(|p| root_ply - p).unwrap_or(0);
+        self.last_root_ply = Some(root_ply);
+        if played > 0 {
+            // killers are keyed by distance from the root: shift them along with it
+            let shifted: Killers = self.killers.drain()
+                .filter(|(p, _)| *p >= played)
+                .map(|(p, k)| (p - played, k))
+                .collect();
+            self.killers = shifted;
+        } else if played < 0 {
+            self.killers.clear();
         }
+        for v in self.history.values_mut() { *v >>= HISTORY_AGE_SHIFT; }
+        self.history.retain(|_, v| *v != 0);
     }
 
     #[inline] pub fn on_new_iter(&mut self) {
+        self.nodes_before_iter += self.nodes;
         self.nodes = 0;
         self.tt.age = self.tt.age.wrapping_add(1);
     }
 
+    /// Nodes searched since `new_search` (all iterations).
+    #[inline] pub fn total_nodes(&self) -> u64 { self.nodes_before_iter + self.nodes }
+
+    /// Stop token or exhausted budget. The clock is read every 1024 nodes.
+    #[inline]
+    pub fn stopped(&mut self) -> bool {
+        if self.out_of_budget || self.stop.load(Ordering::Relaxed) { return true; }
+        if let Some(n) = self.limits.nodes {
+            if self.total_nodes() >= n { self.out_of_budget = true; }
+        }
+        if let Some(t) = self.limits.deadline {
+            if self.nodes & 1023 == 0 && Instant::now() >= t { self.out_of_budget = true; }
+        }
+        self.out_of_budget
+    }
+
     #[inline] pub fn evaluate(&self, b: &Board) -> i32 { self.eval.eval(b) }
 
-    fn qsearch(&mut self, b: &Board, mut alpha: i32, beta: i32) -> i32 {
-        if self.stop.load(Ordering::Relaxed) { return alpha; }
+    fn qsearch(&mut self, b: &Board, mut alpha: i32, beta: i32, qply: i32) -> i32 {
+        if self.stopped() { return alpha; }
         self.nodes = self.nodes.wrapping_add(1);
 
-        match b.status() {
-            BoardStatus::Checkmate => return -MATE,
-            BoardStatus::Stalemate => return 0,
-            BoardStatus::Ongoing => {}
-        }
         if insufficient_material(b) { return 0; }
         if halfmove_clock_from_fen(b) as i32 >= 100 { return 0; }
 
+        // In check: no stand-pat, search every evasion (legal gen == evasion gen here).
+        if b.checkers().popcnt() > 0 {
+            let mut any_legal = false;
+            for m in MoveGen::new_legal(b) {
+                if self.stopped() { break; }
+                any_legal = true;
+                let nb = b.make_move_new(m);
+                let score = -self.qsearch(&nb, -beta, -alpha, qply + 1);
+                if score >= beta { return beta; }
+                if score > alpha { alpha = score; }
+            }
+            // no evasion searched because the budget ran out is not a mate
+            return if any_legal || self.stopped() { alpha } else { -MATE };
+        }
+
+        // evaluate() also scores stalemate
         let stand = self.evaluate(b);
         if stand >= beta { return beta; }
         if stand > alpha { alpha = stand; }
         if stand + Q_FUTILITY_MARGIN < alpha { return alpha; }
 
-        // Build noisy list without borrowing self
-        let mut noisy = Vec::new();
-        for m in MoveGen::new_legal(b) {
-            let cap = is_capture_quick(b, m);
-            let promo = m.get_promotion().is_some();
-            let gives_check = if Q_INCLUDE_CHECKS {
-                b.make_move_new(m).checkers().popcnt() > 0
-            } else {
-                false
-            };
-            if cap || gives_check || promo { noisy.push(m); }
-        }
+        // Noisy moves via target masks instead of filtering every legal move:
+        // captures first, then (from the empty-square pass) en-passant captures,
+        // quiet queen promotions and (first q-ply only) quiet checks.
+        let mut movegen = MoveGen::new_legal(b);
+        let mut noisy: Vec<ChessMove> = Vec::new();
+        movegen.set_iterator_mask(*b.color_combined(!b.side_to_move()));
+        for m in &mut movegen { noisy.push(m); }
         noisy.sort_by_key(|&m| std::cmp::Reverse(mvv_lva_quick(b, m)));
+        movegen.set_iterator_mask(!*b.combined());
+        for m in &mut movegen {
+            // a pawn changing file onto an empty square can only be en passant
+            let en_passant = b.piece_on(m.get_source()) == Some(chess::Piece::Pawn)
+                && m.get_source().get_file() != m.get_dest().get_file();
+            if en_passant || m.get_promotion() == Some(chess::Piece::Queen) {
+                noisy.push(m);
+            } else if Q_INCLUDE_CHECKS && qply == 0 && m.get_promotion().is_none()
+                && b.make_move_new(m).checkers().popcnt() > 0 {
+                noisy.push(m);
+            }
+        }
 
         for m in noisy {
-            if self.stop.load(Ordering::Relaxed) { break; }
+            if self.stopped() { break; }
+            if m.get_promotion().is_none() {
+                if let Some(victim) = b.piece_on(m.get_dest()) {
+                    // delta pruning: even winning the victim for free can't reach alpha
+                    if stand + piece_val(victim) + Q_DELTA_MARGIN <= alpha { continue; }
+                }
+            }
             let nb = b.make_move_new(m);
-            let score = -self.qsearch(&nb, -beta, -alpha);
+            let score = -self.qsearch(&nb, -beta, -alpha, qply + 1);
             if score >= beta { return beta; }
             if score > alpha { alpha = score; }
         }
@@ -124,7 +208,7 @@ impl Search {
         parent_eval: Option<i32>,
         rep_stack: &mut Vec<u64>,
     ) -> i32 {
-        if self.stop.load(Ordering::Relaxed) { return alpha; }
+        if self.stopped() { return alpha; }
         self.nodes = self.nodes.wrapping_add(1);
 
         match b.status() {
@@ -154,7 +238,7 @@ impl Search {
         let in_check = b.checkers().popcnt() > 0;
         let local_depth = if in_check { depth + 1 } else { depth };
         if local_depth <= 0 {
-            let rv = self.qsearch(b, alpha, beta);
+            let rv = self.qsearch(b, alpha, beta, 0);
             rep_stack.pop();
             return rv;
         }
@@ -181,7 +265,7 @@ impl Search {
 
         let mut move_index = 0usize;
         for m in moves {
-            if self.stop.load(Ordering::Relaxed) { break; }
+            if self.stopped() { break; }
 
             let is_cap = is_capture_quick(b, m);
             let nb = b.make_move_new(m);
@@ -256,6 +340,13 @@ impl Search {
             move_index += 1;
         }
 
+        // Aborted mid-node (stop or budget): the score covers only part of the moves.
+        // Keep it out of the TT, which outlives this `go`.
+        if self.stopped() {
+            rep_stack.pop();
+            return alpha;
+        }
+
         // No legal moves
         if best_move.is_none() && MoveGen::new_legal(b).next().is_none() {
             rep_stack.pop();
@@ -292,12 +383,15 @@ pub fn pv_line_from_tt(mut b: Board, tt: &TT, max_len: usize) -> Vec<ChessMove>
     pv
 }
 
+/// `game_keys`: hashes of the positions of the game so far (from the `position`
+/// command), ending with the root; used for repetition detection.
 pub fn root_search(
     search: &mut Search,
     b: &Board,
     depth: i32,
     alpha: i32,
     beta: i32,
+    game_keys: &[u64],
 ) -> (Option<ChessMove>, i32) {
     let mut a = alpha;
     let mut best_score = -INF;
@@ -315,10 +409,10 @@ pub fn root_search(
     let parent_eval = Some(search.evaluate(b));
 
     for (i, m) in moves.drain(..).enumerate() {
-        if search.stop.load(Ordering::Relaxed) { break; }
+        if search.stopped() { break; }
         let nb = b.make_move_new(m);
 
-        let mut rep_stack = vec![board_key(b)];
+        let mut rep_stack = if game_keys.is_empty() { vec![board_key(b)] } else { game_keys.to_vec() };
         let mut score;
         if i == 0 {
             score = -search.negamax(&nb, depth - 1, -beta, -a, 1, true, parent_eval, &mut rep_stack);
@@ -10,8 +10,9 @@ pub const INF: i32 = 60_000;
 pub const MATE: i32 = 30_000;
 
 // Quiescence
-pub const Q_INCLUDE_CHECKS: bool = true;
+pub const Q_INCLUDE_CHECKS: bool = true;   // quiet checks, first q-ply only
 pub const Q_FUTILITY_MARGIN: i32 = 150;
+pub const Q_DELTA_MARGIN: i32 = 200;
 
 // LMR
 pub const LMR_MIN_DEPTH: i32 = 3;
@@ -28,6 +29,9 @@ pub const MCP_START_AT: usize = 6;
 pub const ASP_WINDOW: i32 = 24;
 pub const ASP_MAX_WIDEN: i32 = 2048;
 
+// Search state kept between moves of one game (reset on ucinewgame)
+pub const HISTORY_AGE_SHIFT: u32 = 1;
+
 // Piece values
 pub const P: i32 = 100;
 pub const N: i32 = 320;
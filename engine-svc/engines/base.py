@@ -1,12 +1,73 @@
 # Path: engine-svc/engines/base.py
 from __future__ import annotations
 import sys
+import threading
 from abc import ABC, abstractmethod
+from typing import Iterable, List, Optional
+
+import chess
+
+from .frames import PROTOCOL_ACK, PROTOCOL_OPTION, F_READY, bestmove_frame, frame, info_frame, text_frame
+from .perft import run_uci_perft
 
 # Keep default ID lines EXACTLY as before to preserve UCI handshake bytes
 _DEFAULT_ID_NAME = "PyRefEngine (AB-only)"
 _DEFAULT_ID_AUTHOR = "open-source"
 
+# After `stop`, wait this long for the search thread's own bestmove before
+# answering with bestmove_now() ourselves.
+STOP_GRACE_S = 0.25
+
+
+class _LineAtomicStdout:
+    """
+    stdout wrapper: each thread's output is buffered until a newline and then
+    written as whole lines under one lock, so `readyok` printed by the command
+    loop can never land inside an `info ...` line printed by the search thread.
+
+    After enable_frames() (Protocol=frames, see frames.py) each line becomes a
+    TEXT frame and structured frames go out through write_frame().
+    """
+
+    def __init__(self, raw):
+        self._raw = raw
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.framed = False
+
+    def write(self, s: str) -> int:
+        buf = getattr(self._local, "buf", "") + s
+        head, sep, tail = buf.rpartition("\n")
+        self._local.buf = tail
+        if sep:
+            with self._lock:
+                if self.framed:
+                    self._raw.buffer.write(b"".join(text_frame(ln) for ln in head.split("\n")))
+                else:
+                    self._raw.write(head + sep)
+        return len(s)
+
+    def write_frame(self, data: bytes) -> None:
+        with self._lock:
+            self._raw.buffer.write(data)
+            self._raw.buffer.flush()
+
+    def enable_frames(self) -> None:
+        with self._lock:
+            self._raw.flush()
+            self.framed = True
+
+    def flush(self) -> None:
+        with self._lock:
+            self._raw.flush()
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+def _framed_stdout() -> Optional[_LineAtomicStdout]:
+    out = sys.stdout
+    return out if isinstance(out, _LineAtomicStdout) and out.framed else None
+
 class Engine(ABC):
     """
     Base UCI Engine.
@@ -19,8 +80,28 @@ class Engine(ABC):
       - on_quit() (optional)
 
     This base implements the shared UCI loop and preserves all prints.
+
+    `go` runs in a worker thread so the loop keeps answering `isready` during a
+    search. `stop` sets `stop_event` (the cancellation token; engines poll it
+    via `should_stop()`) and the search thread prints its best-so-far move; if
+    it does not within STOP_GRACE_S, the loop answers with bestmove_now() and
+    the late result is dropped. Exactly one `bestmove` is printed per `go`.
     """
 
+    def __init__(self) -> None:
+        self.stop_event = threading.Event()
+        self._search_thread: Optional[threading.Thread] = None
+        self._search_id = 0                 # bumps on every go; stale threads stay silent
+        self._bestmove_lock = threading.Lock()
+        self._bestmove_sent = True
+
+    def should_stop(self) -> bool:
+        return self.stop_event.is_set()
+
+    def is_searching(self) -> bool:
+        t = self._search_thread
+        return t is not None and t.is_alive()
+
     # ---- Hooks / metadata (override if needed) ----
     def engine_name(self) -> str:
         return _DEFAULT_ID_NAME
@@ -35,6 +116,60 @@ class Engine(ABC):
     def on_quit(self) -> None:
         pass
 
+    def on_setoption(self, name: str, value: str) -> None:
+        """`setoption name <name> value <value>` for engine-specific options."""
+        pass
+
+    def uci_options(self) -> List[str]:
+        """Extra `option name ...` lines for the `uci` handshake (handled in on_setoption)."""
+        return []
+
+    def current_board(self) -> Optional[chess.Board]:
+        """Position set by the last `position` command (for perft/divide); None if unsupported."""
+        return None
+
+    # ---- Output (UCI text, or frames once negotiated) ----
+    def emit_info(self, depth: int, nodes: int, nps: int, score_cp: Optional[int] = None,
+                  score_mate: Optional[int] = None, pv: Iterable[chess.Move] = ()) -> None:
+        out = _framed_stdout()
+        if out is not None:
+            out.write_frame(info_frame(depth, nodes, nps, score_cp, score_mate, pv))
+            return
+        score = f"mate {score_mate}" if score_mate is not None else f"cp {score_cp}"
+        pv_str = " ".join(m.uci() for m in pv)
+        print(f"info depth {depth} nodes {nodes} nps {nps} score {score} pv {pv_str}", flush=True)
+
+    def _emit_bestmove(self, best_uci: str) -> None:
+        out = _framed_stdout()
+        if out is not None:
+            out.write_frame(bestmove_frame(best_uci))
+            return
+        print(f"bestmove {best_uci}")
+        sys.stdout.flush()
+
+    def _emit_ready(self) -> None:
+        out = _framed_stdout()
+        if out is not None:
+            out.write_frame(frame(F_READY))
+            return
+        print("readyok")
+        sys.stdout.flush()
+
+    def _handle_setoption(self, cmd: str) -> None:
+        # setoption name <id...> [value <x...>]
+        rest = cmd[len("setoption"):].strip()
+        if rest.startswith("name "):
+            rest = rest[len("name "):]
+        name, _, value = rest.partition(" value ")
+        name, value = name.strip(), value.strip()
+        if name.lower() == "protocol":
+            out = sys.stdout
+            if value.lower() == "frames" and isinstance(out, _LineAtomicStdout) and not out.framed:
+                print(PROTOCOL_ACK, flush=True)
+                out.enable_frames()
+            return
+        self.on_setoption(name, value)
+
     # ---- Abstract engine ops ----
     @abstractmethod
     def handle_position_cmd(self, cmd: str) -> None:
@@ -51,22 +186,72 @@ class Engine(ABC):
 
     @abstractmethod
     def bestmove_now(self) -> str:
-        """Return an immediate best move (used for `stop`)."""
+        """Return an immediate best move (used for `stop`); may be called during a search."""
         raise NotImplementedError
 
     # ---- Shared UCI loop (unchanged behavior) ----
     def _print_uci_id(self) -> None:
         print(f"id name {self.engine_name()}")
         print(f"id author {self.engine_author()}")
+        print(PROTOCOL_OPTION)
+        for opt in self.uci_options():
+            print(opt)
         print("uciok")
         sys.stdout.flush()
 
+    def _send_bestmove(self, search_id: int, best_uci: str) -> None:
+        with self._bestmove_lock:
+            if search_id != self._search_id or self._bestmove_sent:
+                return
+            self._bestmove_sent = True
+            self._emit_bestmove(best_uci)
+
+    def _run_search(self, search_id: int, cmd: str) -> None:
+        try:
+            best_uci = self.go(cmd)
+        except Exception as e:
+            print(f"info string dbg=search-error {type(e).__name__}:{e}", flush=True)
+            best_uci = self.bestmove_now()
+        self._send_bestmove(search_id, best_uci)
+
+    def _start_search(self, cmd: str) -> None:
+        self._finish_search()
+        with self._bestmove_lock:
+            self._search_id += 1
+            self._bestmove_sent = False
+            search_id = self._search_id
+        self.stop_event = threading.Event()
+        self._search_thread = threading.Thread(target=self._run_search, args=(search_id, cmd),
+                                               name=f"search-{search_id}", daemon=True)
+        self._search_thread.start()
+
+    def _stop_search(self) -> None:
+        """Cancel the running search and make sure its bestmove is out within STOP_GRACE_S."""
+        self.stop_event.set()
+        t = self._search_thread
+        if t is not None:
+            t.join(STOP_GRACE_S)
+        self._send_bestmove(self._search_id, self.bestmove_now())
+
+    def _finish_search(self) -> None:
+        """Stop a running search and wait for it (before position/ucinewgame/go/quit)."""
+        t = self._search_thread
+        if t is None:
+            return
+        if t.is_alive():
+            self._stop_search()
+            t.join()
+        self._search_thread = None
+
     def uci_loop(self) -> None:
+        if not isinstance(sys.stdout, _LineAtomicStdout):
+            sys.stdout = _LineAtomicStdout(sys.stdout)
         # Initial handshake
         self._print_uci_id()
         while True:
             line = sys.stdin.readline()
             if not line:
+                self._finish_search()
                 break
             cmd = line.strip()
 
@@ -74,30 +259,44 @@ class Engine(ABC):
             print(f"info string dbg=recv '{cmd}'", flush=True)
 
             if cmd == "isready":
-                print("readyok")
-                sys.stdout.flush()
+                self._emit_ready()
 
             elif cmd == "uci":
                 self._print_uci_id()
 
+            elif cmd.startswith("setoption "):
+                self._handle_setoption(cmd)
+
             elif cmd.startswith("ucinewgame"):
+                self._finish_search()
                 self.on_new_game()
 
             elif cmd.startswith("position "):
+                self._finish_search()
                 self.handle_position_cmd(cmd)
 
+            elif cmd.startswith(("perft ", "divide ", "go perft ")):
+                # move-generation check; runs in the command loop (no stop)
+                self._finish_search()
+                board = self.current_board()
+                if board is None:
+                    print("info string perft: not supported by this engine", flush=True)
+                else:
+                    run_uci_perft(board, cmd)
+
             elif cmd.startswith("go "):
-                best_uci = self.go(cmd)
-                print(f"bestmove {best_uci}")
-                sys.stdout.flush()
+                self._start_search(cmd)
 
             elif cmd == "stop":
-                print(f"bestmove {self.bestmove_now()}")
-                sys.stdout.flush()
+                if self.is_searching():
+                    self._stop_search()
+                else:
+                    self._emit_bestmove(self.bestmove_now())
 
             elif cmd == "quit":
                 print("info string dbg=quit", flush=True)
                 try:
+                    self._finish_search()
                     self.on_quit()
                 finally:
-                    break
\ No newline at end of file
+                    break
@@ -0,0 +1,149 @@
+# Path: engine-svc/engines/batch_eval.py
+"""
+Purpose: Vectorized static evaluation for offline work (tuning, annotating databases).
+
+Positions are turned into (N, 12, 64) uint8 piece planes and scored against a
+(12, 64) weight tensor built from ab_engine.PIECE_VALUES / PSTS, so the result
+equals ab_engine.material_pst() — the material + PST part of evaluate().
+Mobility and terminal detection (mate/draw) are NOT included; they need move
+generation and stay in the scalar evaluator.
+
+Plane layout: planes 0..5 = White P,N,B,R,Q,K, planes 6..11 = Black P..K;
+square index = python-chess square (a1 = 0, h8 = 63).
+
+Inputs:
+  - FEN strings               -> evaluate_fens(fens)
+  - packed bitboards (N, 12)  -> evaluate_bitboards(bbs, white_to_move)
+  - ready-made planes         -> evaluate_planes(planes, white_to_move)
+Scores are centipawns from White's view, or side-to-move view when
+`white_to_move` is given (like evaluate()).
+"""
+from __future__ import annotations
+
+from typing import Iterable, Optional, Sequence, Tuple
+
+import chess
+import numpy as np
+
+from . import ab_engine
+
+PIECE_TYPES = (chess.PAWN, chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN, chess.KING)
+N_PLANES = 12
+CHUNK = 65_536          # positions per chunk when unpacking bitboards (~50 MB of planes)
+
+# FEN piece letter -> plane index
+_PLANE_OF = {chess.Piece(pt, color).symbol(): (0 if color == chess.WHITE else 6) + i
+             for color in (chess.WHITE, chess.BLACK)
+             for i, pt in enumerate(PIECE_TYPES)}
+
+
+def weight_tensor() -> np.ndarray:
+    """(12, 64) float32 weights: value + PST for White planes, negated and mirrored for Black."""
+    w = np.zeros((N_PLANES, 64), dtype=np.float32)
+    mirror = np.array([chess.square_mirror(sq) for sq in chess.SQUARES])
+    for i, pt in enumerate(PIECE_TYPES):
+        pst = np.asarray(ab_engine.PSTS[pt], dtype=np.float32)
+        val = float(ab_engine.PIECE_VALUES[pt])
+        w[i] = val + pst
+        w[6 + i] = -(val + pst[mirror])
+    return w
+
+
+def _parse_fen(fen: str) -> Tuple[list, bool]:
+    """Plane-major flat indices (plane*64 + sq) of all pieces, and white-to-move."""
+    parts = fen.split()
+    idx = []
+    rank, file = 7, 0
+    for ch in parts[0]:
+        if ch == "/":
+            rank -= 1
+            file = 0
+        elif ch.isdigit():
+            file += int(ch)
+        else:
+            idx.append(_PLANE_OF[ch] * 64 + rank * 8 + file)
+            file += 1
+    return idx, (len(parts) < 2 or parts[1] == "w")
+
+
+def planes_from_fens(fens: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """(N, 12, 64) uint8 planes and (N,) bool white-to-move for a list of FENs."""
+    n = len(fens)
+    planes = np.zeros((n, N_PLANES * 64), dtype=np.uint8)
+    stm = np.empty(n, dtype=bool)
+    rows, cols = [], []
+    for i, fen in enumerate(fens):
+        idx, white = _parse_fen(fen)
+        rows.extend([i] * len(idx))
+        cols.extend(idx)
+        stm[i] = white
+    planes[rows, cols] = 1
+    return planes.reshape(n, N_PLANES, 64), stm
+
+
+def bitboards_from_fens(fens: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """(N, 12) uint64 packed bitboards (bit sq set = piece on sq) and (N,) white-to-move."""
+    planes, stm = planes_from_fens(fens)
+    return pack_planes(planes), stm
+
+
+def board_row(b: chess.Board) -> list:
+    """The 12 plane bitboards of one board, in plane order."""
+    return [b.pieces_mask(pt, color) for color in (chess.WHITE, chess.BLACK) for pt in PIECE_TYPES]
+
+
+def bitboards_from_boards(boards: Iterable[chess.Board]) -> Tuple[np.ndarray, np.ndarray]:
+    """Same as bitboards_from_fens, straight from python-chess masks (no FEN round-trip)."""
+    bbs, stm = [], []
+    for b in boards:
+        bbs.append(board_row(b))
+        stm.append(b.turn == chess.WHITE)
+    return np.array(bbs, dtype=np.uint64).reshape(-1, N_PLANES), np.array(stm, dtype=bool)
+
+
+def unpack_bitboards(bbs: np.ndarray) -> np.ndarray:
+    """(N, 12) uint64 -> (N, 12, 64) uint8 planes."""
+    bbs = np.ascontiguousarray(bbs, dtype="<u8")
+    as_bytes = bbs.view(np.uint8).reshape(bbs.shape[0], N_PLANES, 8)
+    return np.unpackbits(as_bytes, axis=-1, bitorder="little")
+
+
+def pack_planes(planes: np.ndarray) -> np.ndarray:
+    """(N, 12, 64) 0/1 planes -> (N, 12) uint64."""
+    packed = np.packbits(planes.astype(np.uint8, copy=False), axis=-1, bitorder="little")
+    return np.ascontiguousarray(packed).view("<u8").reshape(planes.shape[0], N_PLANES)
+
+
+def evaluate_planes(planes: np.ndarray, white_to_move: Optional[np.ndarray] = None,
+                    weights: Optional[np.ndarray] = None) -> np.ndarray:
+    """Material + PST for (N, 12, 64) planes -> (N,) int32."""
+    w = weight_tensor() if weights is None else weights
+    n = planes.shape[0]
+    # float32 matmul goes through BLAS; sums stay far below 2**24 so it is exact
+    scores = planes.reshape(n, N_PLANES * 64).astype(np.float32) @ w.reshape(-1)
+    scores = np.rint(scores).astype(np.int32)
+    if white_to_move is not None:
+        scores = np.where(white_to_move, scores, -scores)
+    return scores
+
+
+def evaluate_bitboards(bbs: np.ndarray, white_to_move: Optional[np.ndarray] = None,
+                       chunk: int = CHUNK) -> np.ndarray:
+    """Material + PST for (N, 12) packed bitboards, unpacked `chunk` positions at a time."""
+    w = weight_tensor()
+    out = np.empty(bbs.shape[0], dtype=np.int32)
+    for lo in range(0, bbs.shape[0], chunk):
+        hi = lo + chunk
+        stm = None if white_to_move is None else white_to_move[lo:hi]
+        out[lo:hi] = evaluate_planes(unpack_bitboards(bbs[lo:hi]), stm, w)
+    return out
+
+
+def evaluate_fens(fens: Sequence[str], side_to_move: bool = True, chunk: int = CHUNK) -> np.ndarray:
+    """Material + PST for FENs; side-to-move view by default, White's view otherwise."""
+    w = weight_tensor()
+    out = np.empty(len(fens), dtype=np.int32)
+    for lo in range(0, len(fens), chunk):
+        planes, stm = planes_from_fens(fens[lo:lo + chunk])
+        out[lo:lo + len(planes)] = evaluate_planes(planes, stm if side_to_move else None, w)
+    return out
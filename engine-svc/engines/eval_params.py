@@ -0,0 +1,90 @@
+# Path: engine-svc/engines/eval_params.py
+"""
+Purpose: Read/write evaluation parameter files (piece values + PSTs).
+
+Written by tuning/texel.py, loaded at startup by ab_engine (EVAL_PARAMS env var)
+and by the Rust engine (same env var, same format — see src/params.rs).
+
+Format (plain text, whitespace separated, `#` starts a comment):
+
+    piece_values <P> <N> <B> <R> <Q> <K>
+    pst_pawn    <64 ints>
+    pst_knight  <64 ints>
+    ...          (pst_bishop, pst_rook, pst_queen, pst_king)
+
+PST entries are indexed by square from White's point of view, a1 = 0 ... h8 = 63
+(written as 8 rows, rank 1 first); Black uses the vertically mirrored square.
+Sections may be omitted; missing ones keep the engine defaults.
+"""
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Tuple
+
+import chess
+
+PIECE_NAMES = {
+    chess.PAWN: "pawn",
+    chess.KNIGHT: "knight",
+    chess.BISHOP: "bishop",
+    chess.ROOK: "rook",
+    chess.QUEEN: "queen",
+    chess.KING: "king",
+}
+PIECE_ORDER = (chess.PAWN, chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN, chess.KING)
+
+
+def parse_params(text: str) -> Tuple[Dict[int, int], Dict[int, List[int]]]:
+    """Return (piece_values, psts) found in `text`; raises ValueError on malformed input."""
+    tokens: List[str] = []
+    for line in text.splitlines():
+        tokens.extend(line.split("#", 1)[0].split())
+
+    sections = {"piece_values": 6}
+    sections.update({f"pst_{name}": 64 for name in PIECE_NAMES.values()})
+    by_name = {f"pst_{name}": pt for pt, name in PIECE_NAMES.items()}
+
+    values: Dict[int, int] = {}
+    psts: Dict[int, List[int]] = {}
+    i = 0
+    while i < len(tokens):
+        key = tokens[i]
+        if key not in sections:
+            raise ValueError(f"unknown section '{key}'")
+        n = sections[key]
+        raw = tokens[i + 1:i + 1 + n]
+        if len(raw) != n:
+            raise ValueError(f"section '{key}' needs {n} integers, got {len(raw)}")
+        try:
+            nums = [int(x) for x in raw]
+        except ValueError:
+            raise ValueError(f"section '{key}' has a non-integer entry") from None
+        if key == "piece_values":
+            values = dict(zip(PIECE_ORDER, nums))
+        else:
+            psts[by_name[key]] = nums
+        i += 1 + n
+    return values, psts
+
+
+def read_params(path: str) -> Tuple[Dict[int, int], Dict[int, List[int]]]:
+    with open(path, "r", encoding="utf-8") as f:
+        return parse_params(f.read())
+
+
+def format_params(values: Dict[int, int], psts: Dict[int, List[int]], header: Optional[str] = None) -> str:
+    out: List[str] = []
+    if header:
+        out.extend(f"# {line}" for line in header.splitlines())
+    out.append("piece_values " + " ".join(str(int(values[pt])) for pt in PIECE_ORDER))
+    for pt in PIECE_ORDER:
+        table = psts[pt]
+        out.append(f"pst_{PIECE_NAMES[pt]}")
+        for rank in range(8):
+            out.append("  " + " ".join(f"{int(v):5d}" for v in table[rank * 8:rank * 8 + 8]))
+    return "\n".join(out) + "\n"
+
+
+def write_params(path: str, values: Dict[int, int], psts: Dict[int, List[int]],
+                 header: Optional[str] = None) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(format_params(values, psts, header))
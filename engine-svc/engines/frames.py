@@ -0,0 +1,94 @@
+# Path: engine-svc/engines/frames.py
+"""
+Purpose: Length-prefixed binary frames for engine -> bridge output.
+
+Negotiated at handshake: the engine lists `option name Protocol type combo
+default uci var uci var frames`; the bridge answers `setoption name Protocol
+value frames`, the engine prints the text line `protocol frames` and from then
+on everything it writes to stdout is framed. Commands to the engine stay UCI
+text. Engines without the option (or ENGINE_PROTOCOL=uci) keep plain UCI.
+
+Frame:   <type u8> <payload length u32 LE> <payload>
+  TEXT      utf-8 line without newline (id, info string, anything else)
+  INFO      depth u16, nodes u64, nps u32, score kind u8 (0 cp, 1 mate),
+            score i32, pv count u8, then pv count x move u16
+  BESTMOVE  best u16, ponder u16 (NO_MOVE = none)
+  READY     empty (readyok)
+
+Move u16: from | to << 6 | promotion << 12 (0 none, 1 n, 2 b, 3 r, 4 q).
+The Rust engine writes the same layout (src/emit.rs).
+"""
+from __future__ import annotations
+
+import struct
+from typing import Dict, Iterable, Optional, Tuple
+
+import chess
+
+PROTOCOL_OPTION = "option name Protocol type combo default uci var uci var frames"
+PROTOCOL_ACK = "protocol frames"
+
+F_TEXT, F_INFO, F_BESTMOVE, F_READY = 0, 1, 2, 3
+
+HEADER = struct.Struct("<BI")
+INFO = struct.Struct("<HQIBiB")
+BESTMOVE = struct.Struct("<HH")
+NO_MOVE = 0xFFFF
+MAX_PV = 255
+
+_SCORE_CP, _SCORE_MATE = 0, 1
+
+
+def encode_move(m: chess.Move) -> int:
+    promo = (m.promotion - 1) if m.promotion else 0
+    return m.from_square | (m.to_square << 6) | (promo << 12)
+
+
+def decode_move(code: int) -> str:
+    promo = (code >> 12) & 0x7
+    m = chess.Move(code & 0x3F, (code >> 6) & 0x3F, promo + 1 if promo else None)
+    return m.uci() if m else "0000"
+
+
+def _encode_uci(uci: Optional[str]) -> int:
+    if not uci:
+        return NO_MOVE
+    return encode_move(chess.Move.from_uci(uci))
+
+
+def frame(ftype: int, payload: bytes = b"") -> bytes:
+    return HEADER.pack(ftype, len(payload)) + payload
+
+
+def text_frame(line: str) -> bytes:
+    return frame(F_TEXT, line.encode("utf-8"))
+
+
+def info_frame(depth: int, nodes: int, nps: int, score_cp: Optional[int] = None,
+               score_mate: Optional[int] = None, pv: Iterable[chess.Move] = ()) -> bytes:
+    codes = [encode_move(m) for m in pv][:MAX_PV]
+    kind, val = (_SCORE_MATE, score_mate) if score_mate is not None else (_SCORE_CP, score_cp or 0)
+    payload = INFO.pack(depth, nodes, nps, kind, val, len(codes)) + struct.pack(f"<{len(codes)}H", *codes)
+    return frame(F_INFO, payload)
+
+
+def bestmove_frame(best: str, ponder: Optional[str] = None) -> bytes:
+    return frame(F_BESTMOVE, BESTMOVE.pack(_encode_uci(best), _encode_uci(ponder)))
+
+
+def decode_info(payload: bytes) -> Dict:
+    """INFO payload -> the same dict shape uci_parser.parse_info_line() returns."""
+    depth, nodes, nps, kind, val, n = INFO.unpack_from(payload)
+    codes = struct.unpack_from(f"<{n}H", payload, INFO.size)
+    return {
+        "depth": depth,
+        "nodes": nodes,
+        "nps": nps,
+        "score": {"mate" if kind == _SCORE_MATE else "cp": val},
+        "pv": [decode_move(c) for c in codes],
+    }
+
+
+def decode_bestmove(payload: bytes) -> Tuple[str, Optional[str]]:
+    best, ponder = BESTMOVE.unpack(payload)
+    return decode_move(best), (None if ponder == NO_MOVE else decode_move(ponder))
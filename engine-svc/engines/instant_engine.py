@@ -0,0 +1,73 @@
+# Path: engine-svc/engines/instant_engine.py
+"""
+Purpose: Stub UCI engine that answers every `go` at once with a random legal
+move (one `info depth 1` line, then `bestmove`), so load tests can measure
+the bridge / dispatcher / SSE path without search cost.
+
+  python uci_main.py --engine instant
+
+INSTANT_ENGINE_DELAY_MS (default 0) adds a fixed think time per `go`
+(interruptible by `stop`), to model a constant-cost engine.
+"""
+from __future__ import annotations
+
+import os
+import random
+from typing import Optional
+
+import chess
+
+from .base import Engine as BaseEngine
+
+DELAY_S = max(0, int(os.getenv("INSTANT_ENGINE_DELAY_MS", "0"))) / 1000.0
+
+
+class INSTANTEngine(BaseEngine):
+    def __init__(self):
+        super().__init__()
+        self.board = chess.Board()
+        self._rng = random.Random()
+
+    def engine_name(self) -> str:
+        return "InstantEngine (stub)"
+
+    def on_new_game(self) -> None:
+        self.board = chess.Board()
+
+    def current_board(self) -> chess.Board:
+        return self.board
+
+    def handle_position_cmd(self, cmd: str) -> None:
+        parts = cmd.split()
+        try:
+            if "startpos" in parts:
+                board, idx = chess.Board(), parts.index("startpos") + 1
+            elif "fen" in parts:
+                i = parts.index("fen") + 1
+                board, idx = chess.Board(" ".join(parts[i:i + 6])), i + 6
+            else:
+                return
+            if idx < len(parts) and parts[idx] == "moves":
+                for mv in parts[idx + 1:]:
+                    board.push_uci(mv)
+            self.board = board
+        except ValueError as e:
+            print(f"info string dbg=position-parse-error {e}", flush=True)
+            self.board = chess.Board()
+
+    def _pick(self) -> Optional[chess.Move]:
+        legal = list(self.board.legal_moves)
+        return self._rng.choice(legal) if legal else None
+
+    def bestmove_now(self) -> str:
+        m = self._pick()
+        return m.uci() if m else "0000"
+
+    def go(self, cmd: str) -> str:
+        if DELAY_S:
+            self.stop_event.wait(DELAY_S)
+        m = self._pick()
+        if m is None:
+            return "0000"
+        self.emit_info(1, 1, 0, score_cp=0, pv=[m])
+        return m.uci()
@@ -0,0 +1,101 @@
+# Path: engine-svc/engines/ordering.py
+"""
+Purpose: Quiet-move ordering heuristics for ab_engine.Search, in preallocated
+flat integer arrays indexed in O(1).
+
+Indices:
+  code  16-bit move: from | to << 6 | promotion << 12   (0 = no move)
+  pt    moving piece and destination: (color * 6 + piece_type - 1) * 64 + to,
+        0..767 (color 1 = White); -1 = no move / null move
+
+Tables:
+  history      [color * 64 + to]     side to move and destination, with gravity
+  cont[0]      [prev1 pt * 768 + pt] continuation history: given the move 1 ply back
+  cont[1]      [prev2 pt * 768 + pt] ... and 2 plies back (our own previous move)
+  counter      [prev1 pt]            quiet move that last refuted the previous move
+  killer1/2    [ply]                 two quiet refutations per distance from the root
+
+The main history stays keyed by (color, to) as before: keying it by piece as
+well spread the same cutoffs over 6x the entries and cost nodes at the depths
+we search. Piece identity is carried by the continuation tables instead.
+
+Gravity: v += bonus - v * bonus // HIST_MAX keeps entries below HIST_MAX
+without rescaling passes.
+"""
+from __future__ import annotations
+
+from array import array
+from typing import List
+
+import chess
+
+N_PT = 2 * 6 * 64
+N_SQ = 2 * 64
+HIST_MAX = 8192
+HIST_BONUS_MUL = 32            # bonus = min(HIST_BONUS_MUL * depth^2, HIST_BONUS_MAX)
+HIST_BONUS_MAX = 2048
+HISTORY_AGE_SHIFT = 1          # history >>= shift at the start of every search
+
+
+def move_code(m: chess.Move) -> int:
+    return m.from_square | (m.to_square << 6) | ((m.promotion or 0) << 12)
+
+
+def piece_to(board: chess.Board, m: chess.Move) -> int:
+    """pt index of `m` in `board` (before it is played)."""
+    return (6 * board.turn + board.piece_type_at(m.from_square) - 1) * 64 + m.to_square
+
+
+def history_index(pt: int) -> int:
+    """history index (color * 64 + to) of a pt index."""
+    return pt // 384 * 64 + pt % 64
+
+
+def line_before(board: chess.Board) -> List[int]:
+    """pt indices of the two moves that led to `board` (oldest first; -1 where there is none)."""
+    b = board.copy(stack=2)
+    pts = []
+    while len(pts) < 2 and b.move_stack:
+        m = b.pop()
+        pts.append(piece_to(b, m) if m else -1)
+    pts += [-1] * (2 - len(pts))
+    return pts[::-1]
+
+
+class Heuristics:
+    def __init__(self, max_ply: int):
+        self.max_ply = max_ply
+        self.history = array("i", [0]) * N_SQ
+        self.cont = (array("i", [0]) * (N_PT * N_PT), array("i", [0]) * (N_PT * N_PT))
+        self.counter = array("H", [0]) * N_PT
+        self.killer1 = array("H", [0]) * (max_ply + 1)
+        self.killer2 = array("H", [0]) * (max_ply + 1)
+
+    def age(self, plies_played: int) -> None:
+        """New search `plies_played` plies after the previous one (same game)."""
+        if plies_played > 0:
+            # killers are keyed by distance from the root: shift them along with it
+            pad = array("H", [0]) * min(plies_played, self.max_ply + 1)
+            self.killer1 = (self.killer1[plies_played:] + pad)[:self.max_ply + 1]
+            self.killer2 = (self.killer2[plies_played:] + pad)[:self.max_ply + 1]
+        elif plies_played < 0:
+            self.killer1 = array("H", [0]) * (self.max_ply + 1)
+            self.killer2 = array("H", [0]) * (self.max_ply + 1)
+        self.history = array("i", (v >> HISTORY_AGE_SHIFT for v in self.history))
+
+    def quiet_cutoff(self, ply: int, code: int, pt: int, depth: int, prev1: int, prev2: int) -> None:
+        """Quiet move (`code`, `pt`) failed high at `ply` with `depth` plies left."""
+        self.killer2[ply] = self.killer1[ply]
+        self.killer1[ply] = code
+        if prev1 >= 0:
+            self.counter[prev1] = code
+
+        bonus = min(HIST_BONUS_MUL * depth * depth, HIST_BONUS_MAX)
+        updates = [(self.history, history_index(pt))]
+        if prev1 >= 0:
+            updates.append((self.cont[0], prev1 * N_PT + pt))
+        if prev2 >= 0:
+            updates.append((self.cont[1], prev2 * N_PT + pt))
+        for table, i in updates:
+            v = table[i]
+            table[i] = v + bonus - v * bonus // HIST_MAX
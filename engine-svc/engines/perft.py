@@ -0,0 +1,75 @@
+# Path: engine-svc/engines/perft.py
+"""
+Purpose: Perft (count the leaf nodes of the legal move tree) on python-chess,
+to check move generation and time it without any search on top.
+
+  perft(board, depth)    -> leaf nodes below `board`
+  divide(board, depth)   -> [(uci, leaf nodes)] for every root move
+
+With bulk=True (default) the last ply is counted, not played: the moves of a
+depth-1 node are generated and counted without push/pop, so the figure is
+dominated by move generation. bulk=False plays every leaf move (push + pop).
+
+The UCI loop answers `perft <depth>` / `divide <depth>` / `go perft <depth>`
+with run_uci_perft(); bench/perft_bench.py drives it (and the Rust engine's
+identical command) over the standard perft positions.
+"""
+from __future__ import annotations
+
+import time
+from typing import List, Tuple
+
+import chess
+
+
+def perft(board: chess.Board, depth: int, bulk: bool = True) -> int:
+    if depth <= 0:
+        return 1
+    if bulk and depth == 1:
+        return board.legal_moves.count()
+    nodes = 0
+    for m in board.generate_legal_moves():
+        board.push(m)
+        nodes += perft(board, depth - 1, bulk)
+        board.pop()
+    return nodes
+
+
+def divide(board: chess.Board, depth: int, bulk: bool = True) -> List[Tuple[str, int]]:
+    rows = []
+    for m in board.generate_legal_moves():
+        board.push(m)
+        rows.append((m.uci(), perft(board, depth - 1, bulk)))
+        board.pop()
+    return rows
+
+
+def run_uci_perft(board: chess.Board, cmd: str) -> None:
+    """
+    `perft <depth> [full]`, `divide <depth> [full]` or `go perft <depth>`:
+    print per-move counts (divide / go perft), `Nodes searched: <n>` and one
+    `info string perft depth <d> nodes <n> time <ms> nps <nps>` line. `full`
+    turns bulk counting off. Same output as the Rust engine.
+    """
+    toks = cmd.split()
+    if toks[0] == "go":
+        toks = toks[1:]
+    try:
+        depth = int(toks[1])
+    except (IndexError, ValueError):
+        print(f"info string perft: expected '{toks[0]} <depth>'", flush=True)
+        return
+    bulk = "full" not in toks[2:]
+    board = board.copy(stack=False)
+    t0 = time.perf_counter()
+    if toks[0] == "divide" or cmd.startswith("go "):
+        rows = divide(board, depth, bulk)
+        nodes = sum(n for _, n in rows) if depth > 0 else 1
+        lines = [f"{uci}: {n}" for uci, n in rows] + [""]
+    else:
+        nodes = perft(board, depth, bulk)
+        lines = []
+    ms = max(1, int((time.perf_counter() - t0) * 1000))
+    lines.append(f"Nodes searched: {nodes}")
+    lines.append(f"info string perft depth {depth} nodes {nodes} time {ms} nps {nodes * 1000 // ms}")
+    print("\n".join(lines), flush=True)
@@ -0,0 +1,98 @@
+# Path: engine-svc/engines/profiling.py
+"""
+Purpose: Opt-in per-search profiling (`setoption name Profile value cprofile|sample|off`).
+
+  cprofile  deterministic cProfile of the search thread -> <dir>/<tag>.prof
+            (python -m pstats, snakeviz); slows the search down several times
+  sample    a daemon thread records the search thread's stack every
+            SAMPLE_INTERVAL_S -> <dir>/<tag>.folded, one "frame;frame;... count"
+            line per distinct stack (flamegraph.pl, speedscope); low overhead,
+            so node rates stay close to production
+
+Files go to `setoption name ProfileDir` (default $ENGINE_PROFILE_DIR, else the
+system temp dir). Must be entered on the thread that runs the search.
+"""
+from __future__ import annotations
+
+import cProfile
+import os
+import sys
+import tempfile
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+PROFILE_MODES = ("off", "cprofile", "sample")
+SAMPLE_INTERVAL_S = 0.001
+MAX_STACK = 200
+
+
+def default_profile_dir() -> str:
+    return os.getenv("ENGINE_PROFILE_DIR") or tempfile.gettempdir()
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class StackSampler:
+    """Counts the stacks of one thread, sampled from a background thread."""
+
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL_S):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts: Counter = Counter()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def _run(self) -> None:
+        while not self._done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and len(stack) < MAX_STACK:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                self.counts[";".join(reversed(stack))] += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._done.set()
+        self._thread.join()
+
+    def write(self, path: str) -> None:
+        with open(path, "w") as f:
+            for stack, n in self.counts.most_common():
+                f.write(f"{stack} {n}\n")
+
+
+@contextmanager
+def profile_search(mode: str, out_dir: Optional[str], tag: str) -> Iterator[Optional[str]]:
+    """Profile the body in `mode`; yields the output path (None when off), written on exit."""
+    if mode not in ("cprofile", "sample"):
+        yield None
+        return
+    out_dir = out_dir or default_profile_dir()
+    os.makedirs(out_dir, exist_ok=True)
+    if mode == "cprofile":
+        path = os.path.join(out_dir, f"{tag}.prof")
+        prof = cProfile.Profile()
+        prof.enable()
+        try:
+            yield path
+        finally:
+            prof.disable()
+            prof.dump_stats(path)
+    else:
+        path = os.path.join(out_dir, f"{tag}.folded")
+        sampler = StackSampler(threading.get_ident())
+        sampler.start()
+        try:
+            yield path
+        finally:
+            sampler.stop()
+            sampler.write(path)
@@ -0,0 +1,119 @@
+# Path: engine-svc/engines/see.py
+"""
+Static Exchange Evaluation (SEE) on python-chess bitboards.
+
+`see(board, move)` returns the material balance (cp, from the mover's point of
+view) of the capture sequence on `move.to_square` when both sides always
+recapture with their least valuable attacker and may stop at any time.
+Attackers are recomputed from the shrinking occupancy after every capture, so
+sliders behind the capturing piece (x-rays / batteries) join the exchange.
+Pins are ignored, as usual for SEE; pawn recaptures onto the last rank promote
+to a queen.
+"""
+from __future__ import annotations
+
+from typing import Dict, Optional, Tuple
+
+import chess
+
+# Same material scale as ab_engine.PIECE_VALUES; the king is "priceless".
+SEE_VALUES = [0, 100, 320, 330, 500, 900, 20_000]   # index: chess.PAWN..chess.KING
+
+SEE_CACHE_MAX = 200_000
+
+def _attackers(board: chess.Board, sq: int, occupied: int) -> int:
+    """All pieces (both colors) attacking `sq` given `occupied`, x-rays included."""
+    rank_pieces = chess.BB_RANK_MASKS[sq] & occupied
+    file_pieces = chess.BB_FILE_MASKS[sq] & occupied
+    diag_pieces = chess.BB_DIAG_MASKS[sq] & occupied
+    queens = board.queens
+    rooks_queens = board.rooks | queens
+    bishops_queens = board.bishops | queens
+    att = (
+        (chess.BB_KNIGHT_ATTACKS[sq] & board.knights) |
+        (chess.BB_KING_ATTACKS[sq] & board.kings) |
+        (chess.BB_RANK_ATTACKS[sq][rank_pieces] & rooks_queens) |
+        (chess.BB_FILE_ATTACKS[sq][file_pieces] & rooks_queens) |
+        (chess.BB_DIAG_ATTACKS[sq][diag_pieces] & bishops_queens) |
+        (chess.BB_PAWN_ATTACKS[chess.BLACK][sq] & board.pawns & board.occupied_co[chess.WHITE]) |
+        (chess.BB_PAWN_ATTACKS[chess.WHITE][sq] & board.pawns & board.occupied_co[chess.BLACK])
+    )
+    return att & occupied
+
+def see(board: chess.Board, move: chess.Move) -> int:
+    from_sq, to_sq = move.from_square, move.to_square
+    mover = board.piece_type_at(from_sq)
+    if mover is None:
+        return 0
+
+    occupied = board.occupied ^ chess.BB_SQUARES[from_sq]
+    if board.is_en_passant(move):
+        victim_val = SEE_VALUES[chess.PAWN]
+        occupied ^= chess.BB_SQUARES[to_sq + (-8 if board.turn == chess.WHITE else 8)]
+    else:
+        victim = board.piece_type_at(to_sq)
+        victim_val = SEE_VALUES[victim] if victim else 0
+    occupied |= chess.BB_SQUARES[to_sq]
+
+    gain = [victim_val]
+    on_square = SEE_VALUES[mover]
+    if move.promotion:
+        gain[0] += SEE_VALUES[move.promotion] - SEE_VALUES[chess.PAWN]
+        on_square = SEE_VALUES[move.promotion]
+
+    side = not board.turn
+    attackers = _attackers(board, to_sq, occupied)
+    while True:
+        ours = attackers & board.occupied_co[side]
+        if not ours:
+            break
+        for pt in (chess.PAWN, chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN, chess.KING):
+            bb = ours & board.pieces_mask(pt, side)
+            if bb:
+                break
+        if pt == chess.KING and attackers & board.occupied_co[not side]:
+            break   # the king can't capture onto a defended square
+        gain.append(on_square - gain[-1])
+        on_square = SEE_VALUES[pt]
+        if pt == chess.PAWN and chess.BB_SQUARES[to_sq] & chess.BB_BACKRANKS:
+            gain[-1] += SEE_VALUES[chess.QUEEN] - SEE_VALUES[chess.PAWN]   # recapture promotes
+            on_square = SEE_VALUES[chess.QUEEN]
+        occupied ^= chess.BB_SQUARES[chess.lsb(bb)]
+        attackers = _attackers(board, to_sq, occupied)   # discovers x-ray attackers
+        side = not side
+
+    while len(gain) > 1:
+        last = gain.pop()
+        gain[-1] = -max(-gain[-1], last)
+    return gain[0]
+
+def see_ge(board: chess.Board, move: chess.Move, threshold: int = 0) -> bool:
+    """True if see(board, move) >= threshold; cheap shortcut for non-losing trades."""
+    if threshold <= 0 and not move.promotion and not board.is_en_passant(move):
+        victim = board.piece_type_at(move.to_square)
+        mover = board.piece_type_at(move.from_square)
+        if victim and mover and mover != chess.KING and SEE_VALUES[mover] <= SEE_VALUES[victim]:
+            return True
+    return see(board, move) >= threshold
+
+class SEECache:
+    """SEE results keyed by (position key, move); cleared wholesale when full."""
+
+    def __init__(self, max_entries: int = SEE_CACHE_MAX):
+        self.max_entries = max_entries
+        self.table: Dict[Tuple[int, int, int, Optional[int]], int] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def see(self, board: chess.Board, move: chess.Move, key: int) -> int:
+        k = (key, move.from_square, move.to_square, move.promotion)
+        v = self.table.get(k)
+        if v is not None:
+            self.hits += 1
+            return v
+        self.misses += 1
+        v = see(board, move)
+        if len(self.table) >= self.max_entries:
+            self.table.clear()
+        self.table[k] = v
+        return v
@@ -0,0 +1,91 @@
+# Path: engine-svc/events.py
+"""
+Purpose: Typed search events yielded by UciBridge.stream_go, and the one SSE encoder.
+
+The bridge builds Info / Bestmove / Error objects straight from engine output
+(text lines or binary frames) and the HTTP handlers turn them into SSE with a
+single json.dumps per event — no JSON strings passed between layers.
+"""
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Union
+
+_dumps = json.JSONEncoder(separators=(",", ":")).encode
+
+_INFO_FIELDS = ("depth", "nodes", "nps", "hashfull", "score", "pv", "string", "ponderhit", "stats",
+                "currmove", "currmovenumber")
+
+
+@dataclass(slots=True)
+class Info:
+    depth: Optional[int] = None
+    nodes: Optional[int] = None
+    nps: Optional[int] = None
+    hashfull: Optional[int] = None
+    score: Optional[Dict[str, int]] = None
+    pv: Optional[List[str]] = None
+    string: Optional[str] = None
+    ponderhit: Optional[bool] = None     # set on the marker event of a ponder hit
+    stats: Optional[Dict[str, int]] = None   # per-iteration search counters (think?stats=1)
+    currmove: Optional[str] = None           # root move being searched (long searches)
+    currmovenumber: Optional[int] = None
+
+    @classmethod
+    def from_dict(cls, d: Dict) -> "Info":
+        """From uci_parser.parse_info_line() / frames.decode_info() output."""
+        return cls(d.get("depth"), d.get("nodes"), d.get("nps"), d.get("hashfull"),
+                   d.get("score"), d.get("pv"), d.get("string"), stats=d.get("stats"),
+                   currmove=d.get("currmove"), currmovenumber=d.get("currmovenumber"))
+
+    def to_dict(self) -> Dict:
+        out = {"type": "info"}
+        for name in _INFO_FIELDS:
+            v = getattr(self, name)
+            if v is not None:
+                out[name] = v
+        return out
+
+
+@dataclass(slots=True)
+class Bestmove:
+    move: str
+    ponder: Optional[str] = None
+
+
+@dataclass(slots=True)
+class Error:
+    message: str
+
+
+Event = Union[Info, Bestmove, Error]
+
+
+# ---------------------------
+# SSE encoding (serialize once)
+# ---------------------------
+def sse(obj: Dict) -> str:
+    return f"data: {_dumps(obj)}\n\n"
+
+
+SSE_DONE = sse({"type": "done"})
+
+
+def sse_search(search_id: str) -> str:
+    """First event of every stream: the id POST /engines/stop?id= takes."""
+    return sse({"type": "search", "id": search_id})
+
+
+def sse_info(ev: Info) -> str:
+    return sse(ev.to_dict())
+
+
+def sse_bestmove(move: str, side: Optional[str] = None) -> str:
+    if side is None:
+        return sse({"type": "bestmove", "move": move})
+    return sse({"type": "bestmove", "side": side, "move": move})
+
+
+def sse_error(message: str) -> str:
+    return sse({"type": "info", "error": message})
@@ -0,0 +1,251 @@
+# Path: engine-svc/launcher.py
+"""
+Purpose: Start engine processes for UciBridge without a shell, and Python
+engines without interpreter start-up, via a pre-imported fork server.
+
+spawn(cmd) picks one of three routes:
+  zygote  `python .../uci_main.py ...`: forked from a warm zygote.py process
+          (one per interpreter + engine dir, started on first use) -> a few ms
+  exec    any other command without shell syntax, e.g. /app/pyrefengine:
+          exec'd directly (argv from shlex.split, no /bin/sh in between)
+  shell   commands with pipes, redirects, `&&`, `$VAR`, ...: as before
+
+ENGINE_SPAWN=auto (default) | exec | shell forces a route; auto falls back to
+exec whenever the zygote cannot be started or refuses a request.
+
+The zygote route returns a ZygoteProcess: the asyncio.subprocess.Process
+subset UciBridge uses (stdin, stdout, returncode, pid, kill(), wait()),
+backed by two pipes whose child ends were passed to the zygote. The zygote
+is the engine's parent and reports its exit status over the spawn connection.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import shlex
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+from typing import Dict, List, Optional, Tuple, Union
+
+ENGINE_SPAWN = os.getenv("ENGINE_SPAWN", "auto").strip().lower()
+ZYGOTE_PRELOAD = os.getenv("ENGINE_ZYGOTE_PRELOAD", "ab")
+ZYGOTE_START_TIMEOUT_S = 20.0
+STREAM_LIMIT = 2 ** 16        # same as asyncio.subprocess pipes
+
+_SHELL_CHARS = set("|&;<>()$`*?[]#~{}\n")   # quoting is fine: shlex handles it
+_ZYGOTE_PY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "zygote.py")
+
+PRINT_DBG = True
+def _dbg(msg: str):
+    if PRINT_DBG:
+        print(f"[DBG] launcher: {msg}", flush=True)
+
+
+class ZygoteProcess:
+    """An engine forked by the zygote; quacks like asyncio.subprocess.Process for UciBridge."""
+
+    def __init__(self, pid: int, stdin: asyncio.StreamWriter, stdout: asyncio.StreamReader,
+                 control: socket.socket):
+        self.pid = pid
+        self.stdin = stdin
+        self.stdout = stdout
+        self.returncode: Optional[int] = None
+        self._control = control
+        self._exited = asyncio.Event()
+        self._watch = asyncio.get_running_loop().create_task(self._watch_exit())
+
+    async def _watch_exit(self) -> None:
+        loop = asyncio.get_running_loop()
+        buf = b""
+        try:
+            while b"\n" not in buf:
+                chunk = await loop.sock_recv(self._control, 4096)
+                if not chunk:
+                    break
+                buf += chunk
+        except OSError:
+            pass
+        finally:
+            self._control.close()
+        code: Optional[int] = None
+        if buf.strip():
+            try:
+                code = json.loads(buf.split(b"\n", 1)[0]).get("exit")
+            except ValueError:
+                pass
+        if code is None:
+            # zygote gone before reporting: the engine is either gone too or orphaned
+            try:
+                os.kill(self.pid, 0)
+                self.kill()
+            except OSError:
+                pass
+            code = -signal.SIGKILL
+        self.returncode = code
+        self._exited.set()
+
+    def kill(self) -> None:
+        if self.returncode is None:
+            try:
+                os.kill(self.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+    def terminate(self) -> None:
+        if self.returncode is None:
+            try:
+                os.kill(self.pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    async def wait(self) -> int:
+        await self._exited.wait()
+        return self.returncode  # type: ignore[return-value]
+
+
+EngineProcess = Union[asyncio.subprocess.Process, ZygoteProcess]
+
+
+class Zygote:
+    """One zygote.py process; spawn() forks an engine from it."""
+
+    def __init__(self, python: str, engine_dir: str):
+        self.python = python
+        self.engine_dir = engine_dir
+        self.proc: Optional[asyncio.subprocess.Process] = None
+        self._dir = tempfile.mkdtemp(prefix="engine-zygote-")
+        self.path = os.path.join(self._dir, "zygote.sock")
+        self._start_lock = asyncio.Lock()
+
+    def alive(self) -> bool:
+        return self.proc is not None and self.proc.returncode is None
+
+    async def start(self) -> None:
+        async with self._start_lock:
+            if self.alive():
+                return
+            _dbg(f"starting zygote: {self.python} engine_dir={self.engine_dir} preload={ZYGOTE_PRELOAD}")
+            self.proc = await asyncio.create_subprocess_exec(
+                self.python, _ZYGOTE_PY, "--socket", self.path, "--engine-dir", self.engine_dir,
+                "--preload", ZYGOTE_PRELOAD,
+                stdin=asyncio.subprocess.DEVNULL, stdout=asyncio.subprocess.PIPE,
+            )
+            try:
+                line = await asyncio.wait_for(self.proc.stdout.readline(), ZYGOTE_START_TIMEOUT_S)
+            except asyncio.TimeoutError:
+                line = b""
+            if line.strip() != b"ready":
+                self.proc.kill()
+                raise RuntimeError(f"zygote did not start (got {line!r})")
+            _dbg(f"zygote ready pid={self.proc.pid}")
+
+    async def spawn(self, argv: List[str], cwd: str) -> ZygoteProcess:
+        await self.start()
+        loop = asyncio.get_running_loop()
+        in_r, in_w = os.pipe()       # engine stdin
+        out_r, out_w = os.pipe()     # engine stdout + stderr
+        control = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            control.setblocking(False)
+            await loop.sock_connect(control, self.path)
+            req = json.dumps({"argv": argv, "cwd": cwd}).encode() + b"\n"
+            socket.send_fds(control, [req], [in_r, out_w])
+            reply = await asyncio.wait_for(self._read_line(control), 5.0)
+            if "pid" not in reply:
+                raise RuntimeError(f"zygote refused: {reply.get('error')}")
+        except BaseException:
+            control.close()
+            for fd in (in_r, in_w, out_r, out_w):
+                os.close(fd)
+            raise
+        os.close(in_r)
+        os.close(out_w)
+
+        stdout = asyncio.StreamReader(limit=STREAM_LIMIT, loop=loop)
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(stdout, loop=loop),
+                                     os.fdopen(out_r, "rb", 0))
+        transport, protocol = await loop.connect_write_pipe(
+            lambda: asyncio.streams.FlowControlMixin(loop=loop), os.fdopen(in_w, "wb", 0))
+        stdin = asyncio.StreamWriter(transport, protocol, None, loop)
+        return ZygoteProcess(reply["pid"], stdin, stdout, control)
+
+    @staticmethod
+    async def _read_line(sock: socket.socket) -> Dict:
+        loop = asyncio.get_running_loop()
+        buf = b""
+        while b"\n" not in buf:
+            chunk = await loop.sock_recv(sock, 1)   # byte-wise: the exit line follows on the same socket
+            if not chunk:
+                raise RuntimeError("zygote closed the connection")
+            buf += chunk
+        return json.loads(buf)
+
+
+_zygotes: Dict[Tuple[str, str], Zygote] = {}
+
+
+def _zygote_target(argv: List[str]) -> Optional[Tuple[str, str]]:
+    """(interpreter, engine dir) if `argv` runs uci_main.py with a Python interpreter."""
+    if len(argv) < 2 or os.path.basename(argv[1]) != "uci_main.py":
+        return None
+    if not os.path.basename(argv[0]).startswith("python"):
+        return None
+    python = shutil.which(argv[0]) or (sys.executable if argv[0] == "python" else None)
+    script = os.path.abspath(argv[1])
+    if python is None or not os.path.isfile(script):
+        return None
+    return python, os.path.dirname(script)
+
+
+def plan(cmd: str) -> Tuple[str, List[str]]:
+    """(route, argv) spawn() would use for `cmd`: route is zygote, exec or shell."""
+    if ENGINE_SPAWN == "shell" or any(c in _SHELL_CHARS for c in cmd):
+        return "shell", []
+    try:
+        argv = shlex.split(cmd)
+    except ValueError:
+        return "shell", []
+    if not argv:
+        return "shell", []
+    if ENGINE_SPAWN != "exec" and _zygote_target(argv) is not None:
+        return "zygote", argv
+    return "exec", argv
+
+
+async def spawn(cmd: str) -> EngineProcess:
+    """Start the engine for `cmd` with stdin/stdout pipes (stderr merged into stdout)."""
+    route, argv = plan(cmd)
+    if route == "zygote":
+        key = _zygote_target(argv)
+        zyg = _zygotes.get(key)  # type: ignore[arg-type]
+        if zyg is None:
+            zyg = _zygotes[key] = Zygote(*key)  # type: ignore[index,misc]
+        try:
+            proc = await zyg.spawn(argv[1:], os.getcwd())   # the zygote is the interpreter
+            _dbg(f"zygote spawn pid={proc.pid}")
+            return proc
+        except (OSError, RuntimeError, asyncio.TimeoutError, ValueError) as e:
+            _dbg(f"zygote spawn failed ({type(e).__name__}: {e}); exec instead")
+            route = "exec"
+    if route == "exec":
+        return await asyncio.create_subprocess_exec(
+            *argv, stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT, env=os.environ.copy(),
+        )
+    return await asyncio.create_subprocess_shell(
+        cmd, stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.STDOUT, env=os.environ.copy(),
+    )
+
+
+async def shutdown() -> None:
+    """Stop the zygotes (engines already forked keep running until their stdin closes)."""
+    for zyg in list(_zygotes.values()):
+        if zyg.alive():
+            zyg.proc.kill()
+            await zyg.proc.wait()
+    _zygotes.clear()
@@ -0,0 +1,162 @@
+# Path: engine-svc/ponder.py
+"""
+Purpose: Think on the opponent's time (pondering) for HUMAN_VS_AI games.
+
+After /engines/think returns a bestmove, the expected human reply (second move
+of the PV, or the engine's `bestmove ... ponder <mv>`) is played on a copy of
+the board and a normal, depth-limited search is started on the *leased* engine
+while the human thinks. When the next /engines/think arrives:
+
+- ponder hit  (same FEN, enough depth): the request attaches to the speculative
+  search — replaying buffered events and following the live ones — so the reply
+  is immediate if the search already finished, or shortened if it is running.
+- ponder miss: the speculative search is stopped and discarded before the real
+  search starts on the same engine.
+
+The engine is leased only while idle: every other user of the bridge (think,
+selfplay, stop) must call `discard()`/`claim()` first.
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import AsyncGenerator, List, Optional
+
+import chess
+
+from events import Event
+
+PRINT_DBG = True
+def _dbg(msg: str):
+    if PRINT_DBG:
+        print(f"[DBG] ponder: {msg}", flush=True)
+
+
+def ponder_fen(fen: str, bestmove: str, reply: Optional[str]) -> Optional[str]:
+    """FEN after `bestmove` and the expected `reply`, or None if not applicable."""
+    if not reply:
+        return None
+    try:
+        board = chess.Board(fen)
+        for uci in (bestmove, reply):
+            mv = chess.Move.from_uci(uci)
+            if mv not in board.legal_moves:
+                return None
+            board.push(mv)
+    except Exception:
+        return None
+    if board.is_game_over(claim_draw=True):
+        return None
+    return board.fen()
+
+
+class PonderSearch:
+    """One speculative search; buffers bridge events so a later request can replay them."""
+
+    def __init__(self, fen: str, depth: int, rollouts: Optional[int], session: Optional[str] = None,
+                 nodes: Optional[int] = None, movetime_ms: Optional[int] = None):
+        self.fen = fen
+        self.depth = depth
+        self.rollouts = rollouts
+        self.session = session
+        self.nodes = nodes
+        self.movetime_ms = movetime_ms
+        self.chunks: List[Event] = []
+        self.done = False
+        self._changed = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    async def run(self, bridge) -> None:
+        try:
+            async for chunk in bridge.think_stream(self.fen, depth=self.depth, rollouts=self.rollouts,
+                                                 movetime_ms=self.movetime_ms, session=self.session,
+                                                 nodes=self.nodes):
+                self.chunks.append(chunk)
+                self._changed.set()
+        except asyncio.CancelledError:
+            _dbg(f"search cancelled fen='{self.fen}'")
+            raise
+        finally:
+            self.done = True
+            self._changed.set()
+
+    async def follow(self) -> AsyncGenerator[Event, None]:
+        """Yield every event seen so far, then live events until the search ends."""
+        i = 0
+        while True:
+            while i < len(self.chunks):
+                yield self.chunks[i]
+                i += 1
+            if self.done:
+                return
+            self._changed.clear()
+            if i < len(self.chunks) or self.done:
+                continue
+            await self._changed.wait()
+
+    async def cancel(self) -> None:
+        """Stop the search (bridge sends `stop`) and wait until it released the engine."""
+        if self.task is None:
+            return
+        if not self.task.done():
+            self.task.cancel()
+        try:
+            await self.task
+        except (asyncio.CancelledError, Exception):
+            pass
+
+
+class Ponderer:
+    """Owns at most one speculative search on the given bridge."""
+
+    def __init__(self, bridge):
+        self.bridge = bridge
+        self.current: Optional[PonderSearch] = None
+        self.hits = 0
+        self.misses = 0
+
+    def start(self, fen: str, depth: int, rollouts: Optional[int], session: Optional[str] = None,
+              nodes: Optional[int] = None, movetime_ms: Optional[int] = None) -> None:
+        """Start pondering on `fen` (caller must have released the bridge)."""
+        if self.current is not None:
+            _dbg("start: previous ponder still registered; ignoring")
+            return
+        ps = PonderSearch(fen, depth, rollouts, session, nodes, movetime_ms)
+        ps.task = asyncio.create_task(ps.run(self.bridge))
+        self.current = ps
+        _dbg(f"start fen='{fen}' depth={depth}")
+
+    async def claim(self, fen: str, depth: int, nodes: Optional[int] = None,
+                    movetime_ms: Optional[int] = None,
+                    session: Optional[str] = None) -> Optional[PonderSearch]:
+        """
+        Return the running/finished ponder search if it matches this request
+        (same session too: it was searched with that game's history), otherwise
+        discard it and return None. Either way the bridge is no longer leased
+        for pondering afterwards.
+        """
+        ps = self.current
+        if ps is None:
+            return None
+        if (ps.fen == _norm_fen(fen) and ps.depth >= depth and ps.session == session
+                and ps.nodes == nodes and ps.movetime_ms == movetime_ms):
+            self.current = None
+            self.hits += 1
+            _dbg(f"hit (finished={ps.done}) hits={self.hits} misses={self.misses}")
+            return ps
+        self.misses += 1
+        _dbg(f"miss hits={self.hits} misses={self.misses}")
+        await self.discard()
+        return None
+
+    async def discard(self) -> None:
+        """Stop the speculative search (if any) and wait until the bridge is free."""
+        ps, self.current = self.current, None
+        if ps is not None:
+            await ps.cancel()
+
+
+def _norm_fen(fen: str) -> str:
+    try:
+        return chess.Board(fen).fen()
+    except Exception:
+        return fen
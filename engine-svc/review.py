@@ -0,0 +1,276 @@
+# Path: engine-svc/review.py
+"""
+Purpose: Whole-game review for POST /engines/review: every position of a game
+searched once, spread over the engine workers, one SSE event per ply.
+
+- The game (PGN, or a move list in UCI or SAN from an optional FEN) becomes
+  positions P0..PN; P_i is the position before ply i, PN the final one.
+- The positions are split into one contiguous chunk per worker. Each chunk is
+  searched from its last position back to its first as one engine session
+  (batch class), so the engine keeps its TT between them: P_{i+1} and its
+  subtree are part of P_i's tree, so every search starts with the plies after
+  it already in the TT.
+- Ply i is reported once P_i and P_{i+1} are both done:
+    best   the engine's move in P_i and its score (side to move)
+    after  the score after the played move (-score of P_{i+1}, same side)
+    loss   best - after in centipawns, both clamped to +-CLAMP_CP
+    class  best / good / inaccuracy / mistake / blunder by loss
+  then a summary (per side: average loss and counts per class).
+
+A final position that is already decided (mate, stalemate, ...) is scored
+without a search. Searches see FENs only, so repetitions in the game are not
+taken into account.
+"""
+from __future__ import annotations
+
+import asyncio
+import io
+import time
+from typing import AsyncGenerator, Dict, List, Optional
+
+import chess
+import chess.pgn
+from pydantic import BaseModel, Field
+
+from dispatcher import Dispatcher, SearchHandle
+from events import Bestmove, Error, Info
+
+MAX_PLIES = 600
+DEFAULT_MOVETIME_MS = 300     # per position when the request gives neither nodes nor movetime
+MIN_CHUNK = 4                 # positions per chunk; fewer workers are used for short games
+MATE_CP = 10_000
+CLAMP_CP = 1_000              # a won position that stays won is not a blunder
+CLASSES = (                   # (min loss in cp, class), first match wins
+    (300, "blunder"),
+    (100, "mistake"),
+    (50, "inaccuracy"),
+    (0, "good"),
+)
+
+PRINT_DBG = True
+def _dbg(msg: str):
+    if PRINT_DBG:
+        print(f"[DBG] review: {msg}", flush=True)
+
+
+class ReviewRequest(BaseModel):
+    pgn: Optional[str] = Field(None, max_length=200_000, description="Game as PGN (first game, main line)")
+    moves: Optional[List[str]] = Field(None, description="Moves in UCI or SAN, instead of pgn")
+    fen: Optional[str] = Field(None, description="Start position for `moves` (default: standard start)")
+    depth: int = Field(6, ge=1, le=64, description="Depth per position")
+    nodes: Optional[int] = Field(None, ge=1, description="Node budget per position")
+    movetime: Optional[int] = Field(None, ge=1, description="Time budget per position in ms "
+                                                            f"(default {DEFAULT_MOVETIME_MS} unless nodes is given)")
+
+    def movetime_ms(self) -> Optional[int]:
+        return self.movetime or (None if self.nodes else DEFAULT_MOVETIME_MS)
+
+
+class Game:
+    """Positions and moves of the game under review."""
+
+    def __init__(self, start: chess.Board, moves: List[chess.Move]):
+        board = start.copy(stack=False)
+        self.fens: List[str] = [board.fen()]
+        self.sans: List[str] = []
+        self.sides: List[str] = []          # side to move before each ply
+        self.moves = moves
+        for mv in moves:
+            self.sides.append("w" if board.turn == chess.WHITE else "b")
+            self.sans.append(board.san(mv))
+            board.push(mv)
+            self.fens.append(board.fen())
+        self.final = board
+
+    @property
+    def plies(self) -> int:
+        return len(self.moves)
+
+
+def parse_game(req: ReviewRequest) -> Game:
+    """ValueError with a client-facing message if the game cannot be read or replayed."""
+    if req.pgn:
+        game = chess.pgn.read_game(io.StringIO(req.pgn))
+        if game is None:
+            raise ValueError("no game in pgn")
+        if game.errors:
+            raise ValueError(f"pgn: {game.errors[0]}")
+        start, moves = game.board(), list(game.mainline_moves())
+    elif req.moves is not None:
+        try:
+            start = chess.Board(req.fen) if req.fen else chess.Board()
+        except ValueError:
+            raise ValueError("invalid fen")
+        board, moves = start.copy(), []
+        for i, tok in enumerate(req.moves):
+            try:
+                mv = chess.Move.from_uci(tok)
+                if mv not in board.legal_moves:
+                    raise ValueError
+            except ValueError:
+                try:
+                    mv = board.parse_san(tok)
+                except ValueError:
+                    raise ValueError(f"illegal move {tok!r} at ply {i}")
+            board.push(mv)
+            moves.append(mv)
+    else:
+        raise ValueError("pgn or moves required")
+    if not moves:
+        raise ValueError("game has no moves")
+    if len(moves) > MAX_PLIES:
+        raise ValueError(f"game too long ({len(moves)} plies, max {MAX_PLIES})")
+    return Game(start, moves)
+
+
+def split_chunks(n: int, workers: int) -> List[range]:
+    """Contiguous index ranges over n positions, one per worker, at least MIN_CHUNK long."""
+    k = max(1, min(workers, n // MIN_CHUNK))
+    size, extra = divmod(n, k)
+    out, lo = [], 0
+    for i in range(k):
+        hi = lo + size + (1 if i < extra else 0)
+        out.append(range(lo, hi))
+        lo = hi
+    return out
+
+
+def score_cp(score: Optional[Dict[str, int]]) -> Optional[int]:
+    """Engine score (side to move) as centipawns; mates map to +-(MATE_CP - plies)."""
+    if not score:
+        return None
+    if "mate" in score:
+        m = score["mate"]
+        return MATE_CP - abs(m) if m > 0 else -(MATE_CP - abs(m))
+    return score.get("cp")
+
+
+def classify(loss: int) -> str:
+    for threshold, name in CLASSES:
+        if loss >= threshold:
+            return name
+    return "good"
+
+
+def _clamp(cp: int) -> int:
+    return max(-CLAMP_CP, min(CLAMP_CP, cp))
+
+
+def terminal_score(board: chess.Board) -> Optional[Dict[str, int]]:
+    """Score of a decided position without a search (side to move), else None."""
+    if board.is_checkmate():
+        return {"mate": 0}
+    if board.is_game_over(claim_draw=False):
+        return {"cp": 0}
+    return None
+
+
+async def review(dispatcher: Dispatcher, handle: SearchHandle, game: Game, depth: int,
+                 nodes: Optional[int], movetime_ms: Optional[int]) -> AsyncGenerator[Dict, None]:
+    """Event dicts: one "ply" per move (in completion order), then "summary"."""
+    t0 = time.perf_counter()
+    n_pos = game.plies + 1
+    results: List[Optional[Dict]] = [None] * n_pos
+    last = terminal_score(game.final)
+    if last is not None:
+        results[game.plies] = {"best": None, "score": last}
+        n_search = game.plies
+    else:
+        n_search = n_pos
+    chunks = split_chunks(n_search, len(dispatcher.workers))
+    _dbg(f"review search={handle.id}: {game.plies} plies, {n_search} searches in {len(chunks)} chunk(s)")
+
+    queue: asyncio.Queue = asyncio.Queue()
+    subs = [SearchHandle(f"review-{handle.id}-{c}") for c in range(len(chunks))]
+
+    async def run_chunk(c: int, idx: range) -> None:
+        sub = subs[c]
+        try:
+            for i in reversed(idx):          # back to front: later plies are in the TT
+                if sub.cancelled.is_set():
+                    break
+                best, score, reached = None, None, 0
+                source = dispatcher.think(game.fens[i], depth, nodes, movetime_ms, None, sub.session,
+                                          handle=sub, priority="batch")
+                try:
+                    async for ev in source:
+                        if isinstance(ev, Info) and ev.score and ev.pv:
+                            score, reached = ev.score, ev.depth or reached
+                        elif isinstance(ev, Bestmove):
+                            best = ev.move or None
+                        elif isinstance(ev, Error):
+                            await queue.put(("error", i, ev.message))
+                            return
+                finally:
+                    await source.aclose()
+                await queue.put(("pos", i, {"best": best, "score": score, "depth": reached}))
+        finally:
+            dispatcher.forget(sub.session)
+            await queue.put(("chunk", c, None))
+
+    async def relay_stop() -> None:
+        await handle.cancelled.wait()
+        for sub in subs:
+            await dispatcher.cancel_handle(sub)
+
+    tasks = [asyncio.ensure_future(run_chunk(c, idx)) for c, idx in enumerate(chunks)]
+    relay = asyncio.ensure_future(relay_stop())
+    side_stats = {s: {"plies": 0, "loss": 0, **{name: 0 for _t, name in CLASSES}, "best": 0}
+                  for s in ("w", "b")}
+    emitted = [False] * game.plies
+    errors = 0
+    try:
+        running = len(tasks)
+        while running:
+            kind, i, payload = await queue.get()
+            if kind == "chunk":
+                running -= 1
+                continue
+            if kind == "error":
+                errors += 1
+                yield {"type": "info", "error": f"ply {i}: {payload}"}
+                continue
+            results[i] = payload
+            for ply in (i - 1, i):
+                if 0 <= ply < game.plies and not emitted[ply] and results[ply] and results[ply + 1]:
+                    emitted[ply] = True
+                    ev = _ply_event(game, ply, results[ply], results[ply + 1])
+                    if ev["class"] is not None:
+                        st = side_stats[ev["side"]]
+                        st["plies"] += 1
+                        st["loss"] += ev["loss"]
+                        st[ev["class"]] += 1
+                    yield ev
+    finally:
+        relay.cancel()
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    summary = {"type": "summary", "plies": game.plies, "reviewed": sum(emitted), "chunks": len(chunks),
+               "errors": errors, "stopped": handle.cancelled.is_set(),
+               "ms": int((time.perf_counter() - t0) * 1000)}
+    for side, st in side_stats.items():
+        plies = st.pop("plies")
+        loss = st.pop("loss")
+        summary["white" if side == "w" else "black"] = {"acpl": round(loss / plies) if plies else None, **st}
+    yield summary
+
+
+def _ply_event(game: Game, ply: int, here: Dict, after: Dict) -> Dict:
+    played = game.moves[ply].uci()
+    ev = {"type": "ply", "ply": ply, "side": game.sides[ply], "move": played, "san": game.sans[ply],
+          "best": here["best"], "score": here["score"], "depth": here.get("depth"),
+          "after": None, "loss": None, "class": None}
+    best_cp, after_cp = score_cp(here["score"]), score_cp(after["score"])
+    if best_cp is None or after_cp is None:
+        return ev
+    # P_{i+1} is scored for the opponent: flip it to the side that played ply i
+    a = after["score"]
+    ev["after"] = {"mate": -a["mate"]} if "mate" in a else {"cp": -a["cp"]}
+    if played == here["best"]:
+        ev["loss"], ev["class"] = 0, "best"
+    else:
+        ev["loss"] = max(0, _clamp(best_cp) - _clamp(-after_cp))
+        ev["class"] = classify(ev["loss"])
+    return ev
@@ -0,0 +1,270 @@
+# Path: engine-svc/scheduler.py
+"""
+Purpose: Priority classes for engine searches: which search gets an engine
+next, which one has to hand it back, and how many of each class may be in
+flight at once.
+
+Classes, highest first:
+  interactive  /engines/think (someone is waiting for the move)
+  selfplay     every ply of /engines/selfplay
+  batch        /engines/think?priority=batch (analysis / background jobs)
+
+Each search passes two stages:
+  1. Scheduler.admit (one per dispatcher): at most LIMIT[class] searches of a
+     class in flight across all workers (0 = no limit), FIFO. New streams are
+     refused (HTTP 503) while QUEUE_LIMIT[class] searches of the class wait.
+  2. EngineSlot.acquire (one per local engine): the engine goes to the waiter
+     of the highest class, FIFO within a class. A waiter of a higher class than
+     the running search preempts it: the search is stopped at its next
+     completed iteration (or PREEMPT_GRACE_MS after the request), re-queued at
+     the head of its class and run again when the engine is free; its client
+     only sees the final bestmove. A search preempted PREEMPT_MAX times runs to
+     the end (no starvation).
+
+ENGINE_CLASS_LIMITS / ENGINE_QUEUE_LIMITS: "interactive=0,selfplay=4,batch=1".
+Per-class metrics (GET /engines/workers -> "classes"): admitted, rejected,
+preempted, completed, active (admitted, in flight), queued, running, and
+queue-wait p50/p95.
+"""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+CLASSES = ("interactive", "selfplay", "batch")     # highest priority first
+RANK = {c: i for i, c in enumerate(CLASSES)}
+
+DEFAULT_LIMITS = "interactive=0,selfplay=0,batch=0"
+DEFAULT_QUEUE_LIMITS = "interactive=0,selfplay=64,batch=256"
+PREEMPT_GRACE_S = float(os.getenv("PREEMPT_GRACE_MS", "50")) / 1000.0
+PREEMPT_MAX = 3
+WAIT_SAMPLES = 1000              # queue waits kept per class for the percentiles
+
+PRINT_DBG = True
+def _dbg(msg: str):
+    if PRINT_DBG:
+        print(f"[DBG] scheduler: {msg}", flush=True)
+
+
+def parse_limits(spec: str) -> Dict[str, int]:
+    """"selfplay=4,batch=1" -> {class: limit}; classes not listed get 0 (no limit)."""
+    out = {c: 0 for c in CLASSES}
+    for entry in (e.strip() for e in spec.split(",")):
+        if not entry:
+            continue
+        name, _, value = entry.partition("=")
+        if name.strip() not in out:
+            raise ValueError(f"unknown search class '{name.strip()}' (known: {', '.join(CLASSES)})")
+        out[name.strip()] = max(0, int(value or 0))
+    return out
+
+
+class ClassStats:
+    """Admission-control counters for one class."""
+
+    def __init__(self, limit: int, queue_limit: int):
+        self.limit = limit
+        self.queue_limit = queue_limit
+        self.admitted = 0       # passed the class gate
+        self.rejected = 0       # refused at stream open (queue full)
+        self.preempted = 0      # stopped for a higher class (a search can count more than once)
+        self.completed = 0      # left the scheduler (bestmove, error or cancel)
+        self.active = 0         # admitted and not completed (counts against `limit`)
+        self.queued = 0         # waiting at the gate or for an engine, before first start
+        self.running = 0        # holding an engine right now
+        self.waits: Deque[float] = deque(maxlen=WAIT_SAMPLES)
+
+    def info(self) -> Dict:
+        w = sorted(self.waits)
+        pick = lambda q: round(w[min(len(w) - 1, int(len(w) * q))] * 1000, 1) if w else None
+        return {"limit": self.limit, "queue_limit": self.queue_limit, "admitted": self.admitted,
+                "rejected": self.rejected, "preempted": self.preempted, "completed": self.completed,
+                "active": self.active, "queued": self.queued, "running": self.running,
+                "wait_ms_p50": pick(0.50), "wait_ms_p95": pick(0.95)}
+
+
+_seq = itertools.count()
+
+
+class Ticket:
+    """One search's place in the scheduler (a selfplay stream takes one per ply)."""
+
+    def __init__(self, handle, cls: str, stats: ClassStats):
+        self.handle = handle                # dispatcher.SearchHandle
+        self.cls = cls
+        self.rank = RANK[cls]
+        self.seq = next(_seq)               # FIFO within a class; kept when re-queued
+        self.stats = stats
+        self.created = time.monotonic()
+        self.started = False                # left the queue (had an engine, or gave up)
+        self.preempt = asyncio.Event()      # set while a higher class waits for our engine
+        self.preemptions = 0
+
+    def preemptible(self) -> bool:
+        return self.preemptions < PREEMPT_MAX
+
+    def dequeue(self) -> bool:
+        """Leave the `queued` count (first engine grant, or given up); True the first time."""
+        if self.started:
+            return False
+        self.started = True
+        self.stats.queued -= 1
+        return True
+
+
+class Scheduler:
+    """Class gate + metrics; EngineSlots of the local workers report into it through tickets."""
+
+    def __init__(self, limits: Dict[str, int], queue_limits: Dict[str, int]):
+        self.classes = {c: ClassStats(limits.get(c, 0), queue_limits.get(c, 0)) for c in CLASSES}
+        self._gate: Dict[str, Deque[asyncio.Future]] = {c: deque() for c in CLASSES}
+
+    @classmethod
+    def from_env(cls) -> "Scheduler":
+        return cls(parse_limits(os.getenv("ENGINE_CLASS_LIMITS", DEFAULT_LIMITS)),
+                   parse_limits(os.getenv("ENGINE_QUEUE_LIMITS", DEFAULT_QUEUE_LIMITS)))
+
+    def admissible(self, cls: str) -> bool:
+        """Stream-open check; False (and counted as rejected) if the class queue is full."""
+        st = self.classes[cls]
+        if st.queue_limit and st.queued >= st.queue_limit:
+            st.rejected += 1
+            _dbg(f"reject {cls}: {st.queued} queued (limit {st.queue_limit})")
+            return False
+        return True
+
+    def ticket(self, handle, cls: str) -> Ticket:
+        st = self.classes[cls]
+        st.queued += 1
+        return Ticket(handle, cls, st)
+
+    async def admit(self, ticket: Ticket) -> bool:
+        """Wait until the class is under its limit; False if the search is cancelled first."""
+        st = ticket.stats
+        gate = self._gate[ticket.cls]
+        if not st.limit or (st.active < st.limit and not gate):
+            st.active += 1
+        else:
+            fut = asyncio.get_running_loop().create_future()
+            gate.append(fut)
+            cancelled = asyncio.ensure_future(ticket.handle.cancelled.wait())
+            try:
+                await asyncio.wait((fut, cancelled), return_when=asyncio.FIRST_COMPLETED)
+            except BaseException:
+                self._leave_gate(ticket, fut)
+                raise
+            finally:
+                cancelled.cancel()
+            if not fut.done() or ticket.handle.cancelled.is_set():
+                self._leave_gate(ticket, fut)
+                return False
+        st.admitted += 1
+        return True
+
+    def _leave_gate(self, ticket: Ticket, fut: asyncio.Future) -> None:
+        ticket.dequeue()
+        if fut.done():
+            self._pass_on(ticket.cls)     # let in meanwhile: hand the place on
+        else:
+            fut.cancel()
+            self._gate[ticket.cls].remove(fut)
+
+    def _pass_on(self, cls: str) -> None:
+        gate = self._gate[cls]
+        while gate:
+            fut = gate.popleft()
+            if not fut.cancelled():
+                fut.set_result(None)      # the place moves on; `active` stays the same
+                return
+        self.classes[cls].active -= 1
+
+    def finish(self, ticket: Ticket) -> None:
+        """An admitted search is over (bestmove, error or cancel): free its place in the class."""
+        ticket.stats.completed += 1
+        ticket.dequeue()
+        self._pass_on(ticket.cls)
+
+    def status(self) -> Dict[str, Dict]:
+        return {c: st.info() for c, st in self.classes.items()}
+
+
+class EngineSlot:
+    """
+    One engine, granted to the highest-class waiter (FIFO within a class). A
+    waiter that outranks the holder sets the holder's `preempt` event; the
+    worker running the holder stops it and re-queues it.
+    """
+
+    def __init__(self):
+        self.holder: Optional[Ticket] = None
+        self._waiters: List[Tuple[int, int, asyncio.Future, Ticket]] = []
+
+    def _grant(self, ticket: Ticket) -> None:
+        self.holder = ticket
+        ticket.preempt.clear()
+        ticket.stats.running += 1
+        if ticket.dequeue():
+            ticket.stats.waits.append(time.monotonic() - ticket.created)
+
+    def _maybe_preempt(self, ticket: Ticket) -> None:
+        h = self.holder
+        if h is not None and ticket.rank < h.rank and h.preemptible() and not h.preempt.is_set():
+            _dbg(f"{ticket.cls} search={ticket.handle.id} preempts {h.cls} search={h.handle.id}")
+            h.preempt.set()
+
+    async def acquire(self, ticket: Ticket) -> bool:
+        """Wait for the engine; False if the ticket's search is cancelled first."""
+        if self.holder is None and not self._waiters:
+            self._grant(ticket)
+            return True
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (ticket.rank, ticket.seq, fut, ticket))
+        self._maybe_preempt(ticket)
+        cancelled = asyncio.ensure_future(ticket.handle.cancelled.wait())
+        try:
+            await asyncio.wait((fut, cancelled), return_when=asyncio.FIRST_COMPLETED)
+        except BaseException:
+            # stream torn down (client gone), possibly in the tick the engine was granted
+            self._abandon(fut)
+            raise
+        finally:
+            cancelled.cancel()
+        if fut.done() and not ticket.handle.cancelled.is_set():
+            return True
+        self._abandon(fut)
+        return False
+
+    def _abandon(self, fut: asyncio.Future) -> None:
+        if fut.done():
+            self.release()               # granted meanwhile: hand it on
+            return
+        fut.cancel()
+        self._waiters = [w for w in self._waiters if w[2] is not fut]
+        heapq.heapify(self._waiters)
+
+    def release(self) -> None:
+        if self.holder is not None:
+            self.holder.stats.running -= 1
+            self.holder = None
+        while self._waiters:
+            _rank, _seq, fut, ticket = heapq.heappop(self._waiters)
+            if fut.cancelled():
+                continue
+            self._grant(ticket)
+            fut.set_result(None)
+            # a higher class may have queued behind an unpreemptible holder: ask again
+            if self._waiters:
+                self._maybe_preempt(self._waiters[0][3])
+            return
+
+    def queued(self) -> Dict[str, int]:
+        out: Dict[str, int] = {}
+        for _r, _s, fut, t in self._waiters:
+            if not fut.cancelled():
+                out[t.cls] = out.get(t.cls, 0) + 1
+        return out
@@ -0,0 +1,133 @@
+# Path: engine-svc/sessions.py
+"""
+Purpose: Track per-game engine sessions so consecutive searches of one game are
+sent as `position <start> moves m1 m2 ...` to the same (sticky) engine.
+
+Clients keep sending plain FENs; the session infers the moves that lead from
+its last known position to the new FEN (up to two plies forward, after
+backing up at most two plies — covers AI move + human reply, and ponder misses).
+If the FEN is unrelated, the session restarts from that FEN.
+
+The engine keeps its TT/history/killers between `position`/`go` pairs and only
+resets on `ucinewgame`, which the bridge sends when the engine changes owner.
+"""
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import List, Optional
+
+import chess
+
+MAX_SESSIONS = 256
+MAX_PLIES_BACK = 2
+MAX_PLIES_FORWARD = 2
+
+PRINT_DBG = True
+def _dbg(msg: str):
+    if PRINT_DBG:
+        print(f"[DBG] sessions: {msg}", flush=True)
+
+
+def _pos_key(board: chess.Board) -> str:
+    # placement, side, castling, ep — move counters don't change the position
+    return " ".join(board.fen().split()[:4])
+
+
+class GameSession:
+    def __init__(self, sid: str, fen: str):
+        self.sid = sid
+        self.reset(fen)
+
+    def reset(self, fen: str) -> None:
+        self.board = chess.Board(fen)
+        self.start_fen = self.board.fen()
+        self.moves: List[str] = []
+        self.last_bestmove: Optional[str] = None
+
+    def _find_path(self, board: chess.Board, target: str, plies: int) -> Optional[List[chess.Move]]:
+        # board_fen() is much cheaper than fen(); only build the full key on a placement match
+        if board.board_fen() == target.split(" ", 1)[0] and _pos_key(board) == target:
+            return []
+        if plies == 0:
+            return None
+        for mv in board.legal_moves:
+            board.push(mv)
+            try:
+                rest = self._find_path(board, target, plies - 1)
+            finally:
+                board.pop()
+            if rest is not None:
+                return [mv] + rest
+        return None
+
+    def advance_to(self, fen: str, hint: Optional[str] = None) -> bool:
+        """
+        Move the session to `fen`. Returns True if `fen` continues this game's
+        move history, False if the session had to restart from `fen`.
+        `hint` (a UCI move, e.g. our last bestmove) is tried first.
+        """
+        tb = chess.Board(fen)
+        target = _pos_key(tb)
+        target_men = chess.popcount(tb.occupied)
+        for back in range(0, min(MAX_PLIES_BACK, len(self.moves)) + 1):
+            b = self.board.copy()
+            for _ in range(back):
+                b.pop()
+            # each ply captures at most one man: cheap reject for unrelated FENs
+            if not 0 <= chess.popcount(b.occupied) - target_men <= MAX_PLIES_FORWARD:
+                continue
+            path = None
+            if hint:
+                try:
+                    mv = chess.Move.from_uci(hint)
+                except ValueError:
+                    mv = None
+                if mv is not None and mv in b.legal_moves:
+                    b.push(mv)
+                    rest = self._find_path(b, target, MAX_PLIES_FORWARD - 1)
+                    b.pop()
+                    if rest is not None:
+                        path = [mv] + rest
+            if path is None:
+                path = self._find_path(b, target, MAX_PLIES_FORWARD)
+            if path is None:
+                continue
+            for mv in path:
+                b.push(mv)
+            self.board = b
+            self.moves = self.moves[:len(self.moves) - back] + [m.uci() for m in path]
+            return True
+        _dbg(f"session {self.sid}: FEN not reachable, restarting history")
+        self.reset(fen)
+        return False
+
+    def position_cmd(self) -> str:
+        if self.start_fen == chess.STARTING_FEN:
+            head = "position startpos"
+        else:
+            head = f"position fen {self.start_fen}"
+        if self.moves:
+            return f"{head} moves {' '.join(self.moves)}\n"
+        return head + "\n"
+
+
+class SessionStore:
+    """Small LRU of GameSession objects keyed by client-provided session/game id."""
+
+    def __init__(self, max_sessions: int = MAX_SESSIONS):
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, GameSession]" = OrderedDict()
+
+    def get(self, sid: str, fen: str) -> GameSession:
+        s = self._sessions.get(sid)
+        if s is None:
+            s = GameSession(sid, fen)
+            self._sessions[sid] = s
+            if len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        else:
+            self._sessions.move_to_end(sid)
+        return s
+
+    def drop(self, sid: str) -> None:
+        self._sessions.pop(sid, None)
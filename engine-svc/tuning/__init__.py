@@ -0,0 +1,2 @@
+# Path: engine-svc/tuning/__init__.py
+"""Offline evaluation tuning tools; run from engine-svc/ as `python -m tuning.<name>`."""
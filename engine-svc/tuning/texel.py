@@ -0,0 +1,340 @@
+# Path: engine-svc/tuning/texel.py
+"""
+Purpose: Texel-style tuning of piece values + PSTs from a local game corpus.
+
+Usage (from engine-svc/, after `pip install -r requirements-tools.txt`):
+  python -m tuning.texel games/*.pgn data/quiet.epd --out eval_params.txt
+  EVAL_PARAMS=eval_params.txt python uci_main.py --engine ab      # use the result
+  EVAL_PARAMS=/app/eval_params.txt /app/pyrefengine                # Rust engine too
+
+Pipeline:
+  1. PGN/EPD files are cut into text chunks in the parent process and parsed by a
+     multiprocessing pool into packed bitboards + game result (White's view).
+     PGN positions are kept only if they are "quiet enough": past the opening
+     plies, side to move not in check, and the move played is not a capture or
+     promotion. EPD lines need a result: `c9 "1-0";`, `1/2-1/2` or `[0.5]`.
+  2. Each position becomes an int8 feature row: 5 material counts (P..Q) and
+     6x64 PST occupancy, White minus mirrored Black — the evaluation is linear
+     in these, identical to ab_engine.material_pst().
+  3. Loss = mean (R - sigmoid(K * eval / 400))^2 with sigmoid base 10. K is fitted
+     first on the starting parameters, then Adam runs on the full-batch gradient
+     (computed in chunks with NumPy).
+  4. PST means are folded into the piece values, everything is rounded and
+     written with engines.eval_params.write_params.
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import multiprocessing as mp
+import os
+import re
+import sys
+import time
+from typing import Iterator, List, Optional, Tuple
+
+import chess
+import chess.pgn
+import numpy as np
+
+from engines import ab_engine
+from engines.batch_eval import N_PLANES, PIECE_TYPES, bitboards_from_fens, board_row, unpack_bitboards
+from engines.eval_params import read_params, write_params
+
+N_VALUES = 5                    # P..Q; the king has no material term
+N_FEATURES = N_VALUES + 6 * 64
+EVAL_CHUNK = 262_144            # rows per matmul chunk in loss/gradient
+GAMES_PER_CHUNK = 200
+EPD_LINES_PER_CHUNK = 20_000
+
+_MIRROR = np.array([chess.square_mirror(sq) for sq in chess.SQUARES])
+_RESULTS = {"1-0": 1.0, "0-1": 0.0, "1/2-1/2": 0.5}
+_EPD_RESULT = re.compile(r'(1-0|0-1|1/2-1/2)|\[\s*([01](?:\.\d+)?)\s*\]')
+
+
+# ---------------------------
+# Corpus streaming
+# ---------------------------
+def _pgn_chunks(path: str, games: int) -> Iterator[Tuple[str, str]]:
+    buf: List[str] = []
+    n = 0
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            if line.startswith("[Event "):
+                if n >= games:
+                    yield "pgn", "".join(buf)
+                    buf, n = [], 0
+                n += 1
+            buf.append(line)
+    if buf:
+        yield "pgn", "".join(buf)
+
+
+def _epd_chunks(path: str, lines: int) -> Iterator[Tuple[str, str]]:
+    buf: List[str] = []
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            buf.append(line)
+            if len(buf) >= lines:
+                yield "epd", "".join(buf)
+                buf = []
+    if buf:
+        yield "epd", "".join(buf)
+
+
+def iter_chunks(paths: List[str]) -> Iterator[Tuple[str, str]]:
+    for path in paths:
+        if os.path.isdir(path):
+            names = sorted(os.listdir(path))
+            yield from iter_chunks([os.path.join(path, n) for n in names
+                                    if n.lower().endswith((".pgn", ".epd"))])
+        elif path.lower().endswith(".epd"):
+            yield from _epd_chunks(path, EPD_LINES_PER_CHUNK)
+        else:
+            yield from _pgn_chunks(path, GAMES_PER_CHUNK)
+
+
+# ---------------------------
+# Workers: text chunk -> (bitboards, result)
+# ---------------------------
+_SKIP_PLIES = 8
+
+def _init_worker(skip_plies: int) -> None:
+    global _SKIP_PLIES
+    _SKIP_PLIES = skip_plies
+
+
+def _parse_pgn_chunk(text: str) -> Tuple[list, list]:
+    rows, results = [], []
+    stream = io.StringIO(text)
+    while True:
+        try:
+            game = chess.pgn.read_game(stream)
+        except Exception:
+            break       # unreadable rest of chunk; keep what was parsed
+        if game is None:
+            break
+        r = _RESULTS.get(game.headers.get("Result", "*"))
+        if r is None or game.errors:
+            continue
+        board = game.board()
+        for ply, mv in enumerate(game.mainline_moves()):
+            if (ply >= _SKIP_PLIES and not board.is_check()
+                    and not board.is_capture(mv) and not mv.promotion):
+                rows.append(board_row(board))
+                results.append(r)
+            board.push(mv)
+    return rows, results
+
+
+def _parse_epd_chunk(text: str) -> Tuple[list, list]:
+    fens, results = [], []
+    for line in text.splitlines():
+        fields = line.split()
+        if len(fields) < 4:
+            continue
+        m = _EPD_RESULT.search(line)
+        if m is None:
+            continue
+        r = _RESULTS[m.group(1)] if m.group(1) else float(m.group(2))
+        fens.append(" ".join(fields[:4]))
+        results.append(r)
+    if not fens:
+        return [], []
+    bbs, _ = bitboards_from_fens(fens)
+    return bbs.tolist(), results
+
+
+def _parse_chunk(job: Tuple[str, str]) -> Tuple[np.ndarray, np.ndarray]:
+    kind, text = job
+    rows, results = _parse_pgn_chunk(text) if kind == "pgn" else _parse_epd_chunk(text)
+    return (np.array(rows, dtype=np.uint64).reshape(-1, N_PLANES),
+            np.array(results, dtype=np.float32))
+
+
+def load_corpus(paths: List[str], workers: int, skip_plies: int,
+                max_positions: Optional[int]) -> Tuple[np.ndarray, np.ndarray]:
+    bbs, res = [], []
+    total = 0
+    with mp.Pool(workers, initializer=_init_worker, initargs=(skip_plies,)) as pool:
+        for b, r in pool.imap(_parse_chunk, iter_chunks(paths)):
+            bbs.append(b)
+            res.append(r)
+            total += len(r)
+            if max_positions and total >= max_positions:
+                pool.terminate()
+                break
+    if not bbs:
+        return np.zeros((0, N_PLANES), dtype=np.uint64), np.zeros(0, dtype=np.float32)
+    b, r = np.concatenate(bbs), np.concatenate(res)
+    if max_positions:
+        b, r = b[:max_positions], r[:max_positions]
+    return b, r
+
+
+# ---------------------------
+# Features / parameters
+# ---------------------------
+def features(bbs: np.ndarray, chunk: int = EVAL_CHUNK) -> np.ndarray:
+    """(N, 12) bitboards -> (N, 389) int8 rows: [P..Q counts | 6x64 PST occupancy], White - Black."""
+    out = np.empty((bbs.shape[0], N_FEATURES), dtype=np.int8)
+    for lo in range(0, bbs.shape[0], chunk):
+        planes = unpack_bitboards(bbs[lo:lo + chunk]).astype(np.int8)
+        pst = planes[:, :6, :] - planes[:, 6:, :][:, :, _MIRROR]
+        out[lo:lo + len(planes), :N_VALUES] = pst[:, :N_VALUES, :].sum(axis=-1)
+        out[lo:lo + len(planes), N_VALUES:] = pst.reshape(len(planes), -1)
+    return out
+
+
+def params_to_vector(values, psts) -> np.ndarray:
+    theta = np.zeros(N_FEATURES, dtype=np.float64)
+    theta[:N_VALUES] = [values[pt] for pt in PIECE_TYPES[:N_VALUES]]
+    for i, pt in enumerate(PIECE_TYPES):
+        theta[N_VALUES + i * 64:N_VALUES + (i + 1) * 64] = psts[pt]
+    return theta
+
+
+def vector_to_params(theta: np.ndarray):
+    """Fold PST means into piece values (fixes the value/PST gauge), then round."""
+    theta = theta.copy()
+    for i, pt in enumerate(PIECE_TYPES):
+        seg = slice(N_VALUES + i * 64, N_VALUES + (i + 1) * 64)
+        table = theta[seg]
+        live = slice(8, 56) if pt == chess.PAWN else slice(0, 64)
+        mean = table[live].mean()
+        table -= mean
+        if pt == chess.PAWN:
+            table[:8] = 0
+            table[56:] = 0
+        if i < N_VALUES:
+            theta[i] += mean
+    values = {pt: int(round(theta[i])) for i, pt in enumerate(PIECE_TYPES[:N_VALUES])}
+    values[chess.KING] = int(ab_engine.PIECE_VALUES[chess.KING])
+    psts = {pt: [int(round(v)) for v in theta[N_VALUES + i * 64:N_VALUES + (i + 1) * 64]]
+            for i, pt in enumerate(PIECE_TYPES)}
+    return values, psts
+
+
+# ---------------------------
+# Loss / gradient
+# ---------------------------
+def _sigmoid(s: np.ndarray, k: float) -> np.ndarray:
+    return 1.0 / (1.0 + np.power(10.0, -k * s / 400.0))
+
+
+def loss(X: np.ndarray, R: np.ndarray, theta: np.ndarray, k: float, chunk: int = EVAL_CHUNK) -> float:
+    th = theta.astype(np.float32)
+    total = 0.0
+    for lo in range(0, X.shape[0], chunk):
+        s = X[lo:lo + chunk].astype(np.float32) @ th
+        total += float(np.sum((R[lo:lo + chunk] - _sigmoid(s, k)) ** 2))
+    return total / max(1, X.shape[0])
+
+
+def loss_and_grad(X: np.ndarray, R: np.ndarray, theta: np.ndarray, k: float,
+                  chunk: int = EVAL_CHUNK) -> Tuple[float, np.ndarray]:
+    th = theta.astype(np.float32)
+    total = 0.0
+    grad = np.zeros(N_FEATURES, dtype=np.float64)
+    c = k * np.log(10.0) / 400.0
+    for lo in range(0, X.shape[0], chunk):
+        xb = X[lo:lo + chunk].astype(np.float32)
+        p = _sigmoid(xb @ th, k)
+        err = R[lo:lo + chunk] - p
+        total += float(np.sum(err ** 2))
+        # d/dθ (R - σ)^2 = -2 (R - σ) σ (1 - σ) c x
+        grad += (xb.T @ (-2.0 * c * err * p * (1.0 - p))).astype(np.float64)
+    n = max(1, X.shape[0])
+    return total / n, grad / n
+
+
+def fit_k(X: np.ndarray, R: np.ndarray, theta: np.ndarray, lo: float = 0.1, hi: float = 3.0,
+          iters: int = 30) -> float:
+    """Golden-section search for the sigmoid scale K at fixed parameters."""
+    g = (np.sqrt(5.0) - 1.0) / 2.0
+    a, b = lo, hi
+    c, d = b - g * (b - a), a + g * (b - a)
+    fc, fd = loss(X, R, theta, c), loss(X, R, theta, d)
+    for _ in range(iters):
+        if fc < fd:
+            b, d, fd = d, c, fc
+            c = b - g * (b - a)
+            fc = loss(X, R, theta, c)
+        else:
+            a, c, fc = c, d, fd
+            d = a + g * (b - a)
+            fd = loss(X, R, theta, d)
+    return (a + b) / 2.0
+
+
+def tune(X: np.ndarray, R: np.ndarray, theta: np.ndarray, k: float, epochs: int, lr: float,
+         tune_values: bool = True, log_every: int = 10) -> np.ndarray:
+    """Adam on the full-batch gradient."""
+    theta = theta.copy()
+    m = np.zeros_like(theta)
+    v = np.zeros_like(theta)
+    b1, b2, eps = 0.9, 0.999, 1e-8
+    mask = np.ones_like(theta)
+    if not tune_values:
+        mask[:N_VALUES] = 0.0
+    for t in range(1, epochs + 1):
+        e, g = loss_and_grad(X, R, theta, k)
+        g *= mask
+        m = b1 * m + (1 - b1) * g
+        v = b2 * v + (1 - b2) * g * g
+        theta -= lr * (m / (1 - b1 ** t)) / (np.sqrt(v / (1 - b2 ** t)) + eps)
+        if t == 1 or t % log_every == 0 or t == epochs:
+            vals = " ".join(f"{x:.0f}" for x in theta[:N_VALUES])
+            print(f"epoch {t:5d}  loss {e:.6f}  values {vals}", flush=True)
+    return theta
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Texel tuning of piece values and PSTs")
+    parser.add_argument("inputs", nargs="+", help="PGN/EPD files or directories")
+    parser.add_argument("--out", default="eval_params.txt", help="output params file")
+    parser.add_argument("--init", default=None, help="start from this params file (default: engine tables)")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1))
+    parser.add_argument("--skip-plies", type=int, default=8, help="ignore the first N plies of each game")
+    parser.add_argument("--max-positions", type=int, default=None)
+    parser.add_argument("--epochs", type=int, default=300)
+    parser.add_argument("--lr", type=float, default=2.0, help="Adam step size in centipawns")
+    parser.add_argument("--k", type=float, default=None, help="fixed sigmoid scale (default: fitted)")
+    parser.add_argument("--freeze-values", action="store_true", help="tune PSTs only")
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    bbs, R = load_corpus(args.inputs, args.workers, args.skip_plies, args.max_positions)
+    if len(R) == 0:
+        print("no labelled positions found", file=sys.stderr)
+        sys.exit(1)
+    X = features(bbs)
+    del bbs
+    print(f"loaded {len(R)} positions in {time.perf_counter() - t0:.1f}s "
+          f"(W {np.mean(R == 1.0):.1%} D {np.mean(R == 0.5):.1%} L {np.mean(R == 0.0):.1%})", flush=True)
+
+    values, psts = dict(ab_engine.PIECE_VALUES), {pt: list(t) for pt, t in ab_engine.PSTS.items()}
+    if args.init:
+        v, p = read_params(args.init)
+        values.update(v)
+        psts.update(p)
+    theta0 = params_to_vector(values, psts)
+
+    k = args.k if args.k is not None else fit_k(X, R, theta0)
+    e0 = loss(X, R, theta0, k)
+    print(f"K = {k:.4f}  initial loss {e0:.6f}", flush=True)
+
+    t1 = time.perf_counter()
+    theta = tune(X, R, theta0, k, args.epochs, args.lr, tune_values=not args.freeze_values)
+    out_values, out_psts = vector_to_params(theta)
+    e1 = loss(X, R, params_to_vector(out_values, out_psts), k)
+    print(f"final loss {e1:.6f} (rounded) in {time.perf_counter() - t1:.1f}s", flush=True)
+
+    header = (f"Texel-tuned by tuning/texel.py on {len(R)} positions\n"
+              f"K={k:.4f} loss {e0:.6f} -> {e1:.6f}")
+    write_params(args.out, out_values, out_psts, header)
+    print(f"wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,61 @@
 # Path: engine-svc/uci_bridge.py
 """
-Purpose: Manage a UCI engine process, send commands, and stream parsed `info` as JSON.
+Purpose: Manage a UCI engine process, send commands, and stream typed search events
+(events.Info / Bestmove / Error).
 
 This hardened build fixes self-play stalls caused by concurrent reads:
 - All reads from engine stdout are serialized with a single asyncio.Lock.
 - abort_current_search(): send one STOP; if another reader is active, don't drain.
-- Preflight STOP before new search; isready() has timeout + auto-restart.
+  STOPs within 100 ms of the previous one are dropped unless force=True
+  (preemption and cancel must reach the engine).
+- Preflight STOP before new search; isready() has timeout + auto-restart
+  (a fallback only: engines answer isready/stop while searching). Both are
+  skipped while the engine is known idle (last search ended with bestmove).
 - Extra breadcrumbs preserved.
+- Optional game sessions: searches tagged with a session id are sent as
+  `position <start> moves ...` and the engine keeps its search state between
+  them; `ucinewgame` is sent only when the engine switches to another session.
+- Optional binary frames (engines/frames.py): if the engine offers the
+  `Protocol` option at handshake, engine output switches to length-prefixed
+  frames and `info`/`bestmove` arrive as structured reports (no text
+  tokenizing). ENGINE_PROTOCOL=uci forces plain UCI text.
+- Search limits: depth, nodes and movetime go out in one combined `go`; the
+  engine stops at whichever is hit first. As a backstop, a search still
+  running MOVETIME_GRACE_S past its movetime is sent `stop`.
+- Search statistics: stream_go(stats=True/False) toggles the engine's `Stats`
+  option (only if offered, only when it changes); the counters arrive as
+  Info(stats={...}) once per iteration.
+- Process start goes through launcher.spawn(): Python engines are forked
+  from a pre-imported zygote, binaries are exec'd without a shell, so a
+  restart after an isready timeout costs milliseconds.
 """
 from __future__ import annotations
 
 import asyncio
-import json
 import os
 import time
-from typing import AsyncGenerator, Optional, Deque
+from typing import AsyncGenerator, Optional, Deque, Tuple, Union
 from collections import deque
 
+import chess
+
+from engines.frames import (
+    F_BESTMOVE, F_INFO, F_READY, HEADER, PROTOCOL_ACK, decode_bestmove, decode_info,
+)
+from events import Bestmove, Error, Event, Info
+import launcher
+from sessions import GameSession, SessionStore
 from uci_parser import parse_info_line
 
+# "auto": use frames when the engine offers them; "uci": always plain text
+ENGINE_PROTOCOL = os.getenv("ENGINE_PROTOCOL", "auto").strip().lower()
+
+# Engine overrunning its movetime by this much gets a `stop` from the bridge
+MOVETIME_GRACE_S = float(os.getenv("MOVETIME_GRACE_MS", "300")) / 1000.0
+
+# One engine output message: a text line, or a decoded INFO / BESTMOVE frame
+EngineMsg = Union[str, Info, Bestmove]
+
 PRINT_DBG = True
 def _dbg(msg: str):
     if PRINT_DBG:
@@ -29,45 +66,80 @@ print("[DBG] uci_bridge loaded", flush=True)
 class UciBridge:
     def __init__(self, cmd: str):
         self.cmd = cmd
-        self.proc: Optional[asyncio.subprocess.Process] = None
+        self.proc: Optional[launcher.EngineProcess] = None
         self._last_lines: Deque[str] = deque(maxlen=50)
         self._read_lock = asyncio.Lock()           # NEW: serialize all stdout reads
         self._search_active = False                # NEW: track active search
         self._last_stop_ts = 0.0                   # NEW: throttle STOP
+        self.sessions = SessionStore()
+        self._owner: Optional[str] = None          # session whose game state the engine holds
+        self._framed = False                       # engine output is binary frames
+        self._idle = False                         # last search ended with bestmove; no stop pending
+        self._options: set = set()                 # option names offered at handshake
+        self._stats_on = False                     # engine's Stats option as last set
+        self.spawns = 0                            # engine processes started (restarts = spawns - 1)
         _dbg(f"__init__ cmd={cmd}")
 
     # ---------------- core process mgmt ----------------
     async def _spawn(self):
         _dbg(f"starting engine: {self.cmd}")
-        self.proc = await asyncio.create_subprocess_shell(
-            self.cmd,
-            stdin=asyncio.subprocess.PIPE,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.STDOUT,
-            env=os.environ.copy(),
-        )
+        self._framed = False
+        self._idle = False
+        self._options = set()
+        self._stats_on = False
+        t0 = time.perf_counter()
+        self.proc = await launcher.spawn(self.cmd)
+        self.spawns += 1
+        _dbg(f"engine pid={self.proc.pid} spawned in {(time.perf_counter() - t0) * 1000:.1f}ms")
+
+    def _alive(self) -> bool:
+        """Process running and its stdout open (EOF can come before the exit status)."""
+        p = self.proc
+        return p is not None and p.returncode is None and not (p.stdout and p.stdout.at_eof())
 
     async def _ensure_started(self):
-        if self.proc and self.proc.returncode is None:
+        if self._alive():
             return
+        if self.proc is not None:
+            _dbg(f"engine pid={self.proc.pid} gone (code={self.proc.returncode}); respawning")
+            try:
+                self.proc.kill()
+            except Exception:
+                pass
+            self._owner = None
         await self._spawn()
         await self._send("uci\n")
         try:
             # handshake under read lock
             async with self._read_lock:
+                offers_frames = False
                 while True:
-                    line = await asyncio.wait_for(self.proc.stdout.readline(), timeout=3.0)  # type: ignore[arg-type]
-                    if not line:
-                        raise RuntimeError("engine terminated during UCI handshake")
-                    txt = line.decode("utf-8", errors="replace").strip()
-                    self._last_lines.append(txt)
-                    _dbg(f"<< {txt}")
+                    txt = await self._handshake_line()
+                    if txt.startswith("option name Protocol ") and " var frames" in txt:
+                        offers_frames = True
+                    if txt.startswith("option name ") and " type " in txt:
+                        self._options.add(txt[len("option name "):txt.index(" type ")])
                     if txt == "uciok":
                         _dbg("handshake ok")
                         break
+                if offers_frames and ENGINE_PROTOCOL != "uci":
+                    await self._send("setoption name Protocol value frames\n")
+                    while await self._handshake_line() != PROTOCOL_ACK:
+                        pass
+                    self._framed = True
+                    _dbg("protocol: frames")
         except asyncio.TimeoutError:
             raise RuntimeError("uci handshake timed out")
 
+    async def _handshake_line(self) -> str:
+        line = await asyncio.wait_for(self.proc.stdout.readline(), timeout=3.0)  # type: ignore[union-attr]
+        if not line:
+            raise RuntimeError("engine terminated during UCI handshake")
+        txt = line.decode("utf-8", errors="replace").strip()
+        self._last_lines.append(txt)
+        _dbg(f"<< {txt}")
+        return txt
+
     async def _restart_engine(self):
         _dbg("restarting engine process")
         if self.proc:
@@ -76,6 +148,7 @@ class UciBridge:
             except Exception:
                 pass
         self.proc = None
+        self._owner = None
         await self._ensure_started()
 
     # ---------------- i/o helpers ----------------
@@ -85,25 +158,28 @@ class UciBridge:
         self.proc.stdin.write(s.encode("utf-8"))
         await self.proc.stdin.drain()
 
-    async def _readline_timeout(self, timeout: float) -> Optional[str]:
+    async def _read_msg_timeout(self, timeout: float) -> Optional[EngineMsg]:
         """
-        Read one line with timeout.
+        Read one engine message with timeout.
         Returns:
           None  -> timed out
           ""    -> stream closed
-          "..." -> line
+          "..." -> text line ("readyok" for a READY frame)
+          Info / Bestmove -> decoded INFO / BESTMOVE frame
         Always serialized via _read_lock to avoid concurrent reads.
         """
         assert self.proc and self.proc.stdout
         try:
             async with self._read_lock:
+                if self._framed:
+                    return await self._read_frame(timeout)
                 try:
                     line = await asyncio.wait_for(self.proc.stdout.readline(), timeout=timeout)  # type: ignore[arg-type]
                 except asyncio.TimeoutError:
                     return None
         except RuntimeError as e:
             # Shouldn't happen with the lock, but guard anyway
-            _dbg(f"_readline_timeout lock error: {e}")
+            _dbg(f"_read_msg_timeout lock error: {e}")
             return None
 
         if not line:
@@ -113,6 +189,28 @@ class UciBridge:
         _dbg(f"<< {txt}")
         return txt
 
+    async def _read_frame(self, timeout: float) -> Optional[EngineMsg]:
+        reader = self.proc.stdout  # type: ignore[union-attr]
+        try:
+            # readexactly consumes nothing until all bytes are there, so a timeout is safe
+            head = await asyncio.wait_for(reader.readexactly(HEADER.size), timeout=timeout)
+            ftype, length = HEADER.unpack(head)
+            payload = await reader.readexactly(length) if length else b""
+        except asyncio.TimeoutError:
+            return None
+        except asyncio.IncompleteReadError:
+            return ""
+        if ftype == F_INFO:
+            return Info.from_dict(decode_info(payload))
+        if ftype == F_BESTMOVE:
+            best, ponder = decode_bestmove(payload)
+            self._last_lines.append(f"bestmove {best}")
+            return Bestmove(best, ponder)
+        txt = "readyok" if ftype == F_READY else payload.decode("utf-8", errors="replace")
+        self._last_lines.append(txt)
+        _dbg(f"<< {txt}")
+        return txt
+
     # ---------------- public ops ----------------
     async def isready(self, restart_on_timeout: bool = True) -> bool:
         await self._ensure_started()
@@ -122,7 +220,7 @@ class UciBridge:
         for attempt in (1, 2):
             deadline = asyncio.get_event_loop().time() + 2.0
             while asyncio.get_event_loop().time() < deadline:
-                txt = await self._readline_timeout(0.25)
+                txt = await self._read_msg_timeout(0.25)
                 if txt is None:
                     continue  # timeout slice; keep waiting
                 if txt == "":
@@ -138,47 +236,58 @@ class UciBridge:
             await self._send("isready\n")
         return False
 
-    async def abort_current_search(self):
+    @property
+    def searching(self) -> bool:
+        """A `go` has been sent and its bestmove not read yet."""
+        return self._search_active
+
+    async def abort_current_search(self, force: bool = False) -> bool:
         """
         Send 'stop' and (if safe) drain briefly until 'bestmove'.
         If another coroutine is currently reading (lock held), we *only* send stop
         and let the main reader consume the remainder — avoids concurrent read errors.
+        Returns True if 'stop' was sent.
         """
         if not self.proc or self.proc.returncode is not None:
-            return
+            return False
 
         # Throttle duplicate STOPs within 100ms
         now = time.monotonic()
-        if now - self._last_stop_ts < 0.1:
+        if now - self._last_stop_ts < 0.1 and not force:
             _dbg("skip STOP (throttled)")
-            return
+            return False
         self._last_stop_ts = now
+        self._idle = False
 
         try:
             await self._send("stop\n")
         except Exception as e:
             _dbg(f"abort_current_search send error: {e}")
-            return
+            return False
 
         # If a search loop is active and holding the read lock, don't drain here.
         if self._read_lock.locked() or self._search_active:
             _dbg("abort_current_search: reader active; not draining")
-            return
+            return True
 
         # Reader seems idle — drain quickly under the lock
         _dbg("abort_current_search: draining")
         deadline = asyncio.get_event_loop().time() + 0.8
         while asyncio.get_event_loop().time() < deadline:
-            txt = await self._readline_timeout(0.1)
-            if txt is None:
+            msg = await self._read_msg_timeout(0.1)
+            if msg is None:
                 continue
-            if not txt:
+            if not msg:
                 break
-            if txt.startswith("bestmove "):
+            if isinstance(msg, Bestmove) or isinstance(msg, str) and msg.startswith("bestmove "):
+                self._idle = True
                 break
+        return True
 
     async def _preflight_reset(self):
         """Ensure engine is idle before new 'position'/'go'. Safe even if already idle."""
+        if self._idle:
+            return
         try:
             await self.abort_current_search()
         except Exception as e:
@@ -191,68 +300,130 @@ class UciBridge:
         depth: Optional[int],
         rollouts: Optional[int],
         movetime_ms: Optional[int],
-    ) -> AsyncGenerator[str, None]:
-        await self._ensure_started()
-        await self._preflight_reset()
-
-        assert self.proc and self.proc.stdin and self.proc.stdout
-
-        # Set position
-        if fen:
-            await self._send(f"position fen {fen}\n")
-        else:
-            await self._send("position startpos\n")
-
-        # Be sure engine is ready (with restart on timeout)
-        ok = await self.isready(restart_on_timeout=True)
+        session: Optional[str] = None,
+        nodes: Optional[int] = None,
+        stats: Optional[bool] = None,
+    ) -> AsyncGenerator[Event, None]:
+        try:
+            sess, ok = await self._prepare(fen, session, stats)
+        except ConnectionError as e:
+            # engine died between searches (write to a closed pipe): once more on a fresh one
+            _dbg(f"engine pipe closed ({e!r}); restarting")
+            try:
+                await self._restart_engine()
+                sess, ok = await self._prepare(fen, session, stats)
+            except ConnectionError as e2:
+                yield Error(f"engine unavailable: {e2!r}")
+                return
         if not ok:
-            yield json.dumps({"stage": "error", "message": "engine not ready"}, separators=(",", ":"))
+            yield Error("engine not ready")
             return
 
-        # Build 'go'
+        # Build 'go' (all limits together; the engine stops at the first one hit)
+        parts = ["go"]
         if depth is not None:
-            parts = ["go", "depth", str(int(depth))]
-            if rollouts is not None:
-                parts += ["rollouts", str(int(rollouts))]
-            go_cmd = " ".join(parts) + "\n"
-        elif movetime_ms:
-            go_cmd = f"go movetime {int(movetime_ms)}\n"
-        else:
-            yield json.dumps({"stage": "error", "message": "missing depth or movetime"}, separators=(",", ":"))
+            parts += ["depth", str(int(depth))]
+        if nodes:
+            parts += ["nodes", str(int(nodes))]
+        if movetime_ms:
+            parts += ["movetime", str(int(movetime_ms))]
+        if len(parts) == 1:
+            yield Error("missing depth, nodes or movetime")
             return
+        if depth is not None and rollouts is not None:
+            parts += ["rollouts", str(int(rollouts))]
 
-        await self._send(go_cmd)
+        self._idle = False
+        watchdog = (time.monotonic() + movetime_ms / 1000.0 + MOVETIME_GRACE_S) if movetime_ms else None
 
         # Read loop
         self._search_active = True
+        finished = False
         try:
+            await self._send(" ".join(parts) + "\n")
             while True:
-                txt = await self._readline_timeout(5.0)
+                timeout = 5.0
+                if watchdog is not None:
+                    left = watchdog - time.monotonic()
+                    if left <= 0:
+                        _dbg(f"search overran movetime={movetime_ms}ms; sending stop")
+                        await self._send("stop\n")
+                        watchdog = None
+                    else:
+                        timeout = min(timeout, left)
+                txt = await self._read_msg_timeout(timeout)
                 if txt is None:
                     continue  # keep waiting
                 if txt == "":
                     rc = self.proc.returncode if self.proc else None
                     last = list(self._last_lines)[-1] if self._last_lines else ""
                     raise RuntimeError(f"engine terminated unexpectedly (code={rc}) last='{last}'")
-                if txt.startswith("info "):
-                    info = parse_info_line(txt)
-                    if info:
-                        info["stage"] = "searching"
-                        yield json.dumps(info, separators=(",", ":"))
-                elif txt.startswith("info string "):
-                    yield json.dumps({"stage": "searching", "string": txt[len("info string "):]}, separators=(",", ":"))
-                elif txt.startswith("bestmove "):
-                    bestmove = txt.split(" ", 1)[1].split(" ")[0]
-                    yield json.dumps({"stage": "done", "bestmove": bestmove}, separators=(",", ":"))
-                    break
+                if isinstance(txt, str):
+                    if txt.startswith("info "):
+                        info = parse_info_line(txt)
+                        if info:
+                            yield Info.from_dict(info)
+                        continue
+                    if not txt.startswith("bestmove "):
+                        continue
+                    toks = txt.split()
+                    done = Bestmove(toks[1] if len(toks) > 1 else "",
+                                    toks[3] if len(toks) > 3 and toks[2] == "ponder" else None)
+                elif isinstance(txt, Info):
+                    yield txt   # frame: already decoded, no text round-trip
+                    continue
+                else:
+                    done = txt
+
+                if sess is not None:
+                    sess.last_bestmove = done.move
+                # Engine is idle from here on; closing the generator must not send STOP.
+                finished = True
+                self._search_active = False
+                self._idle = True
+                yield done
+                break
         except (asyncio.CancelledError, GeneratorExit):
-            await self.abort_current_search()
+            if not finished:
+                await self.abort_current_search()
             raise
         except Exception as e:
-            yield json.dumps({"stage": "error", "message": str(e)}, separators=(",", ":"))
+            yield Error(str(e))
         finally:
             self._search_active = False
 
+    async def _prepare(self, fen: str, session: Optional[str], stats: Optional[bool]) -> Tuple[Optional[GameSession], bool]:
+        """Engine started, idle and on the position; returns (session state, ready)."""
+        await self._ensure_started()
+        await self._preflight_reset()
+
+        assert self.proc and self.proc.stdin and self.proc.stdout
+
+        # stats=None leaves the option as it is (e.g. ponder searches)
+        if stats is not None and stats != self._stats_on and "Stats" in self._options:
+            await self._send(f"setoption name Stats value {'true' if stats else 'false'}\n")
+            self._stats_on = stats
+
+        # Set position (incrementally for sessions, so the engine keeps its TT & repetition history)
+        sess = None
+        if session:
+            sess = self.sessions.get(session, fen or chess.STARTING_FEN)
+            sess.advance_to(fen or chess.STARTING_FEN, hint=sess.last_bestmove)
+            if self._owner != session:
+                await self._send("ucinewgame\n")
+                self._owner = session
+            await self._send(sess.position_cmd())
+        elif fen:
+            self._owner = None
+            await self._send(f"position fen {fen}\n")
+        else:
+            self._owner = None
+            await self._send("position startpos\n")
+
+        # Be sure engine is ready (with restart on timeout); an idle engine already is
+        ok = self._idle or await self.isready(restart_on_timeout=True)
+        return sess, ok
+
     # Back-compat alias expected by app.py
     async def think_stream(
         self,
@@ -260,9 +431,12 @@ class UciBridge:
         depth: Optional[int] = None,
         rollouts: Optional[int] = None,
         movetime_ms: Optional[int] = None,
-    ) -> AsyncGenerator[str, None]:
+        session: Optional[str] = None,
+        nodes: Optional[int] = None,
+        stats: Optional[bool] = None,
+    ) -> AsyncGenerator[Event, None]:
         _dbg("think_stream() -> stream_go() alias")
-        async for chunk in self.stream_go(fen, depth, rollouts, movetime_ms):
+        async for chunk in self.stream_go(fen, depth, rollouts, movetime_ms, session, nodes, stats):
             yield chunk
 
     async def stop(self):
@@ -1,12 +1,25 @@
 # Path: engine-svc/uci_parser.py
 """
 Parse UCI `info` lines into structured dicts for the UI.
+
+`info string stats <name> <int> ...` (search counters, setoption Stats) becomes
+{"stats": {name: int, ...}} instead of a plain string.
 """
 import shlex
 from typing import Dict
 
 print("[DBG] uci_parser loaded", flush=True)
 
+def parse_stats(toks) -> Dict[str, int]:
+    """`name value name value ...` -> {name: int}; non-numeric values are skipped."""
+    out: Dict[str, int] = {}
+    for name, val in zip(toks[0::2], toks[1::2]):
+        try:
+            out[name] = int(val)
+        except ValueError:
+            pass
+    return out
+
 def parse_info_line(line: str) -> Dict:
     s = line.strip()
     try:
@@ -27,6 +40,10 @@ def parse_info_line(line: str) -> Dict:
             out['nps'] = int(next(it, '0'))
         elif tok == 'hashfull':
             out['hashfull'] = int(next(it, '0'))
+        elif tok == 'currmove':
+            out['currmove'] = next(it, '')
+        elif tok == 'currmovenumber':
+            out['currmovenumber'] = int(next(it, '0'))
         elif tok == 'score':
             kind = next(it, '')
             val = next(it, '0')
@@ -38,7 +55,11 @@ def parse_info_line(line: str) -> Dict:
             out['pv'] = list(it)
             break
         elif tok == 'string':
-            out['string'] = " ".join(list(it))
+            rest = list(it)
+            if rest[:1] == ['stats']:
+                out['stats'] = parse_stats(rest[1:])
+            else:
+                out['string'] = " ".join(rest)
             break
     try:
         print(f"[DBG] uci_parser.parse_info_line output: {out}", flush=True)
@@ -0,0 +1,197 @@
+# Path: engine-svc/zygote.py
+"""
+Purpose: Fork server ("zygote") for Python engine processes.
+
+Started once by launcher.py as `python zygote.py --socket PATH --engine-dir DIR
+--preload ab`. It imports uci_main and the preloaded engines (chess,
+engines.ab_engine, ...) up front, prints `ready`, and then serves spawn
+requests on a Unix socket; each fork starts with everything imported, so a
+new engine answers `uci` within milliseconds instead of paying interpreter
+start-up and imports.
+
+Spawn request (one connection per engine):
+  client -> zygote   one JSON line {"argv": [...], "cwd": "..."} with two fds
+                     attached (SCM_RIGHTS): the engine's stdin (read end) and
+                     stdout (write end; stderr goes there too)
+  zygote -> client   {"pid": N}           after the fork
+                     {"exit": code}       when the engine has exited (reaped on
+                                          SIGCHLD, so right away)
+argv is what uci_main.py would get (argv[0] is the script path); the child
+runs uci_main.main(argv[1:]) in `cwd`.
+
+Single-threaded on purpose: fork() from a process without threads is safe.
+Exits when its parent (the server) goes away.
+"""
+from __future__ import annotations
+
+import argparse
+import importlib
+import json
+import os
+import select
+import signal
+import socket
+import sys
+import traceback
+from typing import Dict, List, Tuple
+
+PARENT_POLL_S = 0.5           # how often to check that the server is still there
+MAX_REQUEST = 64 * 1024
+
+PRINT_DBG = True
+def _dbg(msg: str):
+    if PRINT_DBG:
+        print(f"[DBG] zygote: {msg}", file=sys.stderr, flush=True)
+
+
+def preload(engine_dir: str, engines: List[str]):
+    """Import uci_main and engines.<name>_engine for each name; returns uci_main."""
+    sys.path.insert(0, engine_dir)
+    uci_main = importlib.import_module("uci_main")
+    for name in engines:
+        mod = importlib.import_module(f"engines.{name}_engine")
+        # touch what the first search would otherwise build lazily
+        if hasattr(mod, "evaluate"):
+            import chess
+            mod.evaluate(chess.Board())
+    return uci_main
+
+
+def _run_child(uci_main, req: Dict, fin: int, fout: int) -> None:
+    """In the forked child: become the engine process. Never returns."""
+    code = 0
+    try:
+        os.dup2(fin, 0)
+        os.dup2(fout, 1)
+        os.dup2(fout, 2)
+        os.close(fin)
+        os.close(fout)
+        os.chdir(req.get("cwd") or ".")
+        argv = req["argv"]
+        sys.argv = list(argv)
+        uci_main.main(argv[1:])
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else 0
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(code)
+
+
+def _spawn(uci_main, listener: socket.socket, conn: socket.socket, children: Dict[int, socket.socket],
+           wake: Tuple[int, int]) -> None:
+    data, fds, _flags, _addr = socket.recv_fds(conn, MAX_REQUEST, 2)
+    try:
+        if len(fds) != 2:
+            raise ValueError(f"expected 2 fds, got {len(fds)}")
+        req = json.loads(data.decode("utf-8"))
+    except (ValueError, KeyError) as e:
+        for fd in fds:
+            os.close(fd)
+        conn.sendall((json.dumps({"error": str(e)}) + "\n").encode())
+        conn.close()
+        return
+    fin, fout = fds
+    sys.stdout.flush()
+    sys.stderr.flush()
+    pid = os.fork()
+    if pid == 0:
+        signal.set_wakeup_fd(-1)
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        for fd in wake:
+            os.close(fd)
+        listener.close()
+        conn.close()
+        for other in children.values():
+            other.close()
+        _run_child(uci_main, req, fin, fout)
+    os.close(fin)
+    os.close(fout)
+    children[pid] = conn
+    conn.sendall((json.dumps({"pid": pid}) + "\n").encode())
+    _dbg(f"forked pid={pid} argv={req.get('argv')}")
+
+
+def _reap(children: Dict[int, socket.socket]) -> None:
+    while children:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            return
+        if pid == 0:
+            return
+        conn = children.pop(pid, None)
+        if conn is None:
+            continue
+        try:
+            conn.sendall((json.dumps({"exit": os.waitstatus_to_exitcode(status)}) + "\n").encode())
+        except OSError:
+            pass
+        conn.close()
+
+
+def _drain(fd: int) -> None:
+    try:
+        while os.read(fd, 512):
+            pass
+    except BlockingIOError:
+        pass
+
+
+def serve(path: str, uci_main) -> None:
+    if os.path.exists(path):
+        os.unlink(path)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(path)
+    os.chmod(path, 0o600)
+    listener.listen(16)
+    parent = os.getppid()
+    children: Dict[int, socket.socket] = {}
+    # SIGCHLD wakes select() through a self-pipe, so an engine's exit is reported at once
+    wake = os.pipe()
+    for fd in wake:
+        os.set_blocking(fd, False)
+    signal.set_wakeup_fd(wake[1])
+    signal.signal(signal.SIGCHLD, lambda _sig, _frame: None)
+    print("ready", flush=True)
+    os.dup2(2, 1)   # nobody reads our stdout after `ready`
+    try:
+        while os.getppid() == parent:
+            ready, _, _ = select.select([listener, wake[0]], [], [], PARENT_POLL_S)
+            if wake[0] in ready:
+                _drain(wake[0])
+            if listener in ready:
+                conn, _ = listener.accept()
+                try:
+                    _spawn(uci_main, listener, conn, children, wake)
+                except OSError as e:
+                    _dbg(f"spawn failed: {e}")
+                    conn.close()
+            _reap(children)
+    finally:
+        signal.set_wakeup_fd(-1)
+        for fd in wake:
+            os.close(fd)
+        listener.close()
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Engine fork server")
+    parser.add_argument("--socket", required=True, help="Unix socket path to listen on")
+    parser.add_argument("--engine-dir", default=os.path.dirname(os.path.abspath(__file__)),
+                        help="directory holding uci_main.py and engines/")
+    parser.add_argument("--preload", default="ab", help="comma list of engine names to import up front")
+    args = parser.parse_args(argv)
+    uci_main = preload(args.engine_dir, [n.strip() for n in args.preload.split(",") if n.strip()])
+    serve(args.socket, uci_main)
+
+
+if __name__ == "__main__":
+    main()
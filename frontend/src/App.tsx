@@ -20,7 +20,7 @@ export default function App() {
   const [mode, setMode] = useState<Mode>('HUMAN_VS_AI')
   const [gameId, setGameId] = useState<string>('')
   const [state, setState] = useState<GameState>({
-    gameId: '', fen: new Chess().fen(), turn: 'w', over: false, legalMoves: []
+    gameId: '', fen: new Chess().fen(), turn: 'w', over: false, legalMoves: [], version: 0
   })
   const [isSelfPlaying, setIsSelfPlaying] = useState(false)
   const [hasEverSelfPlayed, setHasEverSelfPlayed] = useState(false)
@@ -32,6 +32,8 @@ export default function App() {
   const [blackRollouts, setBlackRollouts] = useState<number>(150)
 
   const esRef = useRef<EventSource | null>(null)
+  // Id of the running selfplay stream (its first SSE event); Pause stops only that one
+  const searchIdRef = useRef<string | null>(null)
   const openStream = useCallback((es: EventSource) => {
     // eslint-disable-next-line no-console
     console.debug('[UI] openStream (closing previous?)', !!esRef.current)
@@ -147,6 +149,8 @@ export default function App() {
       whiteDepth, whiteRollouts,
       blackDepth, blackRollouts
     )
+    // Version of the last confirmed state; each engine move is posted against it
+    let version = state.version
     es.onopen = () => console.debug('[ENGINE/selfplay] open')
     es.onmessage = async (e) => {
       // eslint-disable-next-line no-console
@@ -155,11 +159,14 @@ export default function App() {
         const msg = JSON.parse(e.data)
         // eslint-disable-next-line no-console
         console.debug('[ENGINE/selfplay] parsed', msg)
-        if (msg.type === 'bestmove' && typeof msg.move === 'string') {
+        if (msg.type === 'search') {
+          searchIdRef.current = msg.id
+        } else if (msg.type === 'bestmove' && typeof msg.move === 'string') {
           const { from, to, promotion } = decodeUCIMove(msg.move)
           // eslint-disable-next-line no-console
           console.debug('[ENGINE/selfplay] bestmove → postMove', { gameId, from, to, promotion })
-          const next = await postMove(gameId, from, to, promotion)
+          const next = await postMove(gameId, from, to, promotion, version)
+          version = next.version
           // eslint-disable-next-line no-console
           console.debug('[ENGINE/selfplay] postMove OK', next.fen)
           setState(next)
@@ -184,7 +191,7 @@ export default function App() {
     setIsSelfPlaying(true)
     setHasEverSelfPlayed(true)
   }, [
-    gameId, isAIVsAI, state.over, isSelfPlaying, state.fen,
+    gameId, isAIVsAI, state.over, isSelfPlaying, state.fen, state.version,
     whiteDepth, whiteRollouts, blackDepth, blackRollouts,
     openStream, closeStream
   ])
@@ -193,7 +200,9 @@ export default function App() {
     if (!gameId || !isAIVsAI || state.over) return
     if (isSelfPlaying) {
       console.debug('[UI] Pause (engineStop)')
-      try { await engineStop() } finally {
+      const searchId = searchIdRef.current
+      searchIdRef.current = null
+      try { if (searchId) await engineStop(searchId) } finally {
         setIsSelfPlaying(false)
         closeStream()
       }
@@ -248,7 +257,7 @@ export default function App() {
 
     try {
       console.debug('[UI] postMove (human)', { source, target })
-      const next = await postMove(gameId, source, target)
+      const next = await postMove(gameId, source, target, undefined, state.version)
       console.debug('[UI] postMove OK (human)', next.fen)
       setState(next)
       localStorage.setItem('lastGameId', next.gameId)
@@ -259,7 +268,7 @@ export default function App() {
         console.debug('[ENGINE/think] start', {
           fen: next.fen, side: 'black', depth: blackDepth, rollouts: blackRollouts
         })
-        const es = think(next.fen, 'black', blackDepth, blackRollouts)
+        const es = think(next.fen, 'black', blackDepth, blackRollouts, { ponder: true, session: gameId })
         es.onopen = () => console.debug('[ENGINE/think] open')
         es.onmessage = async (e) => {
           console.debug('[ENGINE/think] onmessage raw', e.data)
@@ -269,7 +278,7 @@ export default function App() {
             if (msg.type === 'bestmove' && typeof msg.move === 'string') {
               const { from, to, promotion } = decodeUCIMove(msg.move)
               console.debug('[ENGINE/think] bestmove → postMove', { gameId, from, to, promotion })
-              const after = await postMove(gameId, from, to, promotion)
+              const after = await postMove(gameId, from, to, promotion, next.version)
               console.debug('[ENGINE/think] postMove OK', after.fen)
               setState(after)
               localStorage.setItem('lastGameId', after.gameId)
@@ -297,7 +306,7 @@ export default function App() {
       return false
     }
   }, [
-    gameId, state.over, isAIVsAI, isHumanVsAI, state.turn, state.fen,
+    gameId, state.over, isAIVsAI, isHumanVsAI, state.turn, state.fen, state.version,
     pendingThink, blackDepth, blackRollouts, openStream, closeStream
   ])
 
@@ -315,7 +324,7 @@ export default function App() {
     console.debug('[UI] onPromotionPieceSelect', { pieceRaw: piece, normalized, from, to })
 
     try {
-      const next = await postMove(gameId, from, to, normalized)
+      const next = await postMove(gameId, from, to, normalized, state.version)
       console.debug('[UI] postMove OK (promotion)', next.fen)
       setState(next)
       localStorage.setItem('lastGameId', next.gameId)
@@ -326,7 +335,7 @@ export default function App() {
           console.debug('[ENGINE/think] start (after promotion)', {
             fen: next.fen, side: 'black', depth: blackDepth, rollouts: blackRollouts
           })
-          const es = think(next.fen, 'black', blackDepth, blackRollouts)
+          const es = think(next.fen, 'black', blackDepth, blackRollouts, { ponder: true, session: gameId })
           es.onopen = () => console.debug('[ENGINE/think] open')
           es.onmessage = async (e) => {
             console.debug('[ENGINE/think] onmessage raw', e.data)
@@ -336,7 +345,7 @@ export default function App() {
               if (msg.type === 'bestmove' && typeof msg.move === 'string') {
                 const { from: ef, to: et, promotion: ep } = decodeUCIMove(msg.move)
                 console.debug('[ENGINE/think] bestmove → postMove', { gameId, ef, et, ep })
-                const after = await postMove(gameId, ef, et, ep)
+                const after = await postMove(gameId, ef, et, ep, next.version)
                 console.debug('[ENGINE/think] postMove OK', after.fen)
                 setState(after)
                 localStorage.setItem('lastGameId', after.gameId)
@@ -367,7 +376,7 @@ export default function App() {
       return false
     }
   }, [
-    gameId, isHumanVsAI, pendingThink,
+    gameId, isHumanVsAI, pendingThink, state.version,
     blackDepth, blackRollouts, openStream, closeStream
   ])
 
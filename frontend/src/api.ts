@@ -33,25 +33,30 @@
  *       accepting/processsing the next engine move. This prevents races/drift.
  *
  * ENDPOINT CONTRACTS (suggested, match your backend)
- *   GAME SERVICE (HTTP):
+ *   GAME SERVICE (HTTP):   (all accept ?moves=uci|map|none for the legalMoves encoding)
  *     POST   {GAME_BASE}/games                       -> create game
  *     GET    {GAME_BASE}/games/{gameId}              -> fetch current state
- *     POST   {GAME_BASE}/games/{gameId}/move         -> apply move {from,to,promotion?}
+ *     POST   {GAME_BASE}/games/{gameId}/move         -> apply move {from,to,promotion?,version?}
+ *            (409 if `version` is stale: another move was applied first)
  *
  *   ENGINE SERVICE (SSE + HTTP):
  *     GET    {ENGINE_EVENTS_BASE}/engines/think
- *            ?fen=&side=white|black&depth=&rollouts= -> one-shot think stream
+ *            ?fen=&side=white|black&depth=&rollouts=&ponder= -> one-shot think stream
+ *            (ponder=1: engine keeps thinking on the expected reply after its move;
+ *             session=<gameId>: engine keeps its search state between moves)
  *            emits JSON events:
+ *              { "type":"search", "id":"3f2a..." }   // first event; pass to engineStop
  *              { "type":"bestmove", "move":"e2e4" }  // UCI move
  *              { "type":"done" }
  *
  *     GET    {ENGINE_EVENTS_BASE}/engines/selfplay
  *            ?fen=&whiteDepth=&whiteRollouts=&blackDepth=&blackRollouts=
  *            emits JSON events:
+ *              { "type":"search", "id":"3f2a..." }
  *              { "type":"bestmove", "side":"w"|"b", "move":"e7e5" }
  *              { "type":"done" }
  *
- *     POST   {ENGINE_API_BASE}/engines/stop          -> stops active stream
+ *     POST   {ENGINE_API_BASE}/engines/stop?id=      -> stops that stream only
  *
  * ENV CONFIG (Vite):
  *   VITE_GAME_API_BASE        (default '/api')
@@ -72,6 +77,9 @@ const GAME_BASE = import.meta.env.VITE_GAME_API_BASE || '/api'
 const ENGINE_EVENTS_BASE = import.meta.env.VITE_ENGINE_EVENTS_BASE || '/engine-events'
 const ENGINE_API_BASE = import.meta.env.VITE_ENGINE_API_BASE || '/engine'
 
+// Compact legalMoves encoding for every game-state response
+const MOVES_FMT = 'moves=map'
+
 // Log resolved bases once
 // eslint-disable-next-line no-console
 console.debug('[API] BASES', { GAME_BASE, ENGINE_EVENTS_BASE, ENGINE_API_BASE })
@@ -85,7 +93,9 @@ export interface GameState {
   turn: 'w' | 'b'
   over: boolean
   result?: '1-0' | '0-1' | '1/2-1/2'
-  legalMoves: string[]
+  // We request ?moves=map: from square -> concatenated to squares, e.g. { e2: "e3e4" }
+  legalMoves: string[] | Record<string, string>
+  version: number   // bumped by the Game Service on every applied move
 }
 
 export type Side = 'white' | 'black'
@@ -141,7 +151,7 @@ function openSSE(url: string): EventSource {
 export async function newGame(
   mode: 'HUMAN_VS_HUMAN' | 'HUMAN_VS_AI' | 'AI_VS_AI'
 ): Promise<GameState> {
-  const url = `${GAME_BASE}/games`
+  const url = `${GAME_BASE}/games?${MOVES_FMT}`
   // eslint-disable-next-line no-console
   console.debug('[API] newGame →', { url, mode })
   const r = await fetch(url, {
@@ -163,7 +173,7 @@ export async function newGame(
  */
 
 export async function getState(gameId: string): Promise<GameState> {
-  const url = `${GAME_BASE}/games/${gameId}`
+  const url = `${GAME_BASE}/games/${gameId}?${MOVES_FMT}`
   // eslint-disable-next-line no-console
   console.debug('[API] getState →', url)
   const r = await fetch(url)
@@ -180,16 +190,19 @@ export async function getState(gameId: string): Promise<GameState> {
  * Apply a move to the game. This is the only way state changes.
  * - Human moves: UI calls this directly.
  * - AI moves:    UI calls this with the engine-proposed bestmove.
+ * Pass the `version` of the GameState the move was chosen on; the Game Service
+ * rejects it (409) if the game has moved on since.
  */
 
 export async function postMove(
   gameId: string,
   from: string,
   to: string,
-  promotion?: string
+  promotion?: string,
+  version?: number
 ): Promise<GameState> {
-  const url = `${GAME_BASE}/games/${gameId}/move`
-  const body = { from, to, promotion }
+  const url = `${GAME_BASE}/games/${gameId}/move?${MOVES_FMT}`
+  const body = { from, to, promotion, version }
   // eslint-disable-next-line no-console
   console.debug('[API] postMove →', { url, body })
   const r = await fetch(url, {
@@ -225,7 +238,8 @@ export function think(
   fen: string,
   side: Side,
   depth = 6,
-  rollouts = 150
+  rollouts = 150,
+  opts: { ponder?: boolean; session?: string } = {}
 ): EventSource {
   const qs = new URLSearchParams({
     fen,
@@ -233,6 +247,8 @@ export function think(
     depth: String(depth),
     rollouts: String(rollouts),
   })
+  if (opts.ponder) qs.set('ponder', '1')
+  if (opts.session) qs.set('session', opts.session)
   const url = `${ENGINE_EVENTS_BASE}/engines/think?${qs.toString()}`
   // eslint-disable-next-line no-console
   console.debug('[API] think URL', url)
@@ -266,11 +282,11 @@ export function selfPlayStart(
 }
 
 /**
- * Stop any active engine stream for the current client/session.
- * Implementation detail on the server is up to you; this is a simple POST.
+ * Stop one engine stream, identified by the id from its first ("search") event.
+ * Other clients' searches are not affected.
  */
-export async function engineStop(): Promise<void> {
-  const url = `${ENGINE_API_BASE}/engines/stop`
+export async function engineStop(searchId: string): Promise<void> {
+  const url = `${ENGINE_API_BASE}/engines/stop?${new URLSearchParams({ id: searchId })}`
   // eslint-disable-next-line no-console
   console.debug('[API] engineStop →', url)
   const r = await fetch(url, { method: 'POST' })
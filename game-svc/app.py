@@ -4,7 +4,10 @@ FastAPI app for the Chess game service — **UI-only orchestration**
 
 Responsibilities:
 - Game lifecycle (create, fetch)
-- Apply moves (human or engine-proposed)
+- Apply moves (human or engine-proposed); concurrent moves to one game are
+  serialized per game, and a move carrying a stale `version` gets 409
+- `?moves=uci|map|none` on every state response picks the legalMoves encoding;
+  the encoded state is cached per position
 
 This service does **not** communicate with the engine. The frontend talks to:
 - Game Service for state/moves
@@ -14,17 +17,24 @@ Endpoint base: /api
 """
 from __future__ import annotations
 
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import Response
 
 from models import NewGameRequest, MoveRequest, GameStateDTO
-from orchestrator import STORE, apply_move
+from orchestrator import MOVE_FORMATS, STORE, StaleVersion, submit_move
 
 app = FastAPI(title="game-svc", version="1.0")
 
 
 # ————— helpers —————
 
+MovesParam = Query("uci", pattern=f"^({'|'.join(MOVE_FORMATS)})$", description="legalMoves encoding")
+
+
+def _json(body: bytes) -> Response:
+    return Response(content=body, media_type="application/json")
+
+
 def _ensure_game(gid: str):
     try:
         return STORE.get(gid)
@@ -35,22 +45,24 @@ def _ensure_game(gid: str):
 # ————— routes —————
 
 @app.post("/api/games", response_model=GameStateDTO)
-def new_game(req: NewGameRequest):
+async def new_game(req: NewGameRequest, moves: str = MovesParam):
     g = STORE.new(req.mode)
-    return JSONResponse(g.state())
+    return _json(g.state_json(moves))
 
 
 @app.get("/api/games/{gid}", response_model=GameStateDTO)
-def get_state(gid: str):
+async def get_state(gid: str, moves: str = MovesParam):
     g = _ensure_game(gid)
-    return JSONResponse(g.state())
+    return _json(g.state_json(moves))
 
 
 @app.post("/api/games/{gid}/move", response_model=GameStateDTO)
-def post_move(gid: str, body: MoveRequest):
+async def post_move(gid: str, body: MoveRequest, moves: str = MovesParam):
     g = _ensure_game(gid)
     try:
-        apply_move(g, body.from_square, body.to_square, body.promotion)
+        state = await submit_move(g, body.from_square, body.to_square, body.promotion, body.version, moves)
+    except StaleVersion as e:
+        raise HTTPException(409, str(e))
     except ValueError as e:
         raise HTTPException(400, str(e))
-    return JSONResponse(g.state())
\ No newline at end of file
+    return _json(state)
\ No newline at end of file
@@ -4,7 +4,7 @@ Pydantic models for API contracts between frontend and game service.
 """
 from __future__ import annotations
 
-from typing import Literal, Optional, List
+from typing import Dict, Literal, Optional, List, Union
 from pydantic import BaseModel, Field, ConfigDict
 
 class NewGameRequest(BaseModel):
@@ -15,6 +15,8 @@ class MoveRequest(BaseModel):
     from_square: str = Field(..., min_length=2, max_length=2, alias='from', description="from square (e.g., e2)")
     to_square: str = Field(..., min_length=2, max_length=2, alias='to', description="to square (e.g., e4)")
     promotion: Optional[str] = Field(None, min_length=1, max_length=1, description="promotion piece in SAN letter (q,r,b,n)")
+    # Game version the client saw; the move is rejected with 409 if the game moved on since
+    version: Optional[int] = Field(None, ge=0, description="expected game version (optimistic concurrency)")
 
     # Pydantic v2: use model_config, not class Config
     model_config = ConfigDict(populate_by_name=True)
@@ -25,4 +27,6 @@ class GameStateDTO(BaseModel):
     turn: Literal['w', 'b']
     over: bool
     result: Optional[Literal['1-0','0-1','1/2-1/2']] = None
-    legalMoves: List[str] = Field(default_factory=list)  # avoid mutable default
\ No newline at end of file
+    # UCI list, or {from: "to squares concatenated"} with ?moves=map (empty with ?moves=none)
+    legalMoves: Union[List[str], Dict[str, str]] = Field(default_factory=list)  # avoid mutable default
+    version: int = 0  # bumped on every applied move
\ No newline at end of file
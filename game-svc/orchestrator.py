@@ -5,40 +5,98 @@ Game-state orchestration only (no engine calls).
 - In-memory GameStore
 - Human/engine-proposed move application + legality via python-chess
 - Full end-state detection (mate/stalemate/insufficient material/75-move/repetition)
-- Deterministic legalMoves listing (UCI)
+- Deterministic legalMoves listing, computed once per position and cached
+  together with the encoded JSON state; formats (`moves=` query parameter):
+    uci   sorted list of UCI strings (default)
+    map   {from square: "to squares concatenated"}, e.g. {"e2": "e3e4"}
+          (promotions collapse to one target square)
+    none  omitted (empty list)
+- Concurrency: one asyncio.Lock per game serializes move submissions; every
+  applied move bumps `version`, and a move sent with an older version is
+  rejected (StaleVersion -> HTTP 409) instead of landing on a newer position.
 """
 from __future__ import annotations
 
+import asyncio
+import json
 import uuid
 from dataclasses import dataclass, field
 from typing import Dict, List, Optional
 
 import chess
 
+MOVE_FORMATS = ("uci", "map", "none")
+
+_dumps = json.JSONEncoder(separators=(",", ":")).encode
+
 @dataclass
 class Game:
     id: str = field(default_factory=lambda: uuid.uuid4().hex)  # auto-generate on init
     mode: str = "HUMAN_VS_HUMAN"
     board: chess.Board = field(default_factory=chess.Board)
+    version: int = 0                                     # number of applied moves
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock, repr=False, compare=False)
+    # Per-position caches, valid while _cache_version == version (board only changes via apply_move)
+    _cache_version: int = field(default=-1, repr=False, compare=False)
+    _legal: Optional[List[chess.Move]] = field(default=None, repr=False, compare=False)
+    _snapshots: Dict[str, bytes] = field(default_factory=dict, repr=False, compare=False)
+
+    def _fresh(self) -> None:
+        if self._cache_version != self.version:
+            self._cache_version = self.version
+            self._legal = None
+            self._snapshots = {}
+
+    def legal_moves(self) -> List[chess.Move]:
+        self._fresh()
+        if self._legal is None:
+            self._legal = sorted(self.board.legal_moves, key=lambda m: m.uci())
+        return self._legal
 
     def legal_moves_uci(self):
-        return sorted(m.uci() for m in self.board.legal_moves)
+        return [m.uci() for m in self.legal_moves()]
+
+    def legal_moves_map(self) -> Dict[str, str]:
+        out: Dict[str, str] = {}
+        for m in self.legal_moves():
+            frm = chess.SQUARE_NAMES[m.from_square]
+            to = chess.SQUARE_NAMES[m.to_square]
+            tos = out.get(frm, "")
+            if not tos.endswith(to):   # promotions: one entry per target square
+                out[frm] = tos + to
+        return out
 
     def result_str(self):
         if not self.board.is_game_over(claim_draw=True):
             return None
         return self.board.result(claim_draw=True)
 
-    def state(self):
+    def state(self, moves: str = "uci"):
+        result = self.result_str()
+        if moves == "map":
+            legal = self.legal_moves_map()
+        elif moves == "none":
+            legal = []
+        else:
+            legal = self.legal_moves_uci()
         return {
             "gameId": self.id,
             "fen": self.board.fen(),
             "turn": "w" if self.board.turn == chess.WHITE else "b",
-            "over": self.board.is_game_over(claim_draw=True),
-            "result": self.result_str(),
-            "legalMoves": self.legal_moves_uci(),
+            "over": result is not None,
+            "result": result,
+            "legalMoves": legal,
+            "version": self.version,
         }
 
+    def state_json(self, moves: str = "uci") -> bytes:
+        """state() encoded once per position and format."""
+        self._fresh()
+        body = self._snapshots.get(moves)
+        if body is None:
+            body = self._snapshots[moves] = _dumps(self.state(moves)).encode("utf-8")
+        return body
+
 class GameStore:
     def __init__(self) -> None:
         self._games = {}
@@ -59,6 +117,14 @@ STORE = GameStore()
 # ————— Move application helpers —————
 PROMO_MAP = {'q':'q','r':'r','b':'b','n':'n'}
 
+class StaleVersion(Exception):
+    """The client's game version is behind the server's (someone else moved first)."""
+
+    def __init__(self, expected: int, current: int):
+        super().__init__(f"stale game version {expected} (current {current})")
+        self.expected = expected
+        self.current = current
+
 # game-svc/orchestrator.py
 def apply_move(g: Game, from_sq: str, to_sq: str, promotion: Optional[str] = None) -> Game:
     if promotion:
@@ -78,4 +144,18 @@ def apply_move(g: Game, from_sq: str, to_sq: str, promotion: Optional[str] = Non
         raise ValueError(f"illegal move: {uci}")
 
     g.board.push(move)
-    return g
\ No newline at end of file
+    g.version += 1
+    return g
+
+async def submit_move(g: Game, from_sq: str, to_sq: str, promotion: Optional[str] = None,
+                      expected_version: Optional[int] = None, moves: str = "uci") -> bytes:
+    """
+    Apply a move under the game's lock and return the resulting state (JSON-encoded).
+    With `expected_version`, the move is only applied if nobody moved since the
+    client read that version. Without it, the legality check alone decides.
+    """
+    async with g.lock:
+        if expected_version is not None and expected_version != g.version:
+            raise StaleVersion(expected_version, g.version)
+        apply_move(g, from_sq, to_sq, promotion)
+        return g.state_json(moves)
\ No newline at end of file